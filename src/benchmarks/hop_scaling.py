@@ -0,0 +1,82 @@
+import argparse
+import math
+import sys
+from utils.constants import *
+from utils.file_processing import load_schema
+from utils.query_processing import process_query
+from utils.ui import printb, printg, printr
+from .run import measure
+from .workloads import load_example_workload, chain_query
+
+def scaling_exponent(hops, latencies):
+    """
+    Fits latency = c * hops ^ exponent by least squares over the logarithms.
+
+    Parameters:
+    - hops (list[int]): Number of hops of every measured path.
+    - latencies (list[float]): Latency of every measured path.
+
+    Returns:
+    - float: The exponent, about 1 when the latency grows linearly with the hops.
+    """
+    log_hops = [math.log(hop) for hop in hops]
+    log_latencies = [math.log(latency) for latency in latencies]
+    mean_hops = sum(log_hops) / len(log_hops)
+    mean_latencies = sum(log_latencies) / len(log_latencies)
+    covariance = sum((x - mean_hops) * (y - mean_latencies) for x, y in zip(log_hops, log_latencies))
+    variance = sum((x - mean_hops) ** 2 for x in log_hops)
+    return covariance / variance
+
+def main(argv=None):
+    """
+    Measures how the latency of `process_query` grows with the number of hops of a path.
+
+    Paths of 1, 2, 4, ... hops over the example movies schema are processed, half of their 
+    relationships in the wrong direction. The growth exponent is fitted from the paths with 
+    at least 4 hops, where the fixed cost of a query doesn't hide the cost per hop.
+
+    Parameters:
+    - argv (list[str], optional): The arguments, defaults to the arguments of the process.
+
+    Returns:
+    - int: 1 if the latency grows faster than the accepted exponent, otherwise 0.
+
+    Usage:
+    ```bash
+    python -m benchmarks.hop_scaling --max-hops 256
+    ```
+
+    """
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.hop_scaling', description='Measures the scaling of the correction with the length of the paths.')
+    parser.add_argument('--max-hops', type=int, default=256, help='Hops of the longest path, paths double in length up to it (default: 256).')
+    parser.add_argument('--repeat', type=int, default=20, help='Number of times every path is measured (default: 20).')
+    parser.add_argument('--max-exponent', type=float, default=CONST_BENCHMARK_MAX_SCALING_EXPONENT, help=f'Highest accepted growth exponent (default: {CONST_BENCHMARK_MAX_SCALING_EXPONENT}).')
+    arguments = parser.parse_args(argv)
+    
+    movies_schema = next(schema for query, schema in ((query, load_schema(schema)) for query, schema in load_example_workload()) if 'Movie' in schema.classes)
+    hops_list = []
+    hops = 1
+    while hops <= arguments.max_hops:
+        hops_list.append(hops)
+        hops *= 2
+    
+    latencies = []
+    for hops in hops_list:
+        result = measure(process_query, [(chain_query(hops), movies_schema)], arguments.repeat)
+        latencies.append(result['p50_us'])
+        printb(f'{hops} hops: p50 {result["p50_us"]:.1f} us, {result["p50_us"] / hops:.2f} us per hop')
+    
+    fitted = [(hops, latency) for hops, latency in zip(hops_list, latencies) if hops >= 4]
+    if len(fitted) < 2:
+        printb('At least 8 hops are needed to fit the growth exponent')
+        return 0
+    
+    exponent = scaling_exponent(*zip(*fitted))
+    if exponent > arguments.max_exponent:
+        printr(f'Latency grows as hops^{exponent:.2f}, above hops^{arguments.max_exponent}')
+        return 1
+    printg(f'Latency grows as hops^{exponent:.2f}')
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
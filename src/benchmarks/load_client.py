@@ -0,0 +1,129 @@
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from utils.constants import *
+from utils.ui import printb, printn, printr
+from .workloads import load_example_workload
+
+async def send_request(reader, writer, host, body):
+    """
+    Sends a POST request over a kept-alive connection and reads its response.
+
+    Parameters:
+    - reader (asyncio.StreamReader): The reader of the connection.
+    - writer (asyncio.StreamWriter): The writer of the connection.
+    - host (str): The value of the Host header.
+    - body (bytes): The JSON body of the request.
+
+    Returns:
+    - tuple[int, bytes]: The status and the body of the response.
+    """
+    writer.write((f'POST {CONST_SERVER_PROCESS_PATH} HTTP/1.1\r\n'
+                  f'Host: {host}\r\n'
+                  f'Content-Type: application/json\r\n'
+                  f'Content-Length: {len(body)}\r\n\r\n').encode('latin-1') + body)
+    await writer.drain()
+    
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ', 2)[1])
+    content_length = 0
+    for line in lines[1:]:
+        if line.lower().startswith('content-length:'):
+            content_length = int(line.split(':', 1)[1])
+    return status, await reader.readexactly(content_length)
+
+async def run_connection(host, port, bodies, latencies, statuses):
+    """
+    Sends requests one after the other over a single kept-alive connection.
+
+    Parameters:
+    - host (str): The address of the service.
+    - port (int): The port of the service.
+    - bodies (iterator[bytes]): Shared iterator with the bodies left to send.
+    - latencies (list[float]): List where the latency of every request, in seconds, is added.
+    - statuses (dict[int, int]): Count of responses by status.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for body in bodies:
+            start = time.perf_counter()
+            status, _ = await send_request(reader, writer, host, body)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+async def run_load(host, port, rows, requests, connections):
+    """
+    Sends the requests through several concurrent connections and measures them.
+
+    Parameters:
+    - host (str): The address of the service.
+    - port (int): The port of the service.
+    - rows (list[tuple[str, str]]): Pairs of query and schema string, cycled to build the requests.
+    - requests (int): Total number of requests.
+    - connections (int): Number of concurrent connections.
+
+    Returns:
+    - dict: Number of requests, seconds, requests per second, count by status, and mean, p50, p95 and p99 latencies in milliseconds.
+    """
+    payloads = [json.dumps({CONST_QUERY_KEY: query, CONST_SCHEMA_KEY: schema}).encode('utf-8') for query, schema in rows]
+    bodies = iter([payloads[index % len(payloads)] for index in range(requests)])
+    latencies = []
+    statuses = {}
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(run_connection(host, port, bodies, latencies, statuses) for _ in range(connections)))
+    total_seconds = time.perf_counter() - start
+    
+    percentiles = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+    return {
+        'requests': len(latencies),
+        'total_seconds': total_seconds,
+        'requests_per_second': len(latencies) / total_seconds if total_seconds else 0.0,
+        'statuses': statuses,
+        'mean_ms': statistics.fmean(latencies) * 1e3,
+        'p50_ms': percentiles[49] * 1e3,
+        'p95_ms': percentiles[94] * 1e3,
+        'p99_ms': percentiles[98] * 1e3,
+    }
+
+def main(argv=None):
+    """
+    Runs a load test against a running correction service (see `python -m server`).
+
+    Parameters:
+    - argv (list[str], optional): The arguments, defaults to the arguments of the process.
+
+    Returns:
+    - int: 1 if any request did not answer 200, otherwise 0.
+
+    Usage:
+    ```bash
+    python -m benchmarks.load_client --requests 10000 --connections 64
+    ```
+
+    """
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.load_client', description='Load tests the Cypher direction correction HTTP service.')
+    parser.add_argument('--host', default=CONST_SERVER_HOST, help=f'Address of the service (default: {CONST_SERVER_HOST}).')
+    parser.add_argument('--port', type=int, default=CONST_SERVER_PORT, help=f'Port of the service (default: {CONST_SERVER_PORT}).')
+    parser.add_argument('-n', '--requests', type=int, default=10000, help='Total number of requests (default: 10000).')
+    parser.add_argument('-c', '--connections', type=int, default=32, help='Number of concurrent kept-alive connections (default: 32).')
+    arguments = parser.parse_args(argv)
+    
+    result = asyncio.run(run_load(arguments.host, arguments.port, load_example_workload(), arguments.requests, arguments.connections))
+    printb(f'{result["requests"]} requests in {result["total_seconds"]:.2f} s: {result["requests_per_second"]:.0f} requests/s')
+    printb(f'Latency: mean {result["mean_ms"]:.2f} ms, p50 {result["p50_ms"]:.2f} ms, p95 {result["p95_ms"]:.2f} ms, p99 {result["p99_ms"]:.2f} ms')
+    printn(f'Statuses: {result["statuses"]}')
+    
+    if set(result['statuses']) != {200}:
+        printr('Some requests failed')
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from utils.constants import *
+from utils.file_processing import load_schema, process_schema
+from utils.patterns_processing import process_general_pattern, process_short_rel_pattern, pattern_exists_in_schema_multiple
+from utils.cypher_parser import parse_query
+from utils.query_processing import process_query
+from utils.result_cache import QueryResultCache
+from utils.schema import MutableSchema
+from utils.batch_validation import validate_queries, numpy
+from utils.ui import printb, printg, printn, printr, printy
+from .synthetic import generate_schema, format_schema, generate_queries
+from .workloads import load_example_workload, scale_workload, vary_literals, chain_query, adversarial_queries, pattern_checks, wide_pattern_checks, toggle_triple, process_after_update
+
+def measure(function, arguments, repeat):
+    """
+    Measures the latency of every call of a function and the throughput of all the calls.
+
+    Parameters:
+    - function (callable): The function to measure.
+    - arguments (list[tuple]): Positional arguments of every call.
+    - repeat (int): Number of times all the calls are repeated.
+
+    Returns:
+    - dict: Number of calls, total seconds, calls per second, and mean, p50, p95 and p99 latencies in microseconds.
+    """
+    latencies = []
+    perf_counter_ns = time.perf_counter_ns
+    
+    # Warm up caches and the interpreter before measuring
+    for call_arguments in arguments:
+        function(*call_arguments)
+    
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            for call_arguments in arguments:
+                start = perf_counter_ns()
+                function(*call_arguments)
+                latencies.append(perf_counter_ns() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    
+    total_seconds = sum(latencies) / 1e9
+    percentiles = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+    return {
+        'calls': len(latencies),
+        'total_seconds': total_seconds,
+        'throughput_per_second': len(latencies) / total_seconds if total_seconds else 0.0,
+        'mean_us': statistics.fmean(latencies) / 1e3,
+        'p50_us': percentiles[49] / 1e3,
+        'p95_us': percentiles[94] / 1e3,
+        'p99_us': percentiles[98] / 1e3,
+    }
+
+def build_benchmarks(scale, schema_size):
+    """
+    Builds the benchmarks of the correction pipeline.
+
+    Parameters:
+    - scale (int): Number of times the example queries are repeated in the scaled workload.
+    - schema_size (int): Number of synthetic triples added to the schemas of the scaled workload.
+
+    Returns:
+    - dict[str, tuple[callable, list[tuple]]]: Function and call arguments for every benchmark name.
+    """
+    examples = load_example_workload()
+    scaled = scale_workload(examples, scale, schema_size)
+    compiled_examples = [(query, load_schema(schema)) for query, schema in examples]
+    compiled_scaled = [(query, load_schema(schema)) for query, schema in scaled]
+    movies_schema = next(schema for query, schema in compiled_examples if 'Movie' in schema.classes)
+    
+    benchmarks = {
+        'process_query/examples': (process_query, compiled_examples),
+        'process_query/scaled': (process_query, compiled_scaled),
+        'process_general_pattern/examples': (process_general_pattern, compiled_examples),
+        'process_short_rel_pattern/examples': (process_short_rel_pattern, compiled_examples),
+        'process_schema/examples': (process_schema, [(schema,) for query, schema in examples]),
+        'process_schema/scaled': (process_schema, sorted({(schema,) for query, schema in scaled})),
+        'pattern_exists_in_schema_multiple/examples': (pattern_exists_in_schema_multiple, pattern_checks(compiled_examples)),
+        'pattern_exists_in_schema_multiple/scaled': (pattern_exists_in_schema_multiple, pattern_checks(compiled_scaled)),
+    }
+    # Queries that only go through the fast paths: no relationship, or no direction to check
+    undirected = [(query.replace('->', '-').replace('<-', '-'), schema) for query, schema in compiled_examples]
+    without_relationships = [(f'MATCH (n:{min(schema.classes)}) WHERE n.name = "Foo" RETURN n', schema) for query, schema in compiled_examples]
+    benchmarks['process_query/undirected'] = (process_query, undirected)
+    benchmarks['process_query/without_relationships'] = (process_query, without_relationships)
+    
+    # Copies of the example queries that only differ in their literals share one cached template
+    literal_cache = QueryResultCache()
+    literal_variants = [(query, load_schema(schema), literal_cache) for query, schema in vary_literals(examples, scale)]
+    benchmarks['process_query/literal_variants_cached'] = (process_query, literal_variants)
+    
+    for hops in (1, 4, 16, 64):
+        benchmarks[f'process_query/chain_{hops}_hops'] = (process_query, [(chain_query(hops), movies_schema)])
+    
+    # Malformed or extreme inputs, the latency must stay bounded by the length of the query
+    for name, query in adversarial_queries(1000).items():
+        benchmarks[f'parse_query/adversarial_{name}'] = (parse_query, [(query,)])
+        benchmarks[f'process_query/adversarial_{name}'] = (process_query, [(query, movies_schema)])
+    
+    # Random queries over a big synthetic schema, with multiple labels, alternatives and wrong directions
+    synthetic_triples = generate_schema(label_count=200, relationship_count=50, triple_count=schema_size)
+    synthetic = [(row[CONST_STATEMENT_KEY], load_schema(row[CONST_SCHEMA_KEY])) for row in generate_queries(synthetic_triples, 50 * scale, hops=5, clauses=2)]
+    benchmarks['process_query/synthetic'] = (process_query, synthetic)
+    benchmarks['pattern_exists_in_schema_multiple/synthetic'] = (pattern_exists_in_schema_multiple, pattern_checks(synthetic))
+    # The same queries validated as a single batch, with the hops looked up in pure Python and with NumPy when installed
+    synthetic_queries = [query for query, schema in synthetic]
+    benchmarks['validate_queries/synthetic'] = (validate_queries, [(synthetic_queries, synthetic[0][1])])
+    if numpy is not None:
+        benchmarks['validate_queries/synthetic_vectorized'] = (validate_queries, [(synthetic_queries, synthetic[0][1], True)])
+    # Nodes with 3 classes and relationships with 3 alternatives over a schema with 4 times more triples
+    wide_schema = load_schema(format_schema(generate_schema(label_count=2000, relationship_count=200, triple_count=4 * schema_size)))
+    benchmarks['pattern_exists_in_schema_multiple/wide'] = (pattern_exists_in_schema_multiple, wide_pattern_checks(wide_schema, 50 * scale))
+    
+    # Updates of a big mutable schema, and cached queries that keep their results across updates of unrelated triples
+    mutable_schema = MutableSchema(synthetic[0][1])
+    mutable_cache = QueryResultCache()
+    unrelated_triple = ('UnrelatedSource', 'UNRELATED', 'UnrelatedTarget')
+    benchmarks['mutable_schema/toggle_triple'] = (toggle_triple, [(mutable_schema, unrelated_triple)])
+    benchmarks['process_query/mutable_schema_updated_cached'] = (process_after_update, [(query, mutable_schema, mutable_cache, unrelated_triple) for query, schema in synthetic])
+    return benchmarks
+
+def compare_results(results, baseline, threshold):
+    """
+    Compares benchmark results against a baseline and prints the differences.
+
+    Parameters:
+    - results (dict): The benchmark results, by benchmark name.
+    - baseline (dict): The baseline results, by benchmark name.
+    - threshold (float): Relative slowdown reported as a regression.
+
+    Returns:
+    - list[str]: Names of the benchmarks with a regression.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            printy(f'{name}: not in baseline')
+            continue
+        base = baseline[name]
+        throughput_ratio = result['throughput_per_second'] / base['throughput_per_second'] if base['throughput_per_second'] else float('inf')
+        p99_ratio = result['p99_us'] / base['p99_us'] if base['p99_us'] else float('inf')
+        message = f'{name}: throughput x{throughput_ratio:.2f}, p50 {base["p50_us"]:.1f} -> {result["p50_us"]:.1f} us, p99 {base["p99_us"]:.1f} -> {result["p99_us"]:.1f} us'
+        if throughput_ratio < 1 - threshold or p99_ratio > 1 + threshold:
+            printr(message)
+            regressions.append(name)
+        elif throughput_ratio > 1 + threshold:
+            printg(message)
+        else:
+            printn(message)
+    return regressions
+
+def save_json(file_path, data):
+    """
+    Saves data as an indented JSON file, creating its directory when needed.
+
+    Parameters:
+    - file_path (str): Path of the file.
+    - data (dict): Data to save.
+    """
+    directory = os.path.dirname(file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(file_path, mode='w') as json_file:
+        json.dump(data, json_file, indent=2, sort_keys=True)
+
+def main(argv=None):
+    """
+    Runs the benchmarks, saves the results and compares them against the baseline.
+
+    Parameters:
+    - argv (list[str], optional): The arguments, defaults to the arguments of the process.
+
+    Returns:
+    - int: 1 if a regression was found against the baseline, otherwise 0.
+
+    Usage:
+    ```bash
+    python -m benchmarks.run --save-baseline
+    python -m benchmarks.run --filter process_query
+    ```
+
+    """
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run', description='Benchmarks the Cypher direction correction pipeline.')
+    parser.add_argument('--repeat', type=int, default=20, help='Number of times every workload is measured (default: 20).')
+    parser.add_argument('--scale', type=int, default=10, help='Number of times the example queries are repeated in the scaled workload (default: 10).')
+    parser.add_argument('--schema-size', type=int, default=5000, help='Synthetic triples added to every schema of the scaled workload (default: 5000).')
+    parser.add_argument('--filter', default=None, help='Only run the benchmarks whose name contains this text.')
+    parser.add_argument('--output', default=CONST_BENCHMARK_RESULTS_FILE_PATH, help='File where the results are saved.')
+    parser.add_argument('--baseline', default=CONST_BENCHMARK_BASELINE_FILE_PATH, help='File with the baseline results to compare against.')
+    parser.add_argument('--save-baseline', action='store_true', help='Also save the results as the new baseline.')
+    parser.add_argument('--threshold', type=float, default=CONST_BENCHMARK_REGRESSION_THRESHOLD, help='Relative slowdown reported as a regression (default: 0.10).')
+    arguments = parser.parse_args(argv)
+    
+    results = {}
+    for name, (function, calls) in build_benchmarks(arguments.scale, arguments.schema_size).items():
+        if arguments.filter and arguments.filter not in name:
+            continue
+        results[name] = measure(function, calls, arguments.repeat)
+        printb(f'{name}: {results[name]["throughput_per_second"]:.0f} calls/s, p50 {results[name]["p50_us"]:.1f} us, p95 {results[name]["p95_us"]:.1f} us, p99 {results[name]["p99_us"]:.1f} us')
+    
+    report = {
+        'environment': {'python': sys.version.split()[0], 'implementation': platform.python_implementation(), 'platform': platform.platform(), 'cpu_count': os.cpu_count()},
+        'parameters': {'repeat': arguments.repeat, 'scale': arguments.scale, 'schema_size': arguments.schema_size, 'seed': CONST_BENCHMARK_SEED},
+        'results': results,
+    }
+    save_json(arguments.output, report)
+    printn(f'Results saved to {arguments.output}')
+    
+    if arguments.save_baseline:
+        save_json(arguments.baseline, report)
+        printn(f'Baseline saved to {arguments.baseline}')
+        return 0
+    
+    if not os.path.exists(arguments.baseline):
+        printy(f'No baseline found at {arguments.baseline}, use --save-baseline to create it')
+        return 0
+    
+    with open(arguments.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    if baseline.get('parameters') != report['parameters']:
+        printy('The baseline was measured with different parameters, the comparison may not be meaningful')
+    regressions = compare_results(results, baseline['results'], arguments.threshold)
+    printn(f'Regressions: {len(regressions)}')
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,311 @@
+import argparse
+import random
+import sys
+from itertools import product
+from utils.constants import *
+from utils.file_processing import load_schema, write_results
+from utils.query_processing import process_query
+from utils.ui import printg, printn, printr
+
+def letters_name(index):
+    """
+    Converts a number into a name made only of uppercase letters (0 -> A, 25 -> Z, 26 -> AA).
+
+    Names can't have digits, since variables and relationship names in the patterns 
+    are made only of letters.
+
+    Parameters:
+    - index (int): The number to convert.
+
+    Returns:
+    - str: The name.
+    """
+    name = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        name = chr(ord('A') + remainder) + name
+    return name
+
+def variable_name(index):
+    """
+    Converts a number into a lowercase variable name (0 -> a, 25 -> z, 26 -> aa).
+
+    Parameters:
+    - index (int): The number to convert.
+
+    Returns:
+    - str: The variable name.
+    """
+    return letters_name(index).lower()
+
+def generate_schema(label_count, relationship_count, triple_count, seed=CONST_BENCHMARK_SEED):
+    """
+    Generates a random schema with the given number of labels, relationships and triples.
+
+    Parameters:
+    - label_count (int): Number of distinct labels (classes).
+    - relationship_count (int): Number of distinct relationship types.
+    - triple_count (int): Number of distinct (source, relationship, target) triples, 
+      at most label_count * relationship_count * label_count.
+    - seed (int, optional): Seed of the random generator.
+
+    Returns:
+    - list[tuple[str, str, str]]: The triples of the schema.
+
+    Example:
+    ```python
+    triples = generate_schema(label_count=200, relationship_count=50, triple_count=5000)
+    schema_string = format_schema(triples)
+    ```
+
+    """
+    generator = random.Random(seed)
+    labels = [f'Label{letters_name(index)}' for index in range(label_count)]
+    relationships = [f'REL_{letters_name(index)}' for index in range(relationship_count)]
+    triple_count = min(triple_count, label_count * relationship_count * label_count)
+    
+    triples = set()
+    while len(triples) < triple_count:
+        triples.add((generator.choice(labels), generator.choice(relationships), generator.choice(labels)))
+    return sorted(triples)
+
+def format_schema(triples):
+    """
+    Converts schema triples into the schema string format of the CSV files.
+
+    Parameters:
+    - triples (list[tuple[str, str, str]]): The triples of the schema.
+
+    Returns:
+    - str: The schema string, e.g. "(ClassA, REL, ClassB), (ClassC, REL, ClassD)".
+    """
+    return ', '.join(f'({source}, {relationship}, {target})' for source, relationship, target in triples)
+
+def pattern_is_valid(triples_set, source_labels, relationships, target_labels):
+    """
+    Determines if any combination of the given labels and relationships is a triple of the schema.
+
+    Parameters:
+    - triples_set (set[tuple[str, str, str]]): The triples of the schema.
+    - source_labels (list[str]): Labels of the source node.
+    - relationships (list[str]): Relationship alternatives.
+    - target_labels (list[str]): Labels of the target node.
+
+    Returns:
+    - bool: True if at least one combination is in the schema, otherwise False.
+    """
+    return any(triple in triples_set for triple in product(source_labels, relationships, target_labels))
+
+def format_node(variable, labels, properties):
+    """
+    Formats a node of a pattern, e.g. (a:LabelA:LabelB {name: "Foo"}).
+
+    Parameters:
+    - variable (str): The variable of the node.
+    - labels (list[str]): The labels of the node, can be empty.
+    - properties (str): The property map of the node, can be empty.
+
+    Returns:
+    - str: The node.
+    """
+    return '(' + variable + ''.join(':' + label for label in labels) + (' ' + properties if properties else '') + ')'
+
+def format_relationship(relationships, points_right):
+    """
+    Formats a relationship of a pattern, e.g. -[:REL_A|REL_B]-> or <-[:REL_A]-.
+
+    Parameters:
+    - relationships (list[str]): The relationship alternatives.
+    - points_right (bool): Whether the arrow points to the right.
+
+    Returns:
+    - str: The relationship.
+    """
+    types = ':' + '|'.join(relationships)
+    return f'-[{types}]->' if points_right else f'<-[{types}]-'
+
+def generate_queries(triples, count, hops=3, clauses=1, multi_label_share=0.2, alternation_share=0.2, property_share=0.3, wrong_direction_share=0.3, variable_reuse_share=0.3, seed=CONST_BENCHMARK_SEED):
+    """
+    Generates random queries over a schema, together with their known correct version.
+
+    Every clause is a path built with a random walk over the schema triples, so each 
+    relationship is valid in one direction. A share of the relationships is then written 
+    in the wrong direction, but only when the written direction is not valid and the 
+    opposite one is, so the correct query is unambiguous.
+
+    Parameters:
+    - triples (list[tuple[str, str, str]]): The triples of the schema.
+    - count (int): Number of queries to generate.
+    - hops (int, optional): Number of relationships in each path.
+    - clauses (int, optional): Number of MATCH clauses in each query.
+    - multi_label_share (float, optional): Share of nodes with an extra label (:A:B).
+    - alternation_share (float, optional): Share of relationships with extra alternatives (:R1|R2).
+    - property_share (float, optional): Share of nodes with a property map.
+    - wrong_direction_share (float, optional): Share of relationships written in the wrong direction.
+    - variable_reuse_share (float, optional): Share of clauses (after the first one) that 
+      start from a variable of a previous clause, written without labels.
+    - seed (int, optional): Seed of the random generator.
+
+    Yields:
+    - dict: Rows with the `statement`, `schema` and `correct_query` keys.
+
+    Example:
+    ```python
+    triples = generate_schema(50, 10, 500)
+    rows = list(generate_queries(triples, 1000, hops=10, wrong_direction_share=0.5))
+    ```
+
+    """
+    generator = random.Random(seed)
+    schema_string = format_schema(triples)
+    triples_set = set(triples)
+    labels = sorted({triple[0] for triple in triples} | {triple[2] for triple in triples})
+    relationships = sorted({triple[1] for triple in triples})
+    triples_by_label = {}
+    for triple in triples:
+        triples_by_label.setdefault(triple[0], []).append(triple)
+        if triple[2] != triple[0]:
+            triples_by_label.setdefault(triple[2], []).append(triple)
+    
+    for _ in range(count):
+        statement_clauses = []
+        correct_clauses = []
+        declared_variables = []
+        variable_index = 0
+        
+        for clause_index in range(clauses):
+            # First node of the path, a new one or a variable declared in a previous clause
+            if clause_index and generator.random() < variable_reuse_share:
+                variable, node_labels = generator.choice(declared_variables)
+                first_node = format_node(variable, [], CONST_EMPTY_STRING)
+            else:
+                variable = variable_name(variable_index)
+                variable_index += 1
+                node_labels = [generator.choice(triples)[0]]
+                if generator.random() < multi_label_share:
+                    node_labels.append(generator.choice(labels))
+                properties = f'{{name: "{letters_name(generator.randrange(1000))}"}}' if generator.random() < property_share else CONST_EMPTY_STRING
+                first_node = format_node(variable, node_labels, properties)
+                declared_variables.append((variable, node_labels))
+            statement = correct = first_node
+            
+            for _ in range(hops):
+                # Walk through a triple that touches the main label of the current node
+                source, relationship, target = generator.choice(triples_by_label[node_labels[0]])
+                walks_forward = source == node_labels[0] and (target != node_labels[0] or generator.random() < 0.5)
+                next_label = target if walks_forward else source
+                
+                next_variable = variable_name(variable_index)
+                variable_index += 1
+                next_labels = [next_label]
+                if generator.random() < multi_label_share:
+                    next_labels.append(generator.choice(labels))
+                properties = f'{{name: "{letters_name(generator.randrange(1000))}"}}' if generator.random() < property_share else CONST_EMPTY_STRING
+                next_node = format_node(next_variable, next_labels, properties)
+                declared_variables.append((next_variable, next_labels))
+                
+                relationship_names = [relationship]
+                if generator.random() < alternation_share:
+                    relationship_names.append(generator.choice(relationships))
+                
+                # Directions that are valid for the written labels and relationships
+                right_is_valid = pattern_is_valid(triples_set, node_labels, relationship_names, next_labels)
+                left_is_valid = pattern_is_valid(triples_set, next_labels, relationship_names, node_labels)
+                correct_points_right = walks_forward if right_is_valid == left_is_valid else right_is_valid
+                written_points_right = correct_points_right
+                if right_is_valid != left_is_valid and generator.random() < wrong_direction_share:
+                    written_points_right = not correct_points_right
+                
+                statement += format_relationship(relationship_names, written_points_right) + next_node
+                correct += format_relationship(relationship_names, correct_points_right) + next_node
+                node_labels = next_labels
+            
+            statement_clauses.append(f'MATCH {statement}')
+            correct_clauses.append(f'MATCH {correct}')
+        
+        returned_variable = generator.choice(declared_variables)[0]
+        yield {
+            CONST_STATEMENT_KEY: ' '.join(statement_clauses) + f' RETURN {returned_variable}',
+            CONST_SCHEMA_KEY: schema_string,
+            CONST_CORRECT_QUERY_KEY: ' '.join(correct_clauses) + f' RETURN {returned_variable}',
+        }
+
+def check_queries(rows):
+    """
+    Processes generated rows and counts how many results match their correct query.
+
+    Parameters:
+    - rows (iterable[dict]): Rows with the `statement`, `schema` and `correct_query` keys.
+
+    Returns:
+    - tuple: A tuple containing:
+      1. int: Number of correctly processed queries.
+      2. list[dict]: The rows processed incorrectly, with the `result_query` key.
+    """
+    correct_count = 0
+    failed_rows = []
+    for row in rows:
+        row[CONST_RESULT_QUERY_KEY] = process_query(row[CONST_STATEMENT_KEY], load_schema(row[CONST_SCHEMA_KEY]))
+        if row[CONST_RESULT_QUERY_KEY] == row[CONST_CORRECT_QUERY_KEY]:
+            correct_count += 1
+        else:
+            failed_rows.append(row)
+    return correct_count, failed_rows
+
+def main(argv=None):
+    """
+    Generates a synthetic workload, writes it to a file and optionally checks it.
+
+    Parameters:
+    - argv (list[str], optional): The arguments, defaults to the arguments of the process.
+
+    Returns:
+    - int: 1 if some generated query is processed incorrectly, otherwise 0.
+
+    Usage:
+    ```bash
+    python -m benchmarks.synthetic synthetic.csv.gz --queries 100000 --hops 20 --triples 10000
+    python -m benchmarks.synthetic --check --hops 30 --wrong-direction-share 0.5
+    ```
+
+    """
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.synthetic', description='Generates synthetic queries with known correct answers.')
+    parser.add_argument('output', nargs='?', default=None, help='CSV or JSONL file for the generated rows, optionally compressed. Use "-" for the standard output.')
+    parser.add_argument('--labels', type=int, default=50, help='Number of labels in the schema (default: 50).')
+    parser.add_argument('--relationships', type=int, default=20, help='Number of relationship types in the schema (default: 20).')
+    parser.add_argument('--triples', type=int, default=1000, help='Number of triples in the schema (default: 1000).')
+    parser.add_argument('--queries', type=int, default=1000, help='Number of queries (default: 1000).')
+    parser.add_argument('--hops', type=int, default=3, help='Relationships in each path (default: 3).')
+    parser.add_argument('--clauses', type=int, default=1, help='MATCH clauses in each query (default: 1).')
+    parser.add_argument('--multi-label-share', type=float, default=0.2)
+    parser.add_argument('--alternation-share', type=float, default=0.2)
+    parser.add_argument('--property-share', type=float, default=0.3)
+    parser.add_argument('--wrong-direction-share', type=float, default=0.3)
+    parser.add_argument('--variable-reuse-share', type=float, default=0.3)
+    parser.add_argument('--seed', type=int, default=CONST_BENCHMARK_SEED)
+    parser.add_argument('--check', action='store_true', help='Process the generated queries and compare them with the correct ones.')
+    arguments = parser.parse_args(argv)
+    
+    triples = generate_schema(arguments.labels, arguments.relationships, arguments.triples, arguments.seed)
+    rows = generate_queries(triples, arguments.queries, arguments.hops, arguments.clauses,
+                            arguments.multi_label_share, arguments.alternation_share, arguments.property_share,
+                            arguments.wrong_direction_share, arguments.variable_reuse_share, arguments.seed)
+    
+    if arguments.check:
+        rows = list(rows)
+    if arguments.output:
+        write_results(arguments.output, rows)
+    if arguments.check:
+        correct_count, failed_rows = check_queries(rows)
+        for row in failed_rows[:10]:
+            printr(f'Query: {row[CONST_STATEMENT_KEY]}')
+            printr(f'Result query: {row[CONST_RESULT_QUERY_KEY]}')
+            printr(f'Correct query: {row[CONST_CORRECT_QUERY_KEY]}')
+        (printg if not failed_rows else printr)(f'Correct queries: {correct_count}/{len(rows)}')
+        printn(CONST_EMPTY_STRING)
+        return 1 if failed_rows else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+import random
+from utils.constants import CONST_STATEMENT_KEY, CONST_SCHEMA_KEY, CYPHER_QUERIES_CSV_FILE_PATH, CONST_BENCHMARK_SEED
+from utils.cypher_parser import parse_patterns
+from utils.file_processing import read_csv_queries
+from utils.fingerprint import normalize_query, restore_literals
+from utils.query_processing import process_query
+
+def load_example_workload(file_path=CYPHER_QUERIES_CSV_FILE_PATH):
+    """
+    Loads the queries of the example file as a benchmark workload.
+
+    Parameters:
+    - file_path (str, optional): Path of the CSV file, defaults to the example file.
+
+    Returns:
+    - list[tuple[str, str]]: Pairs of query and raw schema string.
+    """
+    return [(row[CONST_STATEMENT_KEY], row[CONST_SCHEMA_KEY]) for row in read_csv_queries(file_path)]
+
+def pad_schema(schema_string, extra_triples, seed=CONST_BENCHMARK_SEED):
+    """
+    Adds synthetic triples to a schema string, to measure the cost of big schemas.
+
+    The synthetic classes and relationships never appear in the queries, so the 
+    expected results of the workload do not change.
+
+    Parameters:
+    - schema_string (str): The raw schema string.
+    - extra_triples (int): Number of triples to add.
+    - seed (int, optional): Seed of the random generator.
+
+    Returns:
+    - str: The schema string with the extra triples.
+    """
+    generator = random.Random(seed)
+    class_count = max(2, extra_triples // 4)
+    triples = [
+        f'(SyntheticClass{generator.randrange(class_count)}, SYNTHETIC_REL_{generator.randrange(class_count)}, SyntheticClass{generator.randrange(class_count)})'
+        for _ in range(extra_triples)
+    ]
+    return ', '.join([schema_string] + triples)
+
+def scale_workload(workload, repeat=1, extra_triples=0):
+    """
+    Builds a bigger workload from a base workload.
+
+    Parameters:
+    - workload (list[tuple[str, str]]): Pairs of query and raw schema string.
+    - repeat (int, optional): Number of times the queries are repeated.
+    - extra_triples (int, optional): Number of synthetic triples added to every schema.
+
+    Returns:
+    - list[tuple[str, str]]: The scaled workload.
+    """
+    padded_schemas = {}
+    scaled_workload = []
+    for _ in range(repeat):
+        for query, schema_string in workload:
+            if schema_string not in padded_schemas:
+                padded_schemas[schema_string] = pad_schema(schema_string, extra_triples) if extra_triples else schema_string
+            scaled_workload.append((query, padded_schemas[schema_string]))
+    return scaled_workload
+
+def vary_literals(workload, copies):
+    """
+    Builds a workload where every query is repeated with different literal values.
+
+    The copies only differ in the text of their literals, so they share a single 
+    template, like production queries that only differ in their parameters.
+
+    Parameters:
+    - workload (list[tuple[str, str]]): Pairs of query and raw schema string.
+    - copies (int): Number of copies of every query.
+
+    Returns:
+    - list[tuple[str, str]]: The workload with the copies.
+    """
+    varied_workload = []
+    for copy in range(copies):
+        for query, schema_string in workload:
+            template, literals = normalize_query(query)
+            varied_workload.append((restore_literals(template, [f'{literal}{copy}' for literal in literals]), schema_string))
+    return varied_workload
+
+def chain_query(hops):
+    """
+    Builds a query with a single path of the given number of hops over the example movies schema.
+
+    Parameters:
+    - hops (int): Number of relationships in the path.
+
+    Returns:
+    - str: The query, with half of the relationships in the wrong direction.
+    """
+    pattern = '(p:Person)'
+    for hop in range(hops):
+        if hop % 2 == 0:
+            pattern += '-[:ACTED_IN]->(m:Movie)' if hop % 4 == 0 else '<-[:ACTED_IN]-(m:Movie)'
+        else:
+            pattern += '<-[:DIRECTED]-(p:Person)' if hop % 4 == 1 else '-[:DIRECTED]->(p:Person)'
+    return f'MATCH {pattern} RETURN p, m'
+
+def adversarial_queries(size):
+    """
+    Builds malformed or extreme queries that make backtracking matchers slow.
+
+    Parameters:
+    - size (int): Number of repetitions of the problematic part of every query.
+
+    Returns:
+    - dict[str, str]: The queries, by name.
+    """
+    return {
+        # Many ways to split the values of an unclosed map, exponential for a backtracking matcher
+        'ambiguous_map': "MATCH (n:Person {a:'x'" + ",a:'x'" * size + " !)-[:ACTED_IN]->(m:Movie) RETURN n",
+        'long_map': 'MATCH (n:Person {' + ', '.join(f'key{index}: "value"' for index in range(size)) + '})-[:ACTED_IN]->(m:Movie) RETURN n',
+        'escaped_string': 'MATCH (n:Person {name: "' + '\\"' * size * 10 + '"})-[:ACTED_IN]->(m:Movie) RETURN n',
+        'unterminated_string': 'MATCH (n:Person {name: "' + 'x' * size * 10 + ')-[:ACTED_IN]->(m:Movie) RETURN n',
+        'nested_lists': 'MATCH (n:Person {tags: ' + '[' * size + '1' + ']' * size + '})-[:ACTED_IN]->(m:Movie) RETURN n',
+        'unclosed_maps': 'MATCH (n:Person ' + '{a: ' * size + ')-[:ACTED_IN]->(m:Movie) RETURN n',
+        'whitespace_runs': 'MATCH (n:Person' + ' ' * size * 10 + '{name: "x"}' + ' ' * size * 10 + 'x)-[:ACTED_IN]->(m:Movie) RETURN n',
+        'open_parentheses': 'MATCH ' + '(' * size * 10 + 'n)-[:ACTED_IN]->(m:Movie) RETURN n',
+        'open_relationships': 'MATCH (n:Person)' + '-[' * size * 10 + ']->(m:Movie) RETURN n',
+    }
+
+def pattern_checks(workload):
+    """
+    Extracts the arguments of the schema checks done for every pattern of a workload.
+
+    Parameters:
+    - workload (list[tuple[str, CompiledSchema]]): Pairs of query and compiled schema.
+
+    Returns:
+    - list[tuple]: Arguments for `pattern_exists_in_schema_multiple`, one tuple per pattern 
+      with at least one class or relationship defined.
+    """
+    checks = []
+    for query, schema in workload:
+        for pattern in parse_patterns(query):
+            source_classes, target_classes = pattern.node_a.classes, pattern.node_b.classes
+            if pattern.relationship.left_arrow:
+                source_classes, target_classes = target_classes, source_classes
+            rels_names = pattern.relationship.types
+            if source_classes is None and target_classes is None and rels_names is None:
+                continue
+            checks.append((source_classes, target_classes, rels_names, schema, source_classes is not None, target_classes is not None, rels_names is not None))
+    return checks
+
+def toggle_triple(schema, triple):
+    """
+    Adds a triple to a mutable schema and removes it again.
+
+    Parameters:
+    - schema (MutableSchema): The schema.
+    - triple (tuple[str, str, str]): The (sourceClass, relationship, targetClass) triple, not in the schema.
+    """
+    schema.add_triple(*triple)
+    schema.remove_triple(*triple)
+
+def process_after_update(query, schema, cache, triple):
+    """
+    Processes a query with a cache right after a triple of its mutable schema changed.
+
+    Parameters:
+    - query (str): The query.
+    - schema (MutableSchema): The schema.
+    - cache (QueryResultCache): The cache of results.
+    - triple (tuple[str, str, str]): The triple toggled before processing the query (see `toggle_triple`).
+
+    Returns:
+    - str: The processed query.
+    """
+    toggle_triple(schema, triple)
+    return process_query(query, schema, cache=cache)
+
+def wide_pattern_checks(schema, count, labels_per_node=3, alternatives=3, seed=CONST_BENCHMARK_SEED):
+    """
+    Builds schema checks of nodes with several classes and relationships with several alternatives.
+
+    Parameters:
+    - schema (CompiledSchema): The schema the names are taken from.
+    - count (int): Number of checks.
+    - labels_per_node (int, optional): Number of classes of every node.
+    - alternatives (int, optional): Number of alternative relationships.
+    - seed (int, optional): Seed of the random generator.
+
+    Returns:
+    - list[tuple]: Arguments for `pattern_exists_in_schema_multiple`, with every part defined.
+    """
+    generator = random.Random(seed)
+    classes = sorted(schema.classes)
+    relationships = sorted(schema.relationships)
+    return [(generator.sample(classes, labels_per_node), generator.sample(classes, labels_per_node), generator.sample(relationships, alternatives), schema, True, True, True) for _ in range(count)]
@@ -0,0 +1,127 @@
+import argparse
+import logging
+import os
+import sys
+from collections import deque
+from utils.batch_processing import iter_process_queries
+from utils.constants import *
+from utils.file_processing import detect_file_format, read_queries, write_results
+from utils.diagnostics import configure_logging, logger
+from utils.ui import ColoredConsoleHandler, set_console_stream, printn
+
+def parse_arguments(argv=None):
+    """
+    Parses the command-line arguments.
+
+    Parameters:
+    - argv (list[str], optional): The arguments, defaults to the arguments of the process.
+
+    Returns:
+    - argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m cli',
+        description='Validates and fixes the direction of relationships in Cypher queries based on their schemas.')
+    parser.add_argument('input', nargs='?', default=CONST_STANDARD_STREAM_PATH,
+                        help='CSV or JSONL file with the statement and schema columns, optionally compressed '
+                             '(gzip, bzip2 or xz). Use "-" for the standard input (default).')
+    parser.add_argument('output', nargs='?', default=CONST_STANDARD_STREAM_PATH,
+                        help='File where the rows are written with the result_query column, compressed based on '
+                             'its extension. Use "-" for the standard output (default).')
+    parser.add_argument('-f', '--format', choices=[CONST_FORMAT_CSV, CONST_FORMAT_JSONL], default=None,
+                        help='Format of the input, detected from its extension when not provided (CSV for "-").')
+    parser.add_argument('--output-format', choices=[CONST_FORMAT_CSV, CONST_FORMAT_JSONL], default=None,
+                        help='Format of the output, defaults to the format of the input.')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='Number of worker processes, 0 to use all the CPUs (default: 1). With more than '
+                             'one worker, rows are written a chunk at a time instead of one at a time.')
+    parser.add_argument('-c', '--chunksize', type=int, default=CONST_BATCH_CHUNK_SIZE,
+                        help=f'Number of queries sent to a worker at once (default: {CONST_BATCH_CHUNK_SIZE}).')
+    parser.add_argument('--vectorized', action='store_true',
+                        help='Validate every chunk at once, looking up its patterns with NumPy when it is installed.')
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument('-q', '--quiet', action='store_true',
+                           help='Do not print diagnostic messages and the summary to the standard error.')
+    verbosity.add_argument('-v', '--verbose', action='store_true',
+                           help='Print every diagnostic message, not only the reasons to return an empty query. '
+                                'Messages of worker processes are not printed.')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """
+    Runs the command-line interface.
+
+    Rows are read, processed and written one at a time (a chunk at a time with several 
+    workers), so the command can be used in a shell pipeline. A row that fails, e.g. with a 
+    malformed schema, gets an empty result and a warning instead of stopping the command. 
+    Diagnostic messages and the summary go to the standard error.
+
+    Parameters:
+    - argv (list[str], optional): The arguments, defaults to the arguments of the process.
+
+    Returns:
+    - int: The exit code of the process.
+
+    Usage:
+    ```bash
+    python -m cli queries.jsonl.gz results.csv --workers 8
+    cat queries.csv | python -m cli --quiet > results.csv
+    ```
+
+    """
+    arguments = parse_arguments(argv)
+    input_format = arguments.format or detect_file_format(arguments.input)
+    output_format = arguments.output_format or (input_format if arguments.output == CONST_STANDARD_STREAM_PATH else detect_file_format(arguments.output))
+    workers = arguments.workers or None
+    
+    # The standard output may carry the results, so messages go to the standard error
+    set_console_stream(sys.stderr)
+    if arguments.quiet:
+        configure_logging(None)
+    else:
+        configure_logging(logging.DEBUG if arguments.verbose else logging.WARNING, ColoredConsoleHandler(sys.stderr))
+    
+    rows = read_queries(arguments.input, input_format)
+    counts = {'total': 0, 'fixed': 0, 'empty': 0, 'failed': 0}
+    # Rows read but not yet written, the results come back in the same order
+    pending_rows = deque()
+    
+    def queries_and_schemas():
+        for row in rows:
+            pending_rows.append(row)
+            yield row[CONST_STATEMENT_KEY], row[CONST_SCHEMA_KEY]
+    
+    def processed_rows():
+        for result_query, error in iter_process_queries(queries_and_schemas(), workers, arguments.chunksize, vectorized=arguments.vectorized, errors=True):
+            row = pending_rows.popleft()
+            counts['total'] += 1
+            if error is not None:
+                # A malformed row doesn't stop the command, it gets an empty result
+                logger.warning('Error processing query %s: %s', row[CONST_STATEMENT_KEY], error)
+                row[CONST_RESULT_QUERY_KEY] = CONST_EMPTY_STRING
+                counts['failed'] += 1
+                yield row
+                continue
+            row[CONST_RESULT_QUERY_KEY] = result_query
+            if result_query == CONST_EMPTY_STRING:
+                counts['empty'] += 1
+            elif result_query != row[CONST_STATEMENT_KEY]:
+                counts['fixed'] += 1
+            yield row
+    
+    # Rows are flushed one by one when writing to the standard output, to work inside a pipeline
+    batch_size = 1 if arguments.output == CONST_STANDARD_STREAM_PATH else CONST_WRITE_BATCH_SIZE
+    try:
+        write_results(arguments.output, processed_rows(), output_format, batch_size)
+    except BrokenPipeError:
+        # The reader of the pipeline exited (e.g. head), silence the remaining output
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    
+    if not arguments.quiet:
+        printn(f'Processed queries: {counts["total"]}, fixed: {counts["fixed"]}, empty: {counts["empty"]}, failed: {counts["failed"]}')
+    
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,41 +1,10 @@
+import logging
 from utils.ui import *
 from utils.file_processing import *
 from utils.constants import CONST_EMPTY_STRING, CONST_STATEMENT_KEY, CONST_SCHEMA_KEY, CONST_CORRECT_QUERY_KEY
-from utils.patterns_processing import process_general_pattern, process_short_rel_pattern
+from utils.query_processing import process_query
+from utils.diagnostics import configure_logging
 
-def process_query(query, schema):
-    """
-    Processes and adjusts the provided Cypher query based on the given schema.
-
-    This function takes a Cypher query and a schema as input. It searches for 
-    specific patterns within the query and verifies the direction of relationships 
-    based on the provided schema. If any discrepancies are found, the function 
-    adjusts the query to align with the schema.
-
-    Parameters:
-    - query (str): The Cypher query to be processed.
-    - schema (object): The schema against which the query is to be validated and corrected.
-
-    Returns:
-    - str: The processed and corrected Cypher query.
-
-    Example:
-    ```python
-    query = "MATCH (a)-[r]->(b) RETURN a, b"
-    processed_query = process_query(query, my_schema)
-    ```
-
-    Note:
-    - The function calls two internal methods:
-      1. process_general_pattern: For general pattern checking and correction.
-      2. process_short_rel_pattern: For checking and correcting short relationship patterns.
-    """
-    # Search for patterns, check if the direction is correct by analyzing the schema and corrects it whenever is needed
-    query = process_general_pattern(query, schema)
-    query = process_short_rel_pattern(query, schema)
-    
-    return query
-    
 def process_all_queries():
     """
     Processes all Cypher queries from a predefined CSV file and validates their correctness.
@@ -90,6 +59,9 @@ def process_all_queries():
     return correct_count, incorrect_count, correct_with_warnings_count, len(cypher_queries)
             
 def main():
+    # Show every diagnostic message of the processing, with colors
+    configure_logging(logging.DEBUG)
+    
     printn('Starting process')
     printn(CONST_EMPTY_STRING)
     
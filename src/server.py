@@ -0,0 +1,52 @@
+import argparse
+import asyncio
+import logging
+import sys
+from utils.constants import *
+from utils.diagnostics import configure_logging
+from utils.http_service import serve
+from utils.result_cache import QueryResultCache, SqliteResultBackend
+from utils.ui import ColoredConsoleHandler, printn
+
+def main(argv=None):
+    """
+    Runs the HTTP correction service.
+
+    Parameters:
+    - argv (list[str], optional): The arguments, defaults to the arguments of the process.
+
+    Returns:
+    - int: The exit code of the process.
+
+    Usage:
+    ```bash
+    python -m server --port 8080 --workers 4
+    curl -d '{"query": "MATCH (a:Person)<-[:KNOWS]-(b:Person) RETURN a", "schema": "(Person, KNOWS, Person)"}' localhost:8080/process
+    ```
+
+    """
+    parser = argparse.ArgumentParser(prog='python -m server', description='Serves the Cypher direction correction as a JSON HTTP endpoint.')
+    parser.add_argument('--host', default=CONST_SERVER_HOST, help=f'Address to listen on (default: {CONST_SERVER_HOST}).')
+    parser.add_argument('--port', type=int, default=CONST_SERVER_PORT, help=f'Port to listen on (default: {CONST_SERVER_PORT}).')
+    parser.add_argument('-w', '--workers', type=int, default=0, help='Number of worker processes, 0 to use all the CPUs (default: 0).')
+    parser.add_argument('--batch-size', type=int, default=CONST_SERVER_BATCH_SIZE, help=f'Maximum queries in a micro-batch (default: {CONST_SERVER_BATCH_SIZE}).')
+    parser.add_argument('--batch-window', type=float, default=CONST_SERVER_BATCH_WINDOW, help=f'Seconds waited to fill a micro-batch (default: {CONST_SERVER_BATCH_WINDOW}).')
+    parser.add_argument('--queue-size', type=int, default=CONST_SERVER_QUEUE_SIZE, help=f'Maximum queued queries before answering 503 (default: {CONST_SERVER_QUEUE_SIZE}).')
+    parser.add_argument('--cache-size', type=int, default=0, help='Results kept in the memory cache of each worker, 0 to disable the cache (default: 0).')
+    parser.add_argument('--cache-file', default=None, help='SQLite file shared by the workers to persist the results.')
+    arguments = parser.parse_args(argv)
+    
+    cache = None
+    if arguments.cache_size or arguments.cache_file:
+        cache = QueryResultCache(arguments.cache_size or CONST_RESULT_CACHE_SIZE, SqliteResultBackend(arguments.cache_file) if arguments.cache_file else None)
+    
+    configure_logging(logging.WARNING, ColoredConsoleHandler(sys.stderr))
+    printn(f'Listening on http://{arguments.host}:{arguments.port}{CONST_SERVER_PROCESS_PATH}')
+    try:
+        asyncio.run(serve(arguments.host, arguments.port, arguments.workers or None, arguments.batch_size, arguments.batch_window, arguments.queue_size, cache))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import time
+import unittest
+from utils.cypher_parser import parse_query, parse_patterns, scan_property_map
+from utils.file_processing import load_schema
+from utils.query_processing import process_query
+
+SCHEMA = load_schema('(Person, KNOWS, Person), (Person, WORKS_AT, Company)')
+
+class PropertyMapTest(unittest.TestCase):
+    def assertScansWhole(self, property_map):
+        self.assertEqual(scan_property_map(property_map, 0), len(property_map), property_map)
+
+    def test_escaped_quotes(self):
+        self.assertScansWhole('{name: "say \\"hi\\"", nick: \'it\\\'s\'}')
+        self.assertScansWhole('{text: "a } b ] c"}')
+
+    def test_numeric_and_parameter_values(self):
+        self.assertScansWhole('{age: 42, score: -1.5e3, ratio: .5e1, id: $id, key: $`odd key`, ok: true, missing: null}')
+
+    def test_lists_and_nested_maps(self):
+        self.assertScansWhole('{tags: ["x", 1, [2, $p]], empty: [], nested: {inner: {deep: "v"}}, none: {}}')
+
+    def test_malformed_maps(self):
+        for property_map in ('{name: "John"', '{name "John"}', '{name: }', '{: 1}', '{a: 1,}', '{a: [1, 2}', '{a: "unterminated}'):
+            self.assertIsNone(scan_property_map(property_map, 0), property_map)
+
+    def test_ambiguous_unclosed_map_is_linear(self):
+        # Used to backtrack exponentially with the CONST_PATTERN_PROPERTIES regex
+        property_map = '{' + "a:'x'," * 5000 + ' !)'
+        start = time.perf_counter()
+        self.assertIsNone(scan_property_map(property_map, 0))
+        self.assertLess(time.perf_counter() - start, 1)
+
+class ParseQueryTest(unittest.TestCase):
+    def test_properties_are_skipped(self):
+        query = 'MATCH (a:Person {name: "x)<-[:KNOWS]-(y", age: $age})-[r:KNOWS {since: 2020}]->(b) RETURN a'
+        [pattern] = parse_patterns(query)
+        self.assertEqual(pattern.node_a.classes, ['Person'])
+        self.assertEqual(pattern.relationship.variable, 'r')
+        self.assertEqual(pattern.relationship.types, ['KNOWS'])
+        self.assertEqual(query[pattern.node_b.start:pattern.node_b.end], '(b)')
+
+    def test_multi_hop_chain(self):
+        query = 'MATCH (a:Person)-[:KNOWS]->(b)<-[:KNOWS|LIKES]-(c:Person)-->(d:`Company`) RETURN a'
+        patterns, symbol_table = parse_query(query)
+        self.assertEqual([query[pattern.start:pattern.end] for pattern in patterns], [
+            '(a:Person)-[:KNOWS]->(b)',
+            '(b)<-[:KNOWS|LIKES]-(c:Person)',
+            '(c:Person)-->(d:`Company`)',
+        ])
+        # Consecutive patterns share their node
+        self.assertEqual(patterns[0].node_b, patterns[1].node_a)
+        self.assertEqual(patterns[1].node_b, patterns[2].node_a)
+        self.assertEqual(patterns[1].relationship.types, ['KNOWS', 'LIKES'])
+        self.assertEqual(symbol_table, {'a': ['Person'], 'c': ['Person'], 'd': ['Company']})
+
+    def test_arrows(self):
+        query = 'MATCH (a)-[:R]->(b), (c)<-[:R]-(d), (e)-[:R]-(f), (g)-->(h), (i)<--(j), (k)--(l) RETURN a'
+        arrows = [(pattern.relationship.left_arrow, pattern.relationship.right_arrow, pattern.relationship.is_short) for pattern in parse_patterns(query)]
+        self.assertEqual(arrows, [
+            (False, True, False),
+            (True, False, False),
+            (False, False, False),
+            (False, True, True),
+            (True, False, True),
+            (False, False, True),
+        ])
+
+    def test_first_declaration_is_kept(self):
+        symbol_table = parse_query('MATCH (a:Person:`Employee`)-->(b), (a:Company)-->(b:Person) RETURN a')[1]
+        self.assertEqual(symbol_table, {'a': ['Person', 'Employee'], 'b': ['Person']})
+
+class ProcessQueryTest(unittest.TestCase):
+    def test_multi_hop_corrections(self):
+        query = 'MATCH (p:Person)<-[:WORKS_AT]-(c:Company)<-[:WORKS_AT]-(q:Person) RETURN p'
+        self.assertEqual(process_query(query, SCHEMA), 'MATCH (p:Person)-[:WORKS_AT]->(c:Company)<-[:WORKS_AT]-(q:Person) RETURN p')
+
+    def test_undirected_hops_are_not_corrected(self):
+        for query in ('MATCH (c:Company)-[:WORKS_AT]-(p:Person) RETURN p', 'MATCH (c:Company)--(p:Person) RETURN p'):
+            self.assertEqual(process_query(query, SCHEMA), query)
+
+    def test_literals_are_not_rewritten(self):
+        query = 'MATCH (p:Person {note: "x)<-[:WORKS_AT]-(y", id: $id})<-[:WORKS_AT]-(c:Company) RETURN p'
+        self.assertEqual(process_query(query, SCHEMA), 'MATCH (p:Person {note: "x)<-[:WORKS_AT]-(y", id: $id})-[:WORKS_AT]->(c:Company) RETURN p')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import time
+import unittest
+from utils.constants import CONST_LITERAL_PLACEHOLDER as P
+from utils.fingerprint import normalize_query, restore_literals
+
+class NormalizeQueryTest(unittest.TestCase):
+    def assertRoundTrip(self, query):
+        template, literals = normalize_query(query)
+        self.assertEqual(restore_literals(template, literals), query)
+        return template, literals
+
+    def test_values_share_the_template(self):
+        template, literals = self.assertRoundTrip('MATCH (a {id:"Foo"}) RETURN a LIMIT 10')
+        self.assertEqual(template, f'MATCH (a {{id:"{P}"}}) RETURN a LIMIT {P}')
+        self.assertEqual(literals, ['Foo', '10'])
+        self.assertEqual(normalize_query('MATCH (a {id:"Bar"}) RETURN a LIMIT 5')[0], template)
+
+    def test_escaped_quotes(self):
+        template, literals = self.assertRoundTrip('RETURN "say \\"hi\\"", \'it\\\'s\', "a\'b"')
+        self.assertEqual(template, f'RETURN "{P}", \'{P}\', "{P}"')
+        self.assertEqual(literals, ['say \\"hi\\"', "it\\'s", "a'b"])
+
+    def test_numbers_in_names_and_parameters_are_kept(self):
+        template, literals = self.assertRoundTrip('MATCH (n1:Label2 {v: $p1, w: 1.5e3}) RETURN n1 SKIP 3')
+        self.assertEqual(template, f'MATCH (n1:Label2 {{v: $p1, w: {P}}}) RETURN n1 SKIP {P}')
+        self.assertEqual(literals, ['1.5e3', '3'])
+
+    def test_comments_and_quoted_names_are_kept(self):
+        query = 'MATCH (a:`Odd "1"`) // it\'s 2\n/* "x" 3 */ RETURN a'
+        self.assertEqual(self.assertRoundTrip(query), (query, []))
+
+    def test_unterminated_tokens_stop_masking(self):
+        for query in ('RETURN 1, "abc 2', "RETURN 1, 'abc 2", 'RETURN 1 /* 2', 'RETURN 1, `a 2'):
+            template, literals = self.assertRoundTrip(query)
+            self.assertEqual(literals, ['1'], query)
+
+    def test_unterminated_string_is_linear(self):
+        # Used to rescan the rest of the query from every quote
+        query = 'RETURN ' + '"a' * 20000
+        start = time.perf_counter()
+        self.assertRoundTrip(query)
+        self.assertLess(time.perf_counter() - start, 1)
+
+    def test_placeholder_in_query(self):
+        self.assertIsNone(normalize_query(f'RETURN "{P}"'))
+
+class RestoreLiteralsTest(unittest.TestCase):
+    def test_empty_template(self):
+        self.assertEqual(restore_literals('', ['1']), '')
+
+    def test_placeholder_mismatch(self):
+        with self.assertRaises(ValueError):
+            restore_literals(f'RETURN {P}, {P}', ['1'])
+
+if __name__ == '__main__':
+    unittest.main()
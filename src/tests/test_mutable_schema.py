@@ -0,0 +1,125 @@
+import os
+import random
+import tempfile
+import unittest
+from utils.constants import CONST_SOURCE_CLASS_KEY, CONST_RELATIONSHIP_KEY, CONST_TARGET_CLASS_KEY
+from utils.query_processing import process_query
+from utils.result_cache import QueryResultCache, SqliteResultBackend
+from utils.schema import CompiledSchema, MutableSchema
+
+INDEXES = ['triples', 'source_relationships', 'relationship_targets', 'source_targets', 'source_classes', 'target_classes', 'classes', 'relationships']
+
+BITSET_INDEXES = {
+    # name: (decoders of the key, decoder of the bits)
+    'targets_by_source_relationship': (('class', 'relationship'), 'class'),
+    'relationships_by_source_target': (('class', 'class'), 'relationship'),
+    'targets_by_source': ('class', 'class'),
+    'relationships_by_source': ('class', 'relationship'),
+    'relationships_by_target': ('class', 'relationship'),
+}
+
+def schema_items(triples):
+    return [{CONST_SOURCE_CLASS_KEY: source, CONST_RELATIONSHIP_KEY: rel, CONST_TARGET_CLASS_KEY: target} for source, rel, target in triples]
+
+def decode_bitsets(schema, index_name):
+    """
+    Translates a bitset index into names, since a mutable schema doesn't intern the names in the same order.
+    """
+    names = {
+        'class': {id: name for name, id in schema.class_ids.items()},
+        'relationship': {id: name for name, id in schema.relationship_ids.items()},
+    }
+    key_kinds, bit_kind = BITSET_INDEXES[index_name]
+    decoded = {}
+    for key, mask in getattr(schema, index_name).items():
+        decoded_key = tuple(names[kind][id] for kind, id in zip(key_kinds, key)) if isinstance(key, tuple) else names[key_kinds][key]
+        decoded[decoded_key] = frozenset(name for id, name in names[bit_kind].items() if mask >> id & 1)
+    return decoded
+
+class MutableSchemaIndexesTest(unittest.TestCase):
+    def assertSameIndexes(self, mutable_schema, triples):
+        compiled_schema = CompiledSchema(schema_items(triples))
+        for index_name in INDEXES:
+            self.assertEqual(set(getattr(mutable_schema, index_name)), set(getattr(compiled_schema, index_name)), index_name)
+        for index_name in BITSET_INDEXES:
+            self.assertEqual(decode_bitsets(mutable_schema, index_name), decode_bitsets(compiled_schema, index_name), index_name)
+        self.assertEqual(mutable_schema.fingerprint, compiled_schema.fingerprint)
+        self.assertEqual(len(mutable_schema), len(compiled_schema))
+
+    def test_updates_match_a_compiled_schema(self):
+        rng = random.Random(1)
+        classes = [f'Class{index}' for index in range(6)]
+        relationships = [f'REL_{index}' for index in range(3)]
+        mutable_schema = MutableSchema()
+        triples = set()
+        for _ in range(500):
+            triple = (rng.choice(classes), rng.choice(relationships), rng.choice(classes))
+            if rng.random() < 0.6:
+                self.assertEqual(mutable_schema.add_triple(*triple), triple not in triples)
+                triples.add(triple)
+            else:
+                self.assertEqual(mutable_schema.remove_triple(*triple), triple in triples)
+                triples.discard(triple)
+            self.assertSameIndexes(mutable_schema, triples)
+
+    def test_removing_every_triple_empties_the_indexes(self):
+        triples = [('Person', 'KNOWS', 'Person'), ('Person', 'WORKS_AT', 'Company'), ('Company', 'LOCATED_IN', 'City')]
+        mutable_schema = MutableSchema(schema_items(triples))
+        self.assertSameIndexes(mutable_schema, triples)
+        for triple in triples:
+            mutable_schema.remove_triple(*triple)
+        self.assertSameIndexes(mutable_schema, [])
+
+class MutableSchemaInvalidationTest(unittest.TestCase):
+    def setUp(self):
+        self.schema = MutableSchema(schema_items([('Person', 'KNOWS', 'Person'), ('Person', 'WORKS_AT', 'Company'), ('Movie', 'IN_GENRE', 'Genre')]))
+        self.cache = QueryResultCache()
+        self.queries = {
+            'works_at': 'MATCH (p:Person)<-[:WORKS_AT]-(c:Company) RETURN p',
+            'knows': 'MATCH (a:Person)-[:KNOWS]->(b:Person) RETURN a',
+            'genre': 'MATCH (m:Movie)-[:IN_GENRE]->(g:Genre) RETURN m',
+            'acted_in': 'MATCH (a:Actor)-[:ACTED_IN]->(m) RETURN a',
+        }
+        for query in self.queries.values():
+            process_query(query, self.schema, cache=self.cache)
+
+    def cached_queries(self):
+        return {name for name, query in self.queries.items() if (self.schema.cache_key, query) in self.cache.entries}
+
+    def assertResultsAreFresh(self):
+        compiled_schema = CompiledSchema(list(self.schema))
+        for query in self.queries.values():
+            self.assertEqual(process_query(query, self.schema, cache=self.cache), process_query(query, compiled_schema))
+
+    def test_adding_a_triple_only_invalidates_the_dependent_results(self):
+        self.assertTrue(self.schema.add_triple('Actor', 'ACTED_IN', 'Movie'))
+        # 'genre' refers to Movie and 'acted_in' to Actor and ACTED_IN
+        self.assertEqual(self.cached_queries(), {'works_at', 'knows'})
+        self.assertResultsAreFresh()
+
+    def test_removing_a_triple_only_invalidates_the_dependent_results(self):
+        self.assertTrue(self.schema.remove_triple('Person', 'WORKS_AT', 'Company'))
+        # Every query on Person depends on the removed triple
+        self.assertEqual(self.cached_queries(), {'genre', 'acted_in'})
+        self.assertResultsAreFresh()
+
+    def test_unchanged_schema_keeps_every_result(self):
+        self.assertFalse(self.schema.add_triple('Person', 'KNOWS', 'Person'))
+        self.assertFalse(self.schema.remove_triple('Person', 'LIKES', 'Person'))
+        self.assertEqual(self.cached_queries(), set(self.queries))
+
+    def test_results_are_not_persisted(self):
+        # The cache key of a mutable schema is unique to the instance, so the backend is never used
+        with tempfile.TemporaryDirectory() as directory:
+            backend = SqliteResultBackend(os.path.join(directory, 'results.sqlite3'))
+            cache = QueryResultCache(backend=backend)
+            query = self.queries['works_at']
+            for _ in range(2):
+                process_query(query, self.schema, cache=cache)
+            self.schema.add_triple('Company', 'WORKS_AT', 'Person')
+            process_query(query, self.schema, cache=cache)
+            self.assertEqual(cache.backend_hits, 0)
+            self.assertEqual(backend.connection, None)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+from utils.cypher_parser import parse_patterns
+from utils.query_edits import QueryEdit, apply_edits, reverse_direction_edit
+
+class ApplyEditsTest(unittest.TestCase):
+    def test_no_edits(self):
+        self.assertEqual(apply_edits('(a)<--(b)', []), '(a)<--(b)')
+
+    def test_order_of_the_list_is_ignored(self):
+        edits = [QueryEdit(9, 12, '-->'), QueryEdit(3, 6, '<--')]
+        self.assertEqual(apply_edits('(a)-->(b)<--(c)', edits), '(a)<--(b)-->(c)')
+        self.assertEqual(apply_edits('(a)-->(b)<--(c)', edits[::-1]), '(a)<--(b)-->(c)')
+
+    def test_replacements_of_another_length(self):
+        self.assertEqual(apply_edits('(a)-->(b)', [QueryEdit(1, 2, 'long'), QueryEdit(3, 6, '-')]), '(long)-(b)')
+
+    def test_adjacent_edits(self):
+        self.assertEqual(apply_edits('abcd', [QueryEdit(2, 4, 'CD'), QueryEdit(0, 2, 'AB')]), 'ABCD')
+
+    def test_overlapping_edits(self):
+        with self.assertRaises(ValueError):
+            apply_edits('abcd', [QueryEdit(0, 3, 'X'), QueryEdit(2, 4, 'Y')])
+
+class ReverseDirectionEditTest(unittest.TestCase):
+    def test_reversed_relationships(self):
+        cases = {
+            '(a)<-[:R]-(b)': '(a)-[:R]->(b)',
+            '(a)-[r:R {w: 1}]->(b)': '(a)<-[r:R {w: 1}]-(b)',
+            '(a)-->(b)': '(a)<--(b)',
+            '(a)<--(b)': '(a)-->(b)',
+        }
+        for query, expected in cases.items():
+            [pattern] = parse_patterns(query)
+            self.assertEqual(apply_edits(query, [reverse_direction_edit(query, pattern.relationship)]), expected, query)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,211 @@
+import asyncio
+from .constants import CONST_ASYNC_CONCURRENCY
+from .batch_processing import resolve_schema
+from .cypher_parser import has_relationships
+from .query_processing import process_query
+from .schema import compile_schema
+from .schema_registry import schema_registry
+
+# Result cache of the current executor, set once by `init_correction_worker`
+executor_cache = None
+
+# Registered schemas resolved by the current executor, by schema ID and version
+executor_schemas = {}
+
+def init_correction_worker(cache=None):
+    """
+    Initializes an executor with a cache of results, see `correct_query`.
+
+    Pass it as the initializer of the executor, so the cache is sent once to every 
+    worker process instead of with every query: each worker gets its own memory cache 
+    and opens the persistent backend (if any) once. With a thread pool, the threads 
+    share the cache.
+
+    Parameters:
+    - cache (QueryResultCache, optional): Cache of results.
+
+    Usage:
+    ```python
+    executor = ProcessPoolExecutor(initializer=init_correction_worker, initargs=(cache,))
+    ```
+    """
+    global executor_cache
+    executor_cache = cache
+
+def correct_in_executor(query, schema, schema_key=None):
+    """
+    Processes a query inside an executor (a thread or a worker process).
+
+    Schema strings are compiled through `load_schema`, so every process parses a given 
+    schema string only once. A registered schema is resolved by its key instead: a 
+    registered version never changes, so every process resolves it once and then finds 
+    it by ID and version. The cache of the executor is used, if it was initialized 
+    with one by `init_correction_worker`.
+
+    Parameters:
+    - query (str): The Cypher query.
+    - schema (str, list[dict] or CompiledSchema): The schema, only resolved if its key is not known yet.
+    - schema_key (tuple, optional): The ID, version and fingerprint of a registered schema.
+
+    Returns:
+    - str: The processed query.
+    """
+    if schema_key is None:
+        return process_query(query, resolve_schema(schema), executor_cache)
+    compiled_schema = executor_schemas.get(schema_key)
+    if compiled_schema is None:
+        compiled_schema = executor_schemas[schema_key] = resolve_schema(schema)
+    return process_query(query, compiled_schema, executor_cache)
+
+def resolve_executor_schema(schema=None, schema_id=None, schema_version=None, registry=None):
+    """
+    Returns the schema sent to the executor for a schema or a registered schema ID.
+
+    A registered schema is sent with its key, see `correct_in_executor`, and as the 
+    string it was registered from when there is one, which is cheaper to send to a 
+    worker process than the compiled schema. Worker processes don't share the registry 
+    of the caller, so the schema itself is still sent for the workers that don't know 
+    the key yet.
+
+    Parameters:
+    - schema (str, list[dict] or CompiledSchema, optional): The schema.
+    - schema_id (str, optional): ID of a registered schema, used instead of `schema`.
+    - schema_version (int, optional): Version of the registered schema, defaults to the latest one.
+    - registry (SchemaRegistry, optional): Registry of the schema ID, defaults to `schema_registry`.
+
+    Returns:
+    - tuple: A tuple containing:
+      1. str, list[dict] or CompiledSchema: The schema.
+      2. tuple or None: The ID, version and fingerprint of the registered schema, or None for `schema`.
+
+    Raises:
+    - ValueError: If neither `schema` nor `schema_id` is given.
+    - UnknownSchemaError: If the schema ID or version is not registered.
+    """
+    if schema is not None:
+        return schema, None
+    if schema_id is None:
+        raise ValueError('A schema or a schema ID is needed')
+    registered_schema = (registry if registry is not None else schema_registry).get_version(schema_id, schema_version)
+    # The fingerprint tells apart the schemas registered under the same ID in different registries
+    schema_key = (schema_id, registered_schema.version, registered_schema.schema.fingerprint)
+    return (registered_schema.source if registered_schema.source is not None else registered_schema.schema), schema_key
+
+async def correct_resolved_query(query, schema, schema_key, executor, timeout):
+    """
+    Processes a query whose schema was resolved by `resolve_executor_schema`, see `correct_query`.
+    """
+    if not has_relationships(query):
+        return process_query(query, schema)
+    
+    future = asyncio.get_running_loop().run_in_executor(executor, correct_in_executor, query, schema, schema_key)
+    return await asyncio.wait_for(future, timeout)
+
+async def correct_query(query, schema=None, *, executor=None, timeout=None, schema_id=None, schema_version=None, registry=None):
+    """
+    Processes a Cypher query without blocking the event loop.
+
+    The query is processed by `process_query` in an executor, so other tasks (e.g. calls 
+    to a language model or to the database) keep running in the meantime.
+
+    Parameters:
+    - query (str): The Cypher query.
+    - schema (str, list[dict] or CompiledSchema, optional): The schema. Prefer the schema 
+      string with a process pool, each worker parses it only once.
+    - executor (concurrent.futures.Executor, optional): Executor of the processing, defaults to 
+      the default executor of the event loop (a thread pool). Use a `ProcessPoolExecutor` 
+      to process several queries in parallel.
+    - timeout (float, optional): Seconds to wait for the result, without limit by default.
+    - schema_id (str, optional): ID of a registered schema, used instead of `schema`.
+    - schema_version (int, optional): Version of the registered schema, defaults to the latest one.
+    - registry (SchemaRegistry, optional): Registry of the schema ID, defaults to `schema_registry`.
+
+    Returns:
+    - str: The processed and corrected Cypher query.
+
+    Raises:
+    - asyncio.TimeoutError: If the result is not ready after `timeout` seconds.
+    - ValueError: If neither `schema` nor `schema_id` is given.
+    - UnknownSchemaError: If the schema ID or version is not registered.
+
+    Usage:
+    ```python
+    corrected_query = await correct_query(query, schema_string, timeout=1.0)
+    ```
+
+    Note:
+    - On a timeout or a cancellation, a query that hasn't started yet is removed from the 
+      executor, but a query being processed runs until it finishes and its result is discarded.
+    - A query without relationships is answered right away, without going through the executor.
+    - Results are cached by the executor, when it is created with `init_correction_worker` 
+      as its initializer. The default executor doesn't cache them.
+    """
+    schema, schema_key = resolve_executor_schema(schema, schema_id, schema_version, registry)
+    return await correct_resolved_query(query, schema, schema_key, executor, timeout)
+
+async def correct_many(queries, schema=None, *, executor=None, concurrency=CONST_ASYNC_CONCURRENCY, timeout=None, return_exceptions=False, schema_id=None, schema_version=None, registry=None):
+    """
+    Processes many Cypher queries with the same schema without blocking the event loop.
+
+    A fixed number of tasks take the queries one at a time and process them with 
+    `correct_query`, so at most `concurrency` queries are in the executor at the same time, 
+    whatever the number of queries.
+
+    Parameters:
+    - queries (iterable[str]): The Cypher queries.
+    - schema (str, list[dict] or CompiledSchema, optional): The schema, see `correct_query`.
+    - executor (concurrent.futures.Executor, optional): Executor of the processing, see `correct_query`.
+    - concurrency (int, optional): Maximum number of queries processed at the same time.
+    - timeout (float, optional): Seconds to wait for the result of every query, without limit by default.
+    - return_exceptions (bool, optional): Whether the error of a query is returned in place of its 
+      result. Otherwise the first error is raised and the remaining queries are cancelled.
+    - schema_id (str, optional): ID of a registered schema, used instead of `schema`.
+    - schema_version (int, optional): Version of the registered schema, defaults to the latest one.
+    - registry (SchemaRegistry, optional): Registry of the schema ID, defaults to `schema_registry`.
+
+    Returns:
+    - list[str or Exception]: The processed queries, in the same order.
+
+    Raises:
+    - asyncio.TimeoutError: If a query is not processed after `timeout` seconds and `return_exceptions` is False.
+    - ValueError: If `concurrency` is lower than 1, or if neither `schema` nor `schema_id` is given.
+    - UnknownSchemaError: If the schema ID or version is not registered.
+
+    Usage:
+    ```python
+    with ProcessPoolExecutor() as executor:
+        corrected_queries = await correct_many(queries, schema_string, executor=executor, concurrency=8, timeout=1.0)
+    ```
+
+    Note:
+    - Cancelling the call cancels every query that is not processed yet.
+    """
+    if concurrency < 1:
+        raise ValueError('The concurrency must be at least 1')
+    schema, schema_key = resolve_executor_schema(schema, schema_id, schema_version, registry)
+    # A processed schema is compiled once for all the queries, strings are parsed once per process
+    if not isinstance(schema, str):
+        schema = compile_schema(schema)
+    
+    queries = list(queries)
+    results = [None] * len(queries)
+    pending_queries = iter(enumerate(queries))
+    
+    async def correct_pending_queries():
+        # The tasks share the iterator, every query is taken by a single task
+        for index, query in pending_queries:
+            try:
+                results[index] = await correct_resolved_query(query, schema, schema_key, executor, timeout)
+            except Exception as error:
+                if not return_exceptions:
+                    raise
+                results[index] = error
+    
+    tasks = [asyncio.ensure_future(correct_pending_queries()) for _ in range(min(concurrency, len(queries)))]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        # Stop the other tasks when one fails or when the call is cancelled
+        for task in tasks:
+            task.cancel()
+    return results
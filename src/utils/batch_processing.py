@@ -0,0 +1,281 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
+from .constants import CONST_BATCH_CHUNK_SIZE, CONST_BATCH_PENDING_CHUNKS_PER_WORKER
+from .file_processing import load_schema
+from .query_processing import process_query
+from .batch_validation import validate_indexed_rows
+from .schema import compile_schema
+from .diagnostics import configure_logging
+
+# Schemas and result cache of the current worker process, set once by `init_worker`
+worker_schemas = None
+worker_cache = None
+
+def resolve_schema(schema):
+    """
+    Returns the compiled schema for a schema string or a processed schema.
+
+    Parameters:
+    - schema (str, list[dict] or CompiledSchema): The schema, either as the raw string 
+      from the CSV file or already processed.
+
+    Returns:
+    - CompiledSchema: The compiled schema.
+    """
+    if isinstance(schema, str):
+        return load_schema(schema)
+    return compile_schema(schema)
+
+def init_worker(schemas=(), cache=None):
+    """
+    Initializes a worker process with the distinct schemas of the batch.
+
+    This function runs once in every worker process, so each schema is sent and 
+    compiled once per worker instead of once per query. Diagnostic messages are 
+    disabled in the worker processes, since they would be interleaved between workers.
+
+    Parameters:
+    - schemas (list, optional): The distinct schemas of the batch, in the order of their indexes.
+    - cache (QueryResultCache, optional): Cache of results. Each worker gets its own memory 
+      cache, the persistent backend (if any) is shared by all the workers.
+    """
+    global worker_schemas, worker_cache
+    worker_schemas = [resolve_schema(schema) for schema in schemas]
+    worker_cache = cache
+    configure_logging(None)
+
+def process_chunk(chunk, vectorized=False):
+    """
+    Processes a chunk of queries inside a worker process.
+
+    Parameters:
+    - chunk (list[tuple[str, int]]): Pairs of query and index of its schema in the worker schemas.
+    - vectorized (bool, optional): Whether the chunk is validated at once with `validate_indexed_rows`, 
+      looking up its hops with NumPy when it is installed.
+
+    Returns:
+    - list[str]: The processed queries, in the same order as the chunk.
+    """
+    if vectorized:
+        return validate_indexed_rows(worker_schemas, chunk, vectorized=True)
+    return [process_query(query, worker_schemas[schema_index], worker_cache) for query, schema_index in chunk]
+
+def process_chunk_with_schemas(chunk, vectorized=False):
+    """
+    Processes a chunk of queries that carries its own distinct schemas.
+
+    Schema strings are compiled through `load_schema`, so each worker parses a given 
+    schema string only once even if it is carried by many chunks.
+
+    Parameters:
+    - chunk (tuple): A tuple containing:
+      1. list: The distinct schemas of the chunk.
+      2. list[tuple[str, int]]: Pairs of query and index of its schema in the chunk schemas.
+    - vectorized (bool, optional): Whether the chunk is validated at once, see `process_chunk`.
+
+    Returns:
+    - list[str]: The processed queries, in the same order as the chunk.
+    """
+    schemas, indexed_rows = chunk
+    schemas = [resolve_schema(schema) for schema in schemas]
+    if vectorized:
+        return validate_indexed_rows(schemas, indexed_rows, vectorized=True)
+    return [process_query(query, schemas[schema_index], worker_cache) for query, schema_index in indexed_rows]
+
+def process_chunk_rows(chunk, vectorized=False):
+    """
+    Processes a chunk of queries that carries its own distinct schemas, isolating the errors of every row.
+
+    A schema that can't be resolved, or a query that fails, only makes its own rows fail: 
+    every row gets its result or its error, so a single malformed request doesn't fail 
+    the other requests of a batch.
+
+    Parameters:
+    - chunk (tuple): The distinct schemas and the indexed rows, see `process_chunk_with_schemas`.
+    - vectorized (bool, optional): Whether the chunk is validated at once, see `process_chunk`. 
+      If a schema or a row fails, the rows are processed one at a time to find the failing ones.
+
+    Returns:
+    - list[tuple]: For every row, in the same order as the chunk, a pair of the processed 
+      query and None, or of None and the error raised by the row.
+    """
+    schemas, indexed_rows = chunk
+    resolved_schemas = []
+    for schema in schemas:
+        try:
+            resolved_schemas.append(resolve_schema(schema))
+        except Exception as error:
+            resolved_schemas.append(error)
+    
+    if vectorized and not any(isinstance(schema, Exception) for schema in resolved_schemas):
+        try:
+            return [(result, None) for result in validate_indexed_rows(resolved_schemas, indexed_rows, vectorized=True)]
+        except Exception:
+            pass
+    
+    results = []
+    for query, schema_index in indexed_rows:
+        schema = resolved_schemas[schema_index]
+        if isinstance(schema, Exception):
+            results.append((None, schema))
+            continue
+        try:
+            results.append((process_query(query, schema, worker_cache), None))
+        except Exception as error:
+            results.append((None, error))
+    return results
+
+def index_schemas(rows):
+    """
+    Replaces the schema of every row by the index of the schema in a list of distinct schemas.
+
+    Schema strings are deduplicated by value, processed schemas by identity (rows loaded 
+    with `parse_csv_with_cypher_queries` share the same instance for the same schema).
+
+    Parameters:
+    - rows (iterable[tuple]): Pairs of query and schema.
+
+    Returns:
+    - tuple: A tuple containing:
+      1. list: The distinct schemas.
+      2. list[tuple[str, int]]: Pairs of query and schema index.
+    """
+    schemas = []
+    schema_indexes = {}
+    indexed_rows = []
+    
+    for query, schema in rows:
+        schema_key = schema if isinstance(schema, str) else id(schema)
+        schema_index = schema_indexes.get(schema_key)
+        if schema_index is None:
+            schema_index = schema_indexes[schema_key] = len(schemas)
+            schemas.append(schema)
+        indexed_rows.append((query, schema_index))
+    
+    return schemas, indexed_rows
+
+def process_queries(rows, workers=None, chunksize=CONST_BATCH_CHUNK_SIZE, cache=None, vectorized=False):
+    """
+    Processes a batch of Cypher queries in parallel using a pool of worker processes.
+
+    The distinct schemas of the batch are sent to each worker only once, when the worker 
+    starts. Queries are then dispatched in chunks that only carry the query text and the 
+    index of its schema.
+
+    Parameters:
+    - rows (iterable[tuple]): Pairs of query and schema. The schema can be the raw schema 
+      string, a list of dictionaries or a `CompiledSchema`.
+    - workers (int, optional): Number of worker processes. Defaults to the number of CPUs. 
+      With a single worker the batch is processed in the current process.
+    - chunksize (int, optional): Number of queries sent to a worker in a single task.
+    - cache (QueryResultCache, optional): Cache of results. Worker processes get their own 
+      memory cache and share the persistent backend, if any.
+    - vectorized (bool, optional): Whether every chunk is validated at once with `validate_indexed_rows`, 
+      looking up its hops with NumPy when it is installed. The cache is not used.
+
+    Returns:
+    - list[str]: The processed queries, in the same order as the input rows.
+
+    Example:
+    ```python
+    rows = [(query[CONST_STATEMENT_KEY], query[CONST_SCHEMA_KEY]) for query in parse_csv_with_cypher_queries()]
+    results = process_queries(rows, workers=4)
+    ```
+
+    """
+    schemas, indexed_rows = index_schemas(rows)
+    
+    if workers == 1:
+        schemas = [resolve_schema(schema) for schema in schemas]
+        if vectorized:
+            return validate_indexed_rows(schemas, indexed_rows, vectorized=True)
+        return [process_query(query, schemas[schema_index], cache) for query, schema_index in indexed_rows]
+    
+    chunks = [indexed_rows[start:start + chunksize] for start in range(0, len(indexed_rows), chunksize)]
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(schemas, cache)) as executor:
+        results = []
+        for chunk_results in executor.map(process_chunk, chunks, repeat(vectorized)):
+            results.extend(chunk_results)
+    
+    return results
+
+def iter_process_queries(rows, workers=None, chunksize=CONST_BATCH_CHUNK_SIZE, cache=None, vectorized=False, errors=False):
+    """
+    Processes a stream of Cypher queries, yielding the results as soon as they are ready.
+
+    Rows are consumed lazily and only a bounded number of chunks are in progress at the 
+    same time, so memory usage does not depend on the number of rows. Each chunk carries 
+    the distinct schemas it uses once, instead of one schema per query.
+
+    Parameters:
+    - rows (iterable[tuple]): Pairs of query and schema. The schema can be the raw schema 
+      string, a list of dictionaries or a `CompiledSchema`.
+    - workers (int, optional): Number of worker processes. Defaults to the number of CPUs. 
+      With a single worker every query is processed in the current process and yielded 
+      as soon as it is processed.
+    - chunksize (int, optional): Number of queries sent to a worker in a single task.
+    - cache (QueryResultCache, optional): Cache of results. Worker processes get their own 
+      memory cache and share the persistent backend, if any.
+    - vectorized (bool, optional): Whether every chunk is validated at once with `validate_indexed_rows`, 
+      looking up its hops with NumPy when it is installed. The cache is not used, and with a single 
+      worker the results are yielded a chunk at a time.
+    - errors (bool, optional): Whether the errors of every row are isolated (see `process_chunk_rows`), 
+      instead of the first error stopping the stream.
+
+    Yields:
+    - str: The processed queries, in the same order as the input rows. With `errors`, pairs of 
+      the processed query and None, or of None and the error raised by the row.
+
+    Example:
+    ```python
+    rows = ((row[CONST_STATEMENT_KEY], row[CONST_SCHEMA_KEY]) for row in read_queries("queries.csv.gz"))
+    for result in iter_process_queries(rows, workers=8):
+        print(result)
+    ```
+
+    """
+    rows = iter(rows)
+    if workers == 1:
+        if vectorized:
+            while True:
+                chunk_rows = list(islice(rows, chunksize))
+                if not chunk_rows:
+                    break
+                if errors:
+                    yield from process_chunk_rows(index_schemas(chunk_rows), vectorized=True)
+                    continue
+                schemas, indexed_rows = index_schemas(chunk_rows)
+                yield from validate_indexed_rows([resolve_schema(schema) for schema in schemas], indexed_rows, vectorized=True)
+            return
+        for query, schema in rows:
+            if not errors:
+                yield process_query(query, resolve_schema(schema), cache)
+                continue
+            try:
+                result = (process_query(query, resolve_schema(schema), cache), None)
+            except Exception as error:
+                result = (None, error)
+            yield result
+        return
+    
+    max_pending_chunks = (workers or os.cpu_count() or 1) * CONST_BATCH_PENDING_CHUNKS_PER_WORKER
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=((), cache)) as executor:
+        pending_chunks = deque()
+        
+        while True:
+            # Keep the pool busy with a bounded number of chunks
+            while len(pending_chunks) < max_pending_chunks:
+                chunk_rows = list(islice(rows, chunksize))
+                if not chunk_rows:
+                    break
+                pending_chunks.append(executor.submit(process_chunk_rows if errors else process_chunk_with_schemas, index_schemas(chunk_rows), vectorized))
+            
+            if not pending_chunks:
+                break
+            
+            # Yield the results of the oldest chunk to keep the input order
+            yield from pending_chunks.popleft().result()
@@ -0,0 +1,308 @@
+from collections import namedtuple
+from itertools import product
+from .constants import CONST_EMPTY_STRING
+from .schema import compile_schema
+from .fingerprint import normalize_query, restore_literals
+from .cypher_parser import parse_query, has_relationships, has_directed_relationships
+from .patterns_processing import check_pattern_names, resolve_pattern, decide_pattern
+from .query_edits import apply_edits
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Query of a batch whose hops are waiting for their verdicts
+# - resolved_patterns: (pattern, pattern_is_valid, hop) for every pattern, hop is None when there is nothing to look up
+QueryPlan = namedtuple('QueryPlan', ['template', 'literals', 'resolved_patterns'])
+
+# Kinds of hops, by the parts that are defined (source, relationship, target)
+HOP_KINDS = [
+    (True, True, True),
+    (True, False, True),
+    (True, True, False),
+    (True, False, False),
+    (False, True, True),
+    (False, False, True),
+]
+
+def plan_query(query, schema):
+    """
+    Parses a query and resolves the hops of its patterns, without looking them up in the schema.
+
+    The query goes through the same steps as `process_query`: the literals are masked, the
+    names are validated with `check_pattern_names`, and every pattern of a query with
+    directed relationships is resolved with `resolve_pattern`.
+
+    Parameters:
+    - query (str): The Cypher query.
+    - schema (CompiledSchema): The graph schema.
+
+    Returns:
+    - str or QueryPlan: The processed query if it doesn't depend on any hop, otherwise its plan.
+    """
+    # Fast path: a query without relationships has no pattern to check, it is returned as is
+    if not has_relationships(query):
+        return query
+
+    normalized_query = normalize_query(query)
+    template, literals = normalized_query if normalized_query is not None else (query, [])
+    patterns, symbol_table = parse_query(template)
+
+    # Fail fast: every class and relationship written in the patterns must exist in the schema
+    if not all(check_pattern_names(template, pattern, schema) for pattern in patterns):
+        return CONST_EMPTY_STRING
+    # Undirected relationships are never corrected, so only the names are checked
+    if not has_directed_relationships(template):
+        return query
+
+    resolved_patterns = [(pattern, *resolve_pattern(template, pattern, symbol_table)) for pattern in patterns]
+    return QueryPlan(template, literals, resolved_patterns)
+
+def finish_query(plan, schema, verdicts):
+    """
+    Builds the processed query of a plan from the verdicts of its hops.
+
+    Parameters:
+    - plan (QueryPlan): The plan, as returned by `plan_query`.
+    - schema (CompiledSchema): The graph schema.
+    - verdicts (iterator[tuple[bool, bool]]): The verdicts of the hops of the plan, in order, 
+      as returned by `hops_exist`.
+
+    Returns:
+    - str: The processed query.
+    """
+    return_empty_response = False
+    edits = []
+    for pattern, pattern_is_valid, hop in plan.resolved_patterns:
+        if hop is not None:
+            hop_exists, opposite_hop_exists = next(verdicts)
+            pattern_is_valid, edit = decide_pattern(plan.template, pattern, schema, pattern_is_valid, hop, hop_exists, opposite_hop_exists)
+            if edit is not None:
+                edits.append(edit)
+        if not pattern_is_valid:
+            return_empty_response = True
+
+    if return_empty_response:
+        return CONST_EMPTY_STRING
+    return restore_literals(apply_edits(plan.template, edits), plan.literals)
+
+def hops_exist(hops, schema, vectorized=False):
+    """
+    Looks up a list of hops in the schema, in both directions.
+
+    Parameters:
+    - hops (list[PatternHop]): The hops.
+    - schema (CompiledSchema): The graph schema.
+    - vectorized (bool, optional): Whether the hops are looked up with NumPy (see `hops_exist_vectorized`). 
+      The pure Python lookups are used when NumPy is not installed.
+
+    Returns:
+    - list[tuple[bool, bool]]: Whether every hop exists in the schema, and whether it exists 
+      with the opposite direction (only looked up in pure Python when the hop doesn't exist).
+    """
+    if vectorized and numpy is not None:
+        return hops_exist_vectorized(hops, encode_schema(schema))
+    
+    verdicts = []
+    for hop in hops:
+        hop_exists = schema.pattern_exists_multiple(*hop)
+        opposite_hop_exists = not hop_exists and schema.pattern_exists_multiple(hop.target_classes_names, hop.source_classes_names, hop.rels_names, hop.target_classes_is_defined, hop.source_classes_is_defined, hop.rels_names_is_defined)
+        verdicts.append((hop_exists, opposite_hop_exists))
+    return verdicts
+
+def encode_schema(schema):
+    """
+    Returns the encoding of a compiled schema, built once and kept in its `encoded` attribute.
+
+    Parameters:
+    - schema (CompiledSchema): The compiled schema.
+
+    Returns:
+    - EncodedSchema: The encoded schema.
+    """
+    if schema.encoded is None:
+        schema.encoded = EncodedSchema(schema)
+    return schema.encoded
+
+class EncodedSchema:
+    """
+    Sorted arrays with the integer codes of every index of a compiled schema.
+
+    Classes and relationships are coded with the IDs interned by the compiled schema.
+    Every kind of hop (see `HOP_KINDS`) has its own array, with the codes of the parts
+    it defines: e.g. (source ID * relationships + relationship ID) * classes + target ID
+    for the complete triples.
+
+    Parameters:
+    - schema (CompiledSchema): The compiled schema.
+    """
+    def __init__(self, schema):
+        self.schema = schema
+        self.class_count = len(schema.class_ids)
+        self.relationship_count = len(schema.relationship_ids)
+        class_ids = schema.class_ids
+        relationship_ids = schema.relationship_ids
+        triples = [(class_ids[source], relationship_ids[rel], class_ids[target]) for source, rel, target in schema.triples]
+        source_ids, rel_ids, target_ids = (numpy.array(ids, dtype=numpy.int64) for ids in zip(*triples)) if triples else (numpy.zeros(0, dtype=numpy.int64),) * 3
+        # Every pair and single name of the schema comes from a triple, so all the indexes are coded from the triples
+        self.codes = {kind: numpy.unique(self.encode(source_ids, rel_ids, target_ids, kind)) for kind in HOP_KINDS}
+
+    def encode(self, source_ids, rel_ids, target_ids, kind):
+        """
+        Encodes the defined parts of some hops as integers.
+
+        Parameters:
+        - source_ids (numpy.ndarray): The IDs of the source classes.
+        - rel_ids (numpy.ndarray): The IDs of the relationships.
+        - target_ids (numpy.ndarray): The IDs of the target classes.
+        - kind (tuple[bool, bool, bool]): Whether the source, the relationship and the target are defined.
+
+        Returns:
+        - numpy.ndarray: The codes of the hops.
+        """
+        codes = source_ids if kind[0] else numpy.zeros(len(source_ids), dtype=numpy.int64)
+        if kind[1]:
+            codes = codes * self.relationship_count + rel_ids
+        if kind[2]:
+            codes = codes * self.class_count + target_ids
+        return codes
+
+    def contains(self, codes, kind):
+        """
+        Determines which codes are in the schema, with a binary search in the sorted array of their kind.
+
+        Parameters:
+        - codes (numpy.ndarray): The codes.
+        - kind (tuple[bool, bool, bool]): The kind of the codes.
+
+        Returns:
+        - numpy.ndarray: Boolean array, True where the code is in the schema.
+        """
+        schema_codes = self.codes[kind]
+        if not len(schema_codes):
+            return numpy.zeros(len(codes), dtype=bool)
+        positions = numpy.minimum(numpy.searchsorted(schema_codes, codes), len(schema_codes) - 1)
+        return schema_codes[positions] == codes
+
+def hops_exist_vectorized(hops, encoded_schema):
+    """
+    Looks up a list of hops in the schema with NumPy, in both directions.
+
+    Every hop is expanded into the combinations of its names that are in the schema (names
+    that are not in the schema can't match), and only the IDs of the names are collected in 
+    Python. The combinations are then grouped by kind, coded as integers in both directions, 
+    and looked up with a vectorized binary search; a hop exists if any of its combinations exists.
+
+    Parameters:
+    - hops (list[PatternHop]): The hops.
+    - encoded_schema (EncodedSchema): The encoded schema.
+
+    Returns:
+    - list[tuple[bool, bool]]: Whether every hop exists in the schema, and whether it exists with the opposite direction.
+    """
+    class_ids = encoded_schema.schema.class_ids
+    relationship_ids = encoded_schema.schema.relationship_ids
+    combinations = {kind: ([], [], [], []) for kind in HOP_KINDS}
+    no_names = [None]
+
+    for hop_index, hop in enumerate(hops):
+        # Kinds are ordered as (source, relationship, target)
+        kind = (hop.source_classes_is_defined, hop.rels_names_is_defined, hop.target_classes_is_defined)
+        if kind not in combinations:
+            continue
+        kind_source_ids, kind_rel_ids, kind_target_ids, kind_hop_indexes = combinations[kind]
+        source_names = hop.source_classes_names if kind[0] else no_names
+        rel_names = hop.rels_names if kind[1] else no_names
+        target_names = hop.target_classes_names if kind[2] else no_names
+        # Single names are collected as is, unknown names get the ID -1 and never match
+        if len(source_names) == 1 and len(rel_names) == 1 and len(target_names) == 1:
+            kind_source_ids.append(class_ids.get(source_names[0], -1) if kind[0] else 0)
+            kind_rel_ids.append(relationship_ids.get(rel_names[0], -1) if kind[1] else 0)
+            kind_target_ids.append(class_ids.get(target_names[0], -1) if kind[2] else 0)
+            kind_hop_indexes.append(hop_index)
+            continue
+        source_ids = [class_ids[name] for name in hop.source_classes_names if name in class_ids] if kind[0] else [0]
+        rel_ids = [relationship_ids[name] for name in hop.rels_names if name in relationship_ids] if kind[1] else [0]
+        target_ids = [class_ids[name] for name in hop.target_classes_names if name in class_ids] if kind[2] else [0]
+        for source_id, rel_id, target_id in product(source_ids, rel_ids, target_ids):
+            kind_source_ids.append(source_id)
+            kind_rel_ids.append(rel_id)
+            kind_target_ids.append(target_id)
+            kind_hop_indexes.append(hop_index)
+
+    exists = numpy.zeros(len(hops), dtype=bool)
+    opposite_exists = numpy.zeros(len(hops), dtype=bool)
+    for kind, (source_ids, rel_ids, target_ids, hop_indexes) in combinations.items():
+        if not hop_indexes:
+            continue
+        source_ids, rel_ids, target_ids, hop_indexes = (numpy.array(values, dtype=numpy.int64) for values in (source_ids, rel_ids, target_ids, hop_indexes))
+        known = (source_ids >= 0) & (rel_ids >= 0) & (target_ids >= 0)
+        if not known.all():
+            source_ids, rel_ids, target_ids, hop_indexes = source_ids[known], rel_ids[known], target_ids[known], hop_indexes[known]
+        exists[hop_indexes[encoded_schema.contains(encoded_schema.encode(source_ids, rel_ids, target_ids, kind), kind)]] = True
+        # The opposite hop swaps the source and the target
+        opposite_kind = (kind[2], kind[1], kind[0])
+        opposite_exists[hop_indexes[encoded_schema.contains(encoded_schema.encode(target_ids, rel_ids, source_ids, opposite_kind), opposite_kind)]] = True
+    return list(zip(exists.tolist(), opposite_exists.tolist()))
+
+def validate_queries(queries, schema, vectorized=False):
+    """
+    Processes a batch of Cypher queries against the same schema, looking up all their hops at once.
+
+    Every query is parsed and its patterns are resolved first (see `plan_query`). The hops
+    of all the queries are then looked up together (see `hops_exist`),
+    and the verdicts are mapped back to the patterns to build the processed queries.
+    The results are the same as processing every query with `process_query`.
+
+    Parameters:
+    - queries (iterable[str]): The Cypher queries.
+    - schema (list[dict] or CompiledSchema): The graph schema.
+    - vectorized (bool, optional): Whether the hops are looked up with NumPy. The pure Python 
+      lookups are used when NumPy is not installed.
+
+    Returns:
+    - list[str]: The processed queries, in the same order.
+
+    Usage:
+    ```python
+    results = validate_queries(queries, load_schema(schema_string))
+    ```
+
+    Note:
+    - No result cache is used and no metrics are recorded.
+    - The pure Python lookups go through the hash and bitset indexes of the compiled schema, 
+      which already answer a hop in constant time; with NumPy, the IDs of every name still 
+      have to be collected in Python before the vectorized search. Measure both on the 
+      actual workload before choosing `vectorized`.
+    """
+    schema = compile_schema(schema)
+    plans = [plan_query(query, schema) for query in queries]
+
+    hops = [hop for plan in plans if isinstance(plan, QueryPlan) for pattern, pattern_is_valid, hop in plan.resolved_patterns if hop is not None]
+
+    verdicts = iter(hops_exist(hops, schema, vectorized))
+    return [finish_query(plan, schema, verdicts) if isinstance(plan, QueryPlan) else plan for plan in plans]
+
+def validate_indexed_rows(schemas, indexed_rows, vectorized=False):
+    """
+    Processes a batch of Cypher queries with several schemas, looking up the hops of each schema at once.
+
+    Parameters:
+    - schemas (list[CompiledSchema]): The distinct schemas of the batch.
+    - indexed_rows (list[tuple[str, int]]): Pairs of query and index of its schema, as returned by `index_schemas`.
+    - vectorized (bool, optional): Whether the hops are looked up with NumPy, see `validate_queries`.
+
+    Returns:
+    - list[str]: The processed queries, in the same order as the rows.
+    """
+    rows_by_schema = {}
+    for row_index, (query, schema_index) in enumerate(indexed_rows):
+        rows_by_schema.setdefault(schema_index, []).append(row_index)
+
+    results = [None] * len(indexed_rows)
+    for schema_index, row_indexes in rows_by_schema.items():
+        schema_results = validate_queries([indexed_rows[row_index][0] for row_index in row_indexes], schemas[schema_index], vectorized)
+        for row_index, result in zip(row_indexes, schema_results):
+            results[row_index] = result
+    return results
@@ -18,6 +18,30 @@ CONST_RELATIONSHIP_KEY = "relationship"
 CONST_SCHEMA_KEY = "schema"
 CONST_STATEMENT_KEY = "statement"
 CONST_CORRECT_QUERY_KEY = "correct_query"
+# Column added to the output files with the processed query
+CONST_RESULT_QUERY_KEY = "result_query"
+# Maximum number of distinct schema strings kept parsed in memory
+CONST_SCHEMA_CACHE_SIZE = 1024
+# Below this number of combinations of classes and relationships, a pattern is checked one combination at a time instead of with the bitset indexes
+CONST_SCHEMA_BITSET_MIN_COMBINATIONS = 16
+
+# ==============================
+# Streaming Input/Output Constants
+# Supported file formats and compressions for reading queries and writing results
+# ==============================
+CONST_FORMAT_CSV = "csv"
+CONST_FORMAT_JSONL = "jsonl"
+CONST_STANDARD_STREAM_PATH = "-"
+CONST_IO_BUFFER_SIZE = 1024 * 1024
+# Number of rows written in a single bulk write
+CONST_WRITE_BATCH_SIZE = 1024
+# Magic bytes at the start of a compressed file, and the extension used when writing it
+CONST_GZIP_MAGIC = b"\x1f\x8b"
+CONST_BZIP2_MAGIC = b"BZh"
+CONST_XZ_MAGIC = b"\xfd7zXZ\x00"
+CONST_GZIP_EXTENSION = ".gz"
+CONST_BZIP2_EXTENSION = ".bz2"
+CONST_XZ_EXTENSION = ".xz"
 
 # ==============================
 # Cypher Pattern Constants
@@ -30,12 +54,75 @@ CONST_LARGE_ARROW_LEFT_TO_RIGHT = "-->"
 CONST_LARGE_ARROW_RIGHT_TO_LEFT = "<--"
 CONST_NO_ARROW_LEFT_SIDE = "-["
 CONST_NO_ARROW_RIGHT_SIDE = "]-"
-CONST_PATTERN_ANY_SPACE = '\s*'
-# Matches property assignments in Cypher queries; e.g., { name: "John", age: "20" }
-CONST_PATTERN_PROPERTIES = (CONST_PATTERN_ANY_SPACE +
-                            '(?:\{\s*[a-zA-Z]+:\s*["\'][^"]*["\']\s*'
-                            '(?:\s*,\s*[a-zA-Z]+:\s*["\'][^"]*["\'])*\s*\})?'
-                            + CONST_PATTERN_ANY_SPACE)
+# Replaces the literals (strings and numbers) of a query in its template, it can't appear in a query
+CONST_LITERAL_PLACEHOLDER = "\x00"
+
+# ==============================
+# Batch Processing Constants
+# ==============================
+# Number of queries sent to a worker process in a single task
+CONST_BATCH_CHUNK_SIZE = 256
+# Number of tasks sent to the pool per worker while streaming, bounds the memory in use
+CONST_BATCH_PENDING_CHUNKS_PER_WORKER = 2
+# Maximum number of queries of `correct_many` in the executor at the same time
+CONST_ASYNC_CONCURRENCY = 8
+
+# ==============================
+# HTTP Service Constants
+# ==============================
+CONST_SERVER_HOST = "127.0.0.1"
+CONST_SERVER_PORT = 8080
+CONST_SERVER_PROCESS_PATH = "/process"
+CONST_SERVER_HEALTH_PATH = "/health"
+# Schemas are registered with PUT /schemas/<schema ID>
+CONST_SERVER_SCHEMAS_PATH = "/schemas/"
+# Maximum number of queries processed together, and seconds waited to fill a batch
+CONST_SERVER_BATCH_SIZE = 64
+CONST_SERVER_BATCH_WINDOW = 0.002
+# Maximum number of queries waiting for a batch, more requests are rejected with 503
+CONST_SERVER_QUEUE_SIZE = 4096
+# Maximum size of the body of a request, in bytes
+CONST_SERVER_MAX_BODY_SIZE = 1024 * 1024
+# Seconds an idle keep-alive connection is kept open
+CONST_SERVER_KEEP_ALIVE_TIMEOUT = 60
+CONST_QUERY_KEY = "query"
+CONST_SCHEMA_ID_KEY = "schema_id"
+CONST_SCHEMA_VERSION_KEY = "schema_version"
+
+# ==============================
+# Result Cache Constants
+# ==============================
+# Maximum number of processed queries kept in memory by a result cache
+CONST_RESULT_CACHE_SIZE = 100000
+# Seconds a process waits for another one holding the lock of a persistent cache
+CONST_RESULT_CACHE_TIMEOUT = 30
+
+# ==============================
+# Benchmark Constants
+# ==============================
+CONST_BENCHMARK_SEED = 42
+CONST_BENCHMARK_RESULTS_FILE_PATH = "benchmarks/results/latest.json"
+CONST_BENCHMARK_BASELINE_FILE_PATH = "benchmarks/results/baseline.json"
+# Relative slowdown of a percentile, or drop of throughput, reported as a regression
+CONST_BENCHMARK_REGRESSION_THRESHOLD = 0.10
+# Highest accepted growth exponent of the latency with the number of hops of a path (1 is linear)
+CONST_BENCHMARK_MAX_SCALING_EXPONENT = 1.2
+
+# ==============================
+# Logging Constants
+# ==============================
+CONST_LOGGER_NAME = "cypher_direction"
+# Level above every standard level, used to disable the diagnostics
+CONST_LOG_LEVEL_DISABLED = 100
+
+# ==============================
+# Metrics Constants
+# ==============================
+CONST_METRICS_PREFIX = "cypher_direction"
+# Upper bounds of the latency histograms, in seconds
+CONST_METRICS_LATENCY_BUCKETS = (0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.1)
+# Upper bounds of the histogram of patterns found per query
+CONST_METRICS_PATTERN_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
 
 # ==============================
 # Miscellaneous Constants
@@ -0,0 +1,415 @@
+import re
+from collections import namedtuple
+from .constants import CONST_EMPTY_STRING
+
+# Node in a pattern, e.g. (varA:classA:classB {name: "John"})
+# - classes: list of class names, or None when the node has no classes
+NodePattern = namedtuple('NodePattern', ['variable', 'classes', 'start', 'end'])
+
+# Relationship in a pattern, e.g. <-[relVar:REL_A|REL_B]- or -->
+# - types: list of relationship names, or None when the relationship has no types
+# - is_short: True for the short form (--, -->, <--) that has no brackets
+RelationshipPattern = namedtuple('RelationshipPattern', ['variable', 'types', 'left_arrow', 'right_arrow', 'is_short', 'start', 'end'])
+
+# Node-relationship-node pattern, start and end are the span of the whole pattern in the query
+Pattern = namedtuple('Pattern', ['node_a', 'relationship', 'node_b', 'start', 'end'])
+
+# Every token below is matched at a fixed position and can only be matched in one way 
+# (each repetition starts with a distinct character), so matching is linear in its length
+# and a failed match never backtracks into the previous tokens.
+WHITESPACE_PATTERN = re.compile(r'\s*')
+VARIABLE_PATTERN = re.compile(r'[a-zA-Z]*')
+# :ClassA:`ClassB`, at least one character is needed for a class name
+CLASSES_PATTERN = re.compile(r'(?::`?\w+`?)*')
+# :REL_A|!`REL_B`, the first name may be empty
+RELATIONSHIP_TYPES_PATTERN = re.compile(r'(?::!?`?[a-zA-Z_]*`?)?(?:\|!?`?[a-zA-Z_]+`?)*')
+PROPERTY_KEY_PATTERN = re.compile(r'[a-zA-Z_]\w*|`[^`]*`')
+# String literals with escaped characters, e.g. "say \"hi\"" or 'it\'s'
+STRING_PATTERN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|\'[^\'\\]*(?:\\.[^\'\\]*)*\'')
+PARAMETER_PATTERN = re.compile(r'\$(?:\w+|`[^`]*`)')
+# Numbers, booleans, null and the placeholder of masked literals (see `normalize_query`)
+PLAIN_VALUE_PATTERN = re.compile(r'[-+]?(?:\d[\d.]*(?:[eE][-+]?\d+)?|[\w.\x00]+)')
+
+# States of the property map scanner
+EXPECT_KEY_OR_CLOSE = 0        # right after '{'
+EXPECT_KEY = 1                 # after ',' in a map
+EXPECT_COLON = 2               # after a key
+EXPECT_VALUE_OR_CLOSE = 3      # right after '['
+EXPECT_VALUE = 4               # after ':' in a map or ',' in a list
+EXPECT_SEPARATOR_OR_CLOSE = 5  # after a value
+
+def scan_variable(query, position):
+    """
+    Scans a variable name, made only of ASCII letters, starting at the given position.
+
+    Parameters:
+    - query (str): The Cypher query.
+    - position (int): Position where the variable may start.
+
+    Returns:
+    - int: Position right after the variable (equal to `position` if there is no variable).
+    """
+    return VARIABLE_PATTERN.match(query, position).end()
+
+def scan_classes(query, position):
+    """
+    Scans the class names of a node, like :ClassA:`ClassB`, starting at the given position.
+
+    Parameters:
+    - query (str): The Cypher query.
+    - position (int): Position where the classes may start.
+
+    Returns:
+    - int: Position right after the classes (equal to `position` if there are no classes).
+    """
+    return CLASSES_PATTERN.match(query, position).end()
+
+def scan_relationship_types(query, position):
+    """
+    Scans the types of a relationship, like :REL_A|REL_B, starting at the given position.
+
+    Parameters:
+    - query (str): The Cypher query.
+    - position (int): Position where the types may start.
+
+    Returns:
+    - int: Position right after the types (equal to `position` if there are no types).
+    """
+    return RELATIONSHIP_TYPES_PATTERN.match(query, position).end()
+
+def scan_value(query, position):
+    """
+    Scans a single value of a property map: a string, a parameter, a number, a boolean or null.
+
+    Parameters:
+    - query (str): The Cypher query.
+    - position (int): Position where the value starts.
+
+    Returns:
+    - int or None: Position right after the value, or None if there is no value at the position.
+    """
+    character = query[position]
+    if character == '"' or character == "'":
+        match = STRING_PATTERN.match(query, position)
+    elif character == '$':
+        match = PARAMETER_PATTERN.match(query, position)
+    else:
+        match = PLAIN_VALUE_PATTERN.match(query, position)
+    return match.end() if match is not None else None
+
+def scan_property_map(query, position):
+    """
+    Scans a property map, like {name: "John", age: $age, tags: ["a", "b"]}, starting at the given position.
+
+    Values can be strings (with escaped quotes), parameters, numbers, booleans, null, lists 
+    and nested maps. The map is scanned once, without recursion and without backtracking, 
+    so the time is linear in the length of the map even for malformed or adversarial input.
+
+    Parameters:
+    - query (str): The Cypher query.
+    - position (int): Position of the opening brace of the map.
+
+    Returns:
+    - int or None: Position right after the closing brace, or None if the map is malformed.
+    """
+    length = len(query)
+    closers = ['}'] # closing character of every open map or list
+    state = EXPECT_KEY_OR_CLOSE
+    position += 1
+    
+    while True:
+        position = WHITESPACE_PATTERN.match(query, position).end()
+        if position >= length:
+            return None
+        character = query[position]
+        
+        if state == EXPECT_SEPARATOR_OR_CLOSE or (state == EXPECT_KEY_OR_CLOSE and character == '}') or (state == EXPECT_VALUE_OR_CLOSE and character == ']'):
+            if character == ',' and state == EXPECT_SEPARATOR_OR_CLOSE:
+                state = EXPECT_KEY if closers[-1] == '}' else EXPECT_VALUE
+                position += 1
+            elif character == closers[-1]:
+                closers.pop()
+                position += 1
+                if not closers:
+                    return position
+                state = EXPECT_SEPARATOR_OR_CLOSE
+            else:
+                return None
+        elif state == EXPECT_KEY or state == EXPECT_KEY_OR_CLOSE:
+            match = PROPERTY_KEY_PATTERN.match(query, position)
+            if match is None:
+                return None
+            position = match.end()
+            state = EXPECT_COLON
+        elif state == EXPECT_COLON:
+            if character != ':':
+                return None
+            position += 1
+            state = EXPECT_VALUE
+        # a value is expected
+        elif character == '{':
+            closers.append('}')
+            position += 1
+            state = EXPECT_KEY_OR_CLOSE
+        elif character == '[':
+            closers.append(']')
+            position += 1
+            state = EXPECT_VALUE_OR_CLOSE
+        else:
+            position = scan_value(query, position)
+            if position is None:
+                return None
+            state = EXPECT_SEPARATOR_OR_CLOSE
+
+def scan_properties(query, position):
+    """
+    Scans the optional property map of a node or a relationship, with the whitespace around it.
+
+    Parameters:
+    - query (str): The Cypher query.
+    - position (int): Position where the properties may start.
+
+    Returns:
+    - int or None: Position right after the properties and the whitespace, or None if 
+      a property map starts at the position but is malformed.
+    """
+    position = WHITESPACE_PATTERN.match(query, position).end()
+    if position < len(query) and query[position] == '{':
+        position = scan_property_map(query, position)
+        if position is None:
+            return None
+        position = WHITESPACE_PATTERN.match(query, position).end()
+    return position
+
+def parse_classes(classes_string):
+    """
+    Converts the classes text of a node into a list of class names.
+
+    Parameters:
+    - classes_string (str): Classes text, e.g. ":Person:`Employee`".
+
+    Returns:
+    - list[str] or None: The class names, or None if the node has no classes.
+    """
+    if classes_string == CONST_EMPTY_STRING:
+        return None
+    return classes_string.replace(':', CONST_EMPTY_STRING, 1).replace('`', CONST_EMPTY_STRING).split(':')
+
+def parse_relationship_types(types_string):
+    """
+    Converts the types text of a relationship into a list of relationship names.
+
+    Parameters:
+    - types_string (str): Types text, e.g. ":REL_A|!`REL_B`".
+
+    Returns:
+    - list[str] or None: The relationship names, or None if the relationship has no types.
+    """
+    if types_string == CONST_EMPTY_STRING:
+        return None
+    return types_string.replace(':', CONST_EMPTY_STRING).replace('!', CONST_EMPTY_STRING).replace('`', CONST_EMPTY_STRING).split('|')
+
+def parse_node(query, position):
+    """
+    Parses a node pattern starting at the given position.
+
+    Parameters:
+    - query (str): The Cypher query.
+    - position (int): Position of the opening parenthesis of the node.
+
+    Returns:
+    - NodePattern or None: The parsed node, or None if there is no node at the position.
+    """
+    if position >= len(query) or query[position] != '(':
+        return None
+    variable_end = scan_variable(query, position + 1)
+    classes_end = scan_classes(query, variable_end)
+    properties_end = scan_properties(query, classes_end)
+    if properties_end is None or properties_end >= len(query) or query[properties_end] != ')':
+        return None
+    return NodePattern(query[position + 1:variable_end], parse_classes(query[variable_end:classes_end]), position, properties_end + 1)
+
+def parse_relationship(query, position):
+    """
+    Parses a relationship pattern starting at the given position.
+
+    Both the complete form, like -[relVar:REL]->, and the short form, like -->, are recognized.
+
+    Parameters:
+    - query (str): The Cypher query.
+    - position (int): Position right after the node that precedes the relationship.
+
+    Returns:
+    - RelationshipPattern or None: The parsed relationship, or None if there is no relationship at the position.
+    """
+    length = len(query)
+    start = position
+    left_arrow = position < length and query[position] == '<'
+    if left_arrow:
+        position += 1
+    if position >= length or query[position] != '-':
+        return None
+    position += 1
+    if position >= length:
+        return None
+
+    # Short form: --
+    if query[position] == '-':
+        position += 1
+        is_short = True
+        variable = types = None
+    # Complete form: -[relVar:REL {properties}]-
+    elif query[position] == '[':
+        variable_end = scan_variable(query, position + 1)
+        types_end = scan_relationship_types(query, variable_end)
+        properties_end = scan_properties(query, types_end)
+        if properties_end is None or not query.startswith(']-', properties_end):
+            return None
+        is_short = False
+        variable = query[position + 1:variable_end]
+        types = parse_relationship_types(query[variable_end:types_end])
+        position = properties_end + 2
+    else:
+        return None
+
+    right_arrow = position < length and query[position] == '>'
+    if right_arrow:
+        position += 1
+    return RelationshipPattern(variable, types, left_arrow, right_arrow, is_short, start, position)
+
+def has_relationships(query):
+    """
+    Determines cheaply if a Cypher query may contain a relationship pattern.
+
+    Every relationship, complete (-[...]-) or short (--), contains one of the two searched 
+    strings, so a query without them has no pattern to check.
+
+    Parameters:
+    - query (str): The Cypher query.
+
+    Returns:
+    - bool: False if the query has no relationship for sure, otherwise True.
+    """
+    return '-[' in query or '--' in query
+
+def has_directed_relationships(query):
+    """
+    Determines cheaply if a Cypher query may contain a directed relationship.
+
+    Parameters:
+    - query (str): The Cypher query.
+
+    Returns:
+    - bool: False if the query has no arrow (-> or <-) for sure, otherwise True.
+    """
+    return '->' in query or '<-' in query
+
+def parse_query(query):
+    """
+    Parses every node-relationship-node pattern in a Cypher query and builds its symbol table in a single pass.
+
+    The query is walked once from left to right. Each chain of patterns is decomposed
+    into overlapping patterns, so (a)-[:R1]->(b)-[:R2]->(c) produces (a)-[:R1]->(b)
+    and (b)-[:R2]->(c), without rescanning or rewriting the query. Every node found 
+    on the way, inside a pattern or alone, is recorded in the symbol table.
+
+    Parameters:
+    - query (str): The Cypher query.
+
+    Returns:
+    - tuple: A tuple containing:
+      1. list[Pattern]: The patterns found, in order of appearance.
+      2. dict[str, list[str]]: Classes for each variable that has at least one class declared 
+         (if a variable is declared several times, the first declaration is kept).
+    """
+    patterns = []
+    symbol_table = {}
+    position = query.find('(')
+
+    while position != -1:
+        node = node_a = parse_node(query, position)
+        if node is not None and node.variable and node.classes is not None:
+            symbol_table.setdefault(node.variable, node.classes)
+
+        # Follow the chain while a relationship and another node come right after the node
+        while node is not None:
+            relationship = parse_relationship(query, node.end)
+            if relationship is None:
+                break
+            node_b = parse_node(query, relationship.end)
+            if node_b is None:
+                break
+            if node_b.variable and node_b.classes is not None:
+                symbol_table.setdefault(node_b.variable, node_b.classes)
+            patterns.append(Pattern(node, relationship, node_b, node.start, node_b.end))
+            node = node_b
+
+        # Continue after the chain, or right after the parenthesis if no pattern started here
+        if node is None or node is node_a:
+            position = query.find('(', position + 1)
+        else:
+            position = query.find('(', node.end)
+
+    return patterns, symbol_table
+
+def parse_patterns(query):
+    """
+    Parses every node-relationship-node pattern in a Cypher query in a single pass.
+
+    See `parse_query`, which also builds the symbol table in the same pass.
+
+    Parameters:
+    - query (str): The Cypher query.
+
+    Returns:
+    - list[Pattern]: The patterns found, in order of appearance.
+
+    Example:
+    ```python
+    patterns = parse_patterns("MATCH (a:Person)-[:KNOWS]->(b) RETURN a")
+    patterns[0].node_a.classes  # ['Person']
+    patterns[0].relationship.types  # ['KNOWS']
+    ```
+    """
+    return parse_query(query)[0]
+
+def referenced_names(query):
+    """
+    Lists the classes (labels) and relationships a Cypher query refers to in its patterns.
+
+    Checking the patterns of a query only looks up schema entries built from these names 
+    (the classes of its nodes, including those resolved from the symbol table, and the 
+    types of its relationships), so its processed query can only change when a schema 
+    triple with one of these names changes.
+
+    Parameters:
+    - query (str): The Cypher query.
+
+    Returns:
+    - set[str]: The names of the classes and relationships.
+
+    Example:
+    ```python
+    referenced_names("MATCH (a:Person)-[:KNOWS|LIKES]->(b) RETURN a")
+    # {'Person', 'KNOWS', 'LIKES'}
+    ```
+    """
+    names = set()
+    collect_names(names, *parse_query(query))
+    return names
+
+def collect_names(names, patterns, symbol_table):
+    """
+    Adds the classes and relationships of parsed patterns to a set, see `referenced_names`.
+
+    Parameters:
+    - names (set[str]): The set the names are added to.
+    - patterns (list[Pattern]): The patterns, as returned by `parse_query`.
+    - symbol_table (dict): The symbol table, as returned by `parse_query`.
+    """
+    for classes in symbol_table.values():
+        names.update(classes)
+    for pattern in patterns:
+        for classes in (pattern.node_a.classes, pattern.node_b.classes, pattern.relationship.types):
+            if classes is not None:
+                names.update(classes)
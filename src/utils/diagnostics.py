@@ -0,0 +1,40 @@
+import logging
+from .constants import CONST_LOGGER_NAME, CONST_LOG_LEVEL_DISABLED
+from .ui import ColoredConsoleHandler
+
+# Logger used for the diagnostic messages of the query processing.
+# Messages are built lazily, so while the logger is disabled (the default) no message
+# is formatted and no schema is converted to text.
+logger = logging.getLogger(CONST_LOGGER_NAME)
+logger.addHandler(logging.NullHandler())
+logger.setLevel(CONST_LOG_LEVEL_DISABLED)
+
+def configure_logging(level=logging.DEBUG, handler=None):
+    """
+    Enables or disables the diagnostic messages of the query processing.
+
+    Parameters:
+    - level (int or None, optional): Minimum level of the messages, None disables them.
+      Processing a match is logged as debug, fixing a direction as info, and every 
+      reason to return an empty query as warning.
+    - handler (logging.Handler, optional): Handler for the messages, defaults to a 
+      `ColoredConsoleHandler` on the standard output. Previously configured handlers 
+      are replaced.
+
+    Usage:
+    ```python
+    configure_logging(logging.INFO, ColoredConsoleHandler(sys.stderr))
+    configure_logging(None)
+    ```
+
+    """
+    for previous_handler in list(logger.handlers):
+        logger.removeHandler(previous_handler)
+    
+    if level is None:
+        logger.addHandler(logging.NullHandler())
+        logger.setLevel(CONST_LOG_LEVEL_DISABLED)
+        return
+    
+    logger.addHandler(handler if handler is not None else ColoredConsoleHandler())
+    logger.setLevel(level)
@@ -1,6 +1,20 @@
-
+import bz2
 import csv
-from .constants import CONST_SOURCE_CLASS_KEY, CONST_TARGET_CLASS_KEY, CONST_RELATIONSHIP_KEY, CONST_SCHEMA_KEY, CYPHER_QUERIES_CSV_FILE_PATH
+import gzip
+import io
+import json
+import lzma
+import sys
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import islice
+from .constants import *
+from .schema import CompiledSchema
+
+class InvalidSchemaError(ValueError):
+    """
+    Raised when a schema string can't be parsed.
+    """
 
 def process_schema(input_str):
     """
@@ -22,6 +36,9 @@ def process_schema(input_str):
         CONST_TARGET_CLASS_KEY: "ClassB"
       }
 
+    Raises:
+    - InvalidSchemaError: If a definition doesn't have exactly a source class, a relationship and a target class.
+
     Example:
     ```python
     input_schema = "(ClassA,REL,ClassB),(ClassC,REL,ClassD)"
@@ -39,8 +56,11 @@ def process_schema(input_str):
         # Remove opening and closing parentheses
         schema_definition = schema_definition.strip('()')
 
-        # Split the schema into its components
-        components = [component.strip() for component in schema_definition.split(',')]
+        # Split the schema into its components, class and relationship names are interned
+        # since the same few names are repeated across every schema
+        components = [sys.intern(component.strip()) for component in schema_definition.split(',')]
+        if len(components) != 3:
+            raise InvalidSchemaError(f'Malformed schema definition ({schema_definition}), expected (sourceClass, relationship, targetClass)')
 
         # Add the components to a dictionary
         schema_dict = {
@@ -52,17 +72,304 @@ def process_schema(input_str):
 
     return result
 
-def parse_csv_with_cypher_queries():
+@lru_cache(maxsize=CONST_SCHEMA_CACHE_SIZE)
+def load_schema(input_str):
+    """
+    Parses and compiles a schema string, memoized on the raw string.
+
+    Rows that carry an identical schema string share one immutable `CompiledSchema`
+    instance, so a schema is parsed and indexed only once no matter how many queries
+    use it. The cache is a bounded LRU of `CONST_SCHEMA_CACHE_SIZE` entries.
+
+    Parameters:
+    - input_str (str): The string representation of the schema, 
+      e.g. "(ClassA,REL,ClassB),(ClassC,REL,ClassD)".
+
+    Returns:
+    - CompiledSchema: The shared compiled schema for the given string.
+
+    Example:
+    ```python
+    load_schema("(ClassA,REL,ClassB)") is load_schema("(ClassA,REL,ClassB)")  # True
+    ```
+
+    """
+    return CompiledSchema(process_schema(input_str))
+
+@contextmanager
+def open_input_file(file_path):
+    """
+    Opens a file for reading text, decompressing it transparently.
+
+    The compression (gzip, bzip2 or xz) is detected from the first bytes of the file, 
+    so it works for any file name and for the standard input.
+
+    Parameters:
+    - file_path (str): Path of the file, or `CONST_STANDARD_STREAM_PATH` ("-") for the standard input.
+
+    Yields:
+    - io.TextIOWrapper: The text stream of the file.
+
+    Example:
+    ```python
+    with open_input_file("queries.csv.gz") as input_file:
+        first_line = input_file.readline()
+    ```
+
+    """
+    if file_path == CONST_STANDARD_STREAM_PATH:
+        raw_file = sys.stdin.buffer
+    else:
+        raw_file = open(file_path, mode='rb', buffering=CONST_IO_BUFFER_SIZE)
+    
+    # Peek the magic bytes without consuming them
+    magic = raw_file.peek(len(CONST_XZ_MAGIC))
+    if magic.startswith(CONST_GZIP_MAGIC):
+        binary_file = gzip.GzipFile(fileobj=raw_file, mode='rb')
+    elif magic.startswith(CONST_BZIP2_MAGIC):
+        binary_file = bz2.BZ2File(raw_file, mode='rb')
+    elif magic.startswith(CONST_XZ_MAGIC):
+        binary_file = lzma.LZMAFile(raw_file, mode='rb')
+    else:
+        binary_file = raw_file
+    
+    text_file = io.TextIOWrapper(binary_file, encoding='utf-8', newline='')
+    try:
+        yield text_file
+    finally:
+        # The standard input is detached instead of closed so it remains usable
+        text_file.detach()
+        if binary_file is not raw_file:
+            binary_file.close()
+        if file_path != CONST_STANDARD_STREAM_PATH:
+            raw_file.close()
+
+@contextmanager
+def open_output_file(file_path):
+    """
+    Opens a buffered file for writing text, compressing it based on its extension.
+
+    Files ending in `.gz`, `.bz2` or `.xz` are compressed with gzip, bzip2 or xz respectively.
+
+    Parameters:
+    - file_path (str): Path of the file, or `CONST_STANDARD_STREAM_PATH` ("-") for the standard output.
+
+    Yields:
+    - io.TextIOWrapper: The text stream of the file.
+    """
+    if file_path == CONST_STANDARD_STREAM_PATH:
+        binary_file = sys.stdout.buffer
+    elif file_path.endswith(CONST_GZIP_EXTENSION):
+        binary_file = gzip.open(file_path, mode='wb')
+    elif file_path.endswith(CONST_BZIP2_EXTENSION):
+        binary_file = bz2.open(file_path, mode='wb')
+    elif file_path.endswith(CONST_XZ_EXTENSION):
+        binary_file = lzma.open(file_path, mode='wb')
+    else:
+        binary_file = open(file_path, mode='wb', buffering=CONST_IO_BUFFER_SIZE)
+    
+    text_file = io.TextIOWrapper(binary_file, encoding='utf-8', newline='')
+    try:
+        yield text_file
+    finally:
+        text_file.flush()
+        # The standard output is detached instead of closed so it remains usable
+        text_file.detach()
+        if file_path != CONST_STANDARD_STREAM_PATH:
+            binary_file.close()
+
+def detect_file_format(file_path):
+    """
+    Detects the format (CSV or JSONL) of a file from its extension.
+
+    Compression extensions are ignored, so "queries.jsonl.gz" is a JSONL file. 
+    Files without a known extension, including the standard streams, are CSV files.
+
+    Parameters:
+    - file_path (str): Path of the file.
+
+    Returns:
+    - str: `CONST_FORMAT_CSV` or `CONST_FORMAT_JSONL`.
+    """
+    for extension in (CONST_GZIP_EXTENSION, CONST_BZIP2_EXTENSION, CONST_XZ_EXTENSION):
+        if file_path.endswith(extension):
+            file_path = file_path[:-len(extension)]
+            break
+    
+    if file_path.endswith('.' + CONST_FORMAT_JSONL):
+        return CONST_FORMAT_JSONL
+    return CONST_FORMAT_CSV
+
+def read_csv_queries(file_path):
+    """
+    Reads the rows of a CSV file with Cypher queries one at a time.
+
+    The file must have the `statement` and `schema` columns, and can have the 
+    `correct_query` column. Memory usage does not depend on the size of the file.
+
+    Parameters:
+    - file_path (str): Path of the file (optionally compressed), or "-" for the standard input.
+
+    Yields:
+    - dict: One row of the file, with the schema as the raw schema string 
+      (use `load_schema` to get the compiled schema).
+    """
+    with open_input_file(file_path) as csv_file:
+        yield from csv.DictReader(csv_file)
+
+def read_jsonl_queries(file_path):
+    """
+    Reads the rows of a JSONL file with Cypher queries one at a time.
+
+    Each line must be a JSON object with the `statement` and `schema` keys, and can have the 
+    `correct_query` key. Empty lines are skipped. Memory usage does not depend on the size of the file.
+
+    Parameters:
+    - file_path (str): Path of the file (optionally compressed), or "-" for the standard input.
+
+    Yields:
+    - dict: One row of the file, with the schema as the raw schema string 
+      (use `load_schema` to get the compiled schema).
+    """
+    with open_input_file(file_path) as jsonl_file:
+        for line in jsonl_file:
+            if line.strip():
+                yield json.loads(line)
+
+def read_queries(file_path, file_format=None):
+    """
+    Reads the rows of a CSV or JSONL file with Cypher queries one at a time.
+
+    Parameters:
+    - file_path (str): Path of the file (optionally compressed), or "-" for the standard input.
+    - file_format (str, optional): `CONST_FORMAT_CSV` or `CONST_FORMAT_JSONL`. 
+      Detected from the file extension when not provided.
+
+    Yields:
+    - dict: One row of the file, with the schema as the raw schema string.
+
+    Example:
+    ```python
+    for row in read_queries("queries.jsonl.gz"):
+        result = process_query(row[CONST_STATEMENT_KEY], load_schema(row[CONST_SCHEMA_KEY]))
+    ```
+
+    """
+    file_format = file_format or detect_file_format(file_path)
+    if file_format == CONST_FORMAT_JSONL:
+        return read_jsonl_queries(file_path)
+    return read_csv_queries(file_path)
+
+def write_csv_results(file_path, rows, batch_size=CONST_WRITE_BATCH_SIZE):
+    """
+    Writes rows with processed Cypher queries to a CSV file.
+
+    The columns are `statement`, `schema`, `correct_query` and `result_query`; missing 
+    values are written empty. Rows are consumed lazily and written in bulk.
+
+    Parameters:
+    - file_path (str): Path of the file (compressed based on its extension), or "-" for the standard output.
+    - rows (iterable[dict]): Rows to write, with the schema as the raw schema string.
+    - batch_size (int, optional): Number of rows written (and flushed) at once. Use 1 to 
+      stream every row as soon as it is available, e.g. in a shell pipeline.
+
+    Returns:
+    - int: Number of rows written.
+    """
+    rows = iter(rows)
+    count = 0
+    
+    with open_output_file(file_path) as csv_file:
+        csv_writer = csv.DictWriter(csv_file, fieldnames=[CONST_STATEMENT_KEY, CONST_SCHEMA_KEY, CONST_CORRECT_QUERY_KEY, CONST_RESULT_QUERY_KEY], extrasaction='ignore')
+        csv_writer.writeheader()
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            csv_writer.writerows(batch)
+            csv_file.flush()
+            count += len(batch)
+    
+    return count
+
+def write_jsonl_results(file_path, rows, batch_size=CONST_WRITE_BATCH_SIZE):
+    """
+    Writes rows with processed Cypher queries to a JSONL file.
+
+    Each row is written as a JSON object in its own line. Rows are consumed lazily and written in bulk.
+
+    Parameters:
+    - file_path (str): Path of the file (compressed based on its extension), or "-" for the standard output.
+    - rows (iterable[dict]): Rows to write, with the schema as the raw schema string.
+    - batch_size (int, optional): Number of rows written (and flushed) at once. Use 1 to 
+      stream every row as soon as it is available, e.g. in a shell pipeline.
+
+    Returns:
+    - int: Number of rows written.
+    """
+    rows = iter(rows)
+    count = 0
+    
+    with open_output_file(file_path) as jsonl_file:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            jsonl_file.write(''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in batch))
+            jsonl_file.flush()
+            count += len(batch)
+    
+    return count
+
+def write_results(file_path, rows, file_format=None, batch_size=CONST_WRITE_BATCH_SIZE):
+    """
+    Writes rows with processed Cypher queries to a CSV or JSONL file.
+
+    Parameters:
+    - file_path (str): Path of the file (compressed based on its extension), or "-" for the standard output.
+    - rows (iterable[dict]): Rows to write, with the schema as the raw schema string.
+    - file_format (str, optional): `CONST_FORMAT_CSV` or `CONST_FORMAT_JSONL`. 
+      Detected from the file extension when not provided.
+    - batch_size (int, optional): Number of rows written (and flushed) at once. Use 1 to 
+      stream every row as soon as it is available, e.g. in a shell pipeline.
+
+    Returns:
+    - int: Number of rows written.
+
+    Example:
+    ```python
+    def corrected_rows():
+        for row in read_queries("queries.csv.gz"):
+            row[CONST_RESULT_QUERY_KEY] = process_query(row[CONST_STATEMENT_KEY], load_schema(row[CONST_SCHEMA_KEY]))
+            yield row
+    
+    write_results("results.jsonl.xz", corrected_rows())
+    ```
+
+    """
+    file_format = file_format or detect_file_format(file_path)
+    if file_format == CONST_FORMAT_JSONL:
+        return write_jsonl_results(file_path, rows, batch_size)
+    return write_csv_results(file_path, rows, batch_size)
+
+def parse_csv_with_cypher_queries(file_path=CYPHER_QUERIES_CSV_FILE_PATH):
     """
     Parses a CSV file containing Cypher queries and returns them as a list of dictionaries.
 
-    This function reads a predefined CSV file containing Cypher queries. Each row 
+    This function reads a CSV file containing Cypher queries (the example file by default). Each row 
     of the CSV file corresponds to a Cypher query and its associated schema. The function 
-    processes each row's schema into a structured dictionary before appending it to the results.
+    processes each row's schema into a compiled schema before appending it to the results. 
+    Rows with the same schema string share the same compiled schema instance.
+
+    Parameters:
+    - file_path (str, optional): Path of the file, defaults to `CYPHER_QUERIES_CSV_FILE_PATH`.
 
     Returns:
     - list[dict]: A list of dictionaries where each dictionary represents a row from the 
-      CSV and has the processed schema along with the Cypher query.
+      CSV and has the compiled schema along with the Cypher query.
+
+    Note:
+    - The whole file is loaded in memory, use `read_queries` to process big files.
 
     Example:
     ```python
@@ -72,13 +379,10 @@ def parse_csv_with_cypher_queries():
     """
     cypher_queries = []
     
-    # Open the CSV file and read it line by line
-    with open(CYPHER_QUERIES_CSV_FILE_PATH, mode='r') as csv_file:
-        csv_reader = csv.DictReader(csv_file)
-        # For each row in the csv
-        for row in csv_reader:
-            # Pre-process the schema
-            row[CONST_SCHEMA_KEY] = process_schema(row[CONST_SCHEMA_KEY])
-            cypher_queries.append(row)
+    # Read the CSV file line by line
+    for row in read_csv_queries(file_path):
+        # Pre-process the schema
+        row[CONST_SCHEMA_KEY] = load_schema(row[CONST_SCHEMA_KEY])
+        cypher_queries.append(row)
     
     return cypher_queries
\ No newline at end of file
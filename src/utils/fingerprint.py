@@ -0,0 +1,90 @@
+import re
+from .constants import CONST_LITERAL_PLACEHOLDER, CONST_EMPTY_STRING
+
+# Tokens that may contain quotes or digits which are not literals are matched first and kept:
+# comments and backtick-quoted names. Numbers that are part of a name or a parameter are not matched.
+# An unterminated comment, name or string is matched up to the end of the query and kept, so it is 
+# scanned once and the normalization stops there instead of rescanning the rest at every position.
+# The lookahead skips quickly the positions where no token can start.
+LITERAL_PATTERN = re.compile(r'''(?=[/`"'0-9])(?:
+    (?P<comment>//[^\n]*|/\*(?:.*?\*/|.*))
+    |(?P<name>`[^`]*`?)
+    |"(?P<double_quoted>[^"\\]*(?:\\.[^"\\]*)*)"
+    |'(?P<single_quoted>[^'\\]*(?:\\.[^'\\]*)*)'
+    |(?P<unterminated>["'].*)
+    |(?<![\w$])(?P<number>\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)(?![\w$])
+)''', re.VERBOSE | re.DOTALL)
+
+LITERAL_GROUPS = frozenset(['double_quoted', 'single_quoted', 'number'])
+
+def normalize_query(query):
+    """
+    Masks the string and number literals of a Cypher query into a canonical template.
+
+    The content of every string literal and every number is replaced by a placeholder, 
+    so queries that only differ in their values, like {id:"Foo"} and {id:"Bar"}, share 
+    the same template. Quotes are kept, so the template is parsed like the query.
+    The query is scanned once, in linear time: nothing is masked after an unterminated 
+    comment or string.
+
+    Parameters:
+    - query (str): The Cypher query.
+
+    Returns:
+    - tuple or None: A tuple containing:
+      1. str: The template.
+      2. list[str]: The masked literals, in order of appearance.
+      Or None if the query already contains the placeholder and can't be normalized.
+
+    Example:
+    ```python
+    template, literals = normalize_query('MATCH (a {id:"Foo"}) RETURN a LIMIT 10')
+    # template: 'MATCH (a {id:"\\x00"}) RETURN a LIMIT \\x00', literals: ['Foo', '10']
+    ```
+    """
+    if CONST_LITERAL_PLACEHOLDER in query:
+        return None
+    
+    parts = []
+    literals = []
+    position = 0
+    for match in LITERAL_PATTERN.finditer(query):
+        if match.lastgroup not in LITERAL_GROUPS:
+            continue
+        literal_start, literal_end = match.span(match.lastgroup)
+        parts.append(query[position:literal_start])
+        parts.append(CONST_LITERAL_PLACEHOLDER)
+        literals.append(query[literal_start:literal_end])
+        position = literal_end
+    
+    if not literals:
+        return query, literals
+    parts.append(query[position:])
+    return CONST_EMPTY_STRING.join(parts), literals
+
+def restore_literals(template, literals):
+    """
+    Substitutes the masked literals back into a template.
+
+    Parameters:
+    - template (str): The template, possibly processed, with one placeholder per literal.
+    - literals (list[str]): The literals returned by `normalize_query`.
+
+    Returns:
+    - str: The query with its literals, or an empty string if the template is empty 
+      (the query could not be corrected).
+
+    Raises:
+    - ValueError: If the number of placeholders doesn't match the number of literals.
+    """
+    if not literals or template == CONST_EMPTY_STRING:
+        return template
+    parts = template.split(CONST_LITERAL_PLACEHOLDER)
+    if len(parts) != len(literals) + 1:
+        raise ValueError(f'The template has {len(parts) - 1} placeholders for {len(literals)} literals')
+    
+    restored = [parts[0]]
+    for literal, part in zip(literals, parts[1:]):
+        restored.append(literal)
+        restored.append(part)
+    return CONST_EMPTY_STRING.join(restored)
@@ -0,0 +1,457 @@
+import asyncio
+import json
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from .batch_processing import index_schemas, init_worker, process_chunk_rows
+from .constants import *
+from .diagnostics import logger
+from .file_processing import InvalidSchemaError
+from .schema_registry import UnknownSchemaError, schema_registry
+
+class QueueFullError(Exception):
+    """
+    Raised when a query can't be queued because the queue of the micro-batcher is full.
+    """
+
+class BatcherStoppedError(Exception):
+    """
+    Raised for the queries still waiting in the micro-batcher when it stops.
+    """
+
+class MicroBatcher:
+    """
+    Groups concurrent queries into small batches processed by a pool of workers.
+
+    Queries wait in a bounded queue. A batch is sent to the pool when it reaches the 
+    maximum size or when the batching window ends, whatever happens first. At most 
+    `max_pending_batches` batches are processed at the same time; while the pool is 
+    busy the queue fills up, and once it is full new queries are rejected, which gives 
+    backpressure to the clients.
+
+    Parameters:
+    - executor (concurrent.futures.Executor): The pool of workers, initialized with `init_worker` or `init_service_worker`.
+    - max_batch_size (int, optional): Maximum number of queries in a batch.
+    - batch_window (float, optional): Seconds waited for more queries once a batch is started.
+    - max_queue_size (int, optional): Maximum number of queued queries.
+    - max_pending_batches (int, optional): Maximum number of batches processed at the same time.
+
+    Usage:
+    ```python
+    batcher = MicroBatcher(executor)
+    batcher.start()
+    result = await batcher.submit(query, schema_string)
+    ```
+
+    """
+    def __init__(self, executor, max_batch_size=CONST_SERVER_BATCH_SIZE, batch_window=CONST_SERVER_BATCH_WINDOW, max_queue_size=CONST_SERVER_QUEUE_SIZE, max_pending_batches=None):
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+        self.queue = asyncio.Queue(max_queue_size)
+        self.pending_batches = asyncio.Semaphore(max_pending_batches or os.cpu_count() or 1)
+        self.batch_tasks = set()
+        self.batch = None
+        self.task = None
+
+    def start(self):
+        """
+        Starts collecting queries into batches.
+        """
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """
+        Stops collecting queries and waits for the batches in progress.
+
+        The queries that were not sent to the pool yet, queued or in the batch being 
+        collected, fail with `BatcherStoppedError`.
+        """
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+        
+        batch = self.batch or []
+        self.batch = None
+        while not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        error = BatcherStoppedError('The service is stopping')
+        for query, schema, future in batch:
+            if not future.done():
+                future.set_exception(error)
+        
+        await asyncio.gather(*self.batch_tasks, return_exceptions=True)
+
+    async def submit(self, query, schema):
+        """
+        Queues a query and waits for its result.
+
+        Parameters:
+        - query (str): The Cypher query.
+        - schema (str, list[dict] or CompiledSchema): The schema of the query.
+
+        Returns:
+        - str: The processed query.
+
+        Raises:
+        - QueueFullError: If the queue is full.
+        - BatcherStoppedError: If the batcher stops before the query is sent to the pool.
+        """
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((query, schema, future))
+        except asyncio.QueueFull:
+            raise QueueFullError(f'More than {self.queue.maxsize} queries are waiting')
+        return await future
+
+    def drain(self, batch):
+        """
+        Moves queued queries into the batch, without waiting, until the batch is full.
+
+        Parameters:
+        - batch (list): The batch being collected.
+        """
+        while len(batch) < self.max_batch_size and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+
+    async def run(self):
+        """
+        Collects queued queries into batches and sends them to the pool, until cancelled.
+        """
+        while True:
+            # Kept on the batcher so that `stop` can fail the queries of a partial batch
+            self.batch = batch = [await self.queue.get()]
+            self.drain(batch)
+            # Wait once for the batching window if the batch is not full yet
+            if len(batch) < self.max_batch_size and self.batch_window > 0:
+                await asyncio.sleep(self.batch_window)
+                self.drain(batch)
+            
+            # Limit the batches in progress, the queue fills up meanwhile
+            await self.pending_batches.acquire()
+            task = asyncio.create_task(self.process_batch(batch))
+            self.batch = None
+            self.batch_tasks.add(task)
+            task.add_done_callback(self.batch_tasks.discard)
+
+    async def process_batch(self, batch):
+        """
+        Processes a batch in the pool and sets the result of every query.
+
+        Every row is processed on its own (see `process_chunk_rows`), so the error of a 
+        query only fails its own future; an error of the whole batch (e.g. a broken pool) 
+        fails every future.
+
+        Parameters:
+        - batch (list[tuple]): Triples of query, schema and future.
+        """
+        try:
+            chunk = index_schemas((query, schema) for query, schema, future in batch)
+            results = await asyncio.get_running_loop().run_in_executor(self.executor, process_chunk_rows, chunk)
+            for (query, schema, future), (result, error) in zip(batch, results):
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+        except Exception as error:
+            for query, schema, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+        finally:
+            self.pending_batches.release()
+
+def init_service_worker(cache=None):
+    """
+    Initializes a worker process of the service.
+
+    Workers ignore interrupts, the service stops them when it shuts down.
+
+    Parameters:
+    - cache (QueryResultCache, optional): Cache of results for the worker.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    init_worker((), cache)
+
+class HttpError(Exception):
+    """
+    Raised while handling a request to answer it with an HTTP error status.
+
+    Parameters:
+    - status (HTTPStatus): The status of the response.
+    - message (str): Description of the error, sent in the response body.
+    """
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+async def read_request(reader):
+    """
+    Reads an HTTP/1.1 request from a connection.
+
+    Parameters:
+    - reader (asyncio.StreamReader): The reader of the connection.
+
+    Returns:
+    - tuple or None: Method, path, version, headers (with lowercase names) and body, 
+      or None if the connection was closed before a new request.
+
+    Raises:
+    - HttpError: If the request is malformed or its body is too big.
+    """
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError as error:
+        if error.partial.strip():
+            raise HttpError(HTTPStatus.BAD_REQUEST, 'Incomplete request')
+        return None
+    except asyncio.LimitOverrunError:
+        raise HttpError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, 'Request headers are too large')
+    
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, path, version = lines[0].split(' ', 2)
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+        content_length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, 'Malformed request')
+    
+    if content_length > CONST_SERVER_MAX_BODY_SIZE:
+        raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f'The body is bigger than {CONST_SERVER_MAX_BODY_SIZE} bytes')
+    body = await reader.readexactly(content_length) if content_length else b''
+    return method, path, version, headers, body
+
+def build_response(status, payload, keep_alive):
+    """
+    Builds an HTTP/1.1 response with a JSON body.
+
+    Parameters:
+    - status (HTTPStatus): The status of the response.
+    - payload (dict): The body of the response.
+    - keep_alive (bool): Whether the connection is kept open after the response.
+
+    Returns:
+    - bytes: The response.
+    """
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    head = (f'HTTP/1.1 {status.value} {status.phrase}\r\n'
+            f'Content-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f'Connection: {"keep-alive" if keep_alive else "close"}\r\n')
+    if status == HTTPStatus.SERVICE_UNAVAILABLE:
+        head += 'Retry-After: 1\r\n'
+    return (head + '\r\n').encode('latin-1') + body
+
+class CorrectionService:
+    """
+    HTTP service that exposes `process_query` as a JSON endpoint.
+
+    Endpoints:
+    - POST /process with a body like {"query": "MATCH ...", "schema": "(Person, KNOWS, Person)"} 
+      answers {"query": "<processed query>"}. Instead of the schema, the body can refer to a 
+      registered schema with "schema_id" and, optionally, "schema_version".
+    - PUT /schemas/<schema ID> with a body like {"schema": "(Person, KNOWS, Person)"} registers 
+      a schema and answers {"schema_id": "<schema ID>", "schema_version": <version>}.
+    - GET /schemas/<schema ID> answers the latest version of a registered schema.
+    - GET /health answers {"status": "ok"} and the number of queued queries.
+
+    Connections are kept alive between requests (HTTP/1.1), and concurrent requests are 
+    processed in micro-batches by a `MicroBatcher`. When the queue is full the service 
+    answers 503 with a Retry-After header.
+
+    Parameters:
+    - batcher (MicroBatcher): The micro-batcher that processes the queries.
+    - registry (SchemaRegistry, optional): Registry of the schemas, defaults to `schema_registry`.
+
+    Note:
+    - Registered schemas are sent to the workers as their schema string, at most once per 
+      batch, and every worker parses and compiles a given schema string only once.
+    """
+    def __init__(self, batcher, registry=None):
+        self.batcher = batcher
+        self.registry = registry if registry is not None else schema_registry
+
+    async def handle_connection(self, reader, writer):
+        """
+        Serves the requests of a connection until the client closes it or stops keeping it alive.
+
+        Parameters:
+        - reader (asyncio.StreamReader): The reader of the connection.
+        - writer (asyncio.StreamWriter): The writer of the connection.
+        """
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader), CONST_SERVER_KEEP_ALIVE_TIMEOUT)
+                except HttpError as error:
+                    writer.write(build_response(error.status, {'error': error.message}, False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                
+                method, path, version, headers, body = request
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection == 'keep-alive' if version == 'HTTP/1.0' else connection != 'close'
+                
+                try:
+                    status, payload = await self.handle_request(method, path, body)
+                except HttpError as error:
+                    status, payload = error.status, {'error': error.message}
+                
+                writer.write(build_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, method, path, body):
+        """
+        Handles a request and returns the status and payload of the response.
+
+        Parameters:
+        - method (str): The HTTP method.
+        - path (str): The path of the request.
+        - body (bytes): The body of the request.
+
+        Returns:
+        - tuple[HTTPStatus, dict]: The status and payload of the response.
+
+        Raises:
+        - HttpError: If the request can't be processed.
+        """
+        if path == CONST_SERVER_HEALTH_PATH:
+            return HTTPStatus.OK, {'status': 'ok', 'queued': self.batcher.queue.qsize()}
+        if path.startswith(CONST_SERVER_SCHEMAS_PATH) and len(path) > len(CONST_SERVER_SCHEMAS_PATH):
+            return await self.handle_schema_request(method, path[len(CONST_SERVER_SCHEMAS_PATH):], body)
+        if path != CONST_SERVER_PROCESS_PATH:
+            raise HttpError(HTTPStatus.NOT_FOUND, f'Unknown path {path}')
+        if method != 'POST':
+            raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, f'Use POST for {path}')
+        
+        payload = parse_payload(body)
+        if not isinstance(payload.get(CONST_QUERY_KEY), str):
+            raise HttpError(HTTPStatus.BAD_REQUEST, f'The body must have the "{CONST_QUERY_KEY}" string')
+        if isinstance(payload.get(CONST_SCHEMA_KEY), str):
+            schema = payload[CONST_SCHEMA_KEY]
+        elif isinstance(payload.get(CONST_SCHEMA_ID_KEY), str):
+            if not isinstance(payload.get(CONST_SCHEMA_VERSION_KEY, 0), int):
+                raise HttpError(HTTPStatus.BAD_REQUEST, f'The "{CONST_SCHEMA_VERSION_KEY}" must be an integer')
+            try:
+                schema_version = self.registry.get_version(payload[CONST_SCHEMA_ID_KEY], payload.get(CONST_SCHEMA_VERSION_KEY))
+            except UnknownSchemaError as error:
+                raise HttpError(HTTPStatus.NOT_FOUND, error.args[0])
+            schema = schema_version.source if schema_version.source is not None else schema_version.schema
+        else:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f'The body must have the "{CONST_SCHEMA_KEY}" or the "{CONST_SCHEMA_ID_KEY}" string')
+        
+        try:
+            result = await self.batcher.submit(payload[CONST_QUERY_KEY], schema)
+        except (QueueFullError, BatcherStoppedError) as error:
+            raise HttpError(HTTPStatus.SERVICE_UNAVAILABLE, str(error))
+        except InvalidSchemaError as error:
+            raise HttpError(HTTPStatus.BAD_REQUEST, str(error))
+        except Exception as error:
+            logger.warning('Error processing query %s: %s', payload[CONST_QUERY_KEY], error)
+            raise HttpError(HTTPStatus.INTERNAL_SERVER_ERROR, 'The query could not be processed')
+        return HTTPStatus.OK, {CONST_QUERY_KEY: result}
+
+    async def handle_schema_request(self, method, schema_id, body):
+        """
+        Registers a schema (PUT) or returns its latest version (GET).
+
+        A schema is parsed and compiled in the default executor of the event loop, so 
+        registering a big schema doesn't block the other requests.
+
+        Parameters:
+        - method (str): The HTTP method.
+        - schema_id (str): The ID of the schema, taken from the path.
+        - body (bytes): The body of the request.
+
+        Returns:
+        - tuple[HTTPStatus, dict]: The status and payload of the response.
+
+        Raises:
+        - HttpError: If the request can't be processed.
+        """
+        if method == 'PUT':
+            payload = parse_payload(body)
+            if not isinstance(payload.get(CONST_SCHEMA_KEY), str):
+                raise HttpError(HTTPStatus.BAD_REQUEST, f'The body must have the "{CONST_SCHEMA_KEY}" string')
+            try:
+                schema_version = await asyncio.get_running_loop().run_in_executor(None, self.registry.register, schema_id, payload[CONST_SCHEMA_KEY])
+            except InvalidSchemaError as error:
+                raise HttpError(HTTPStatus.BAD_REQUEST, str(error))
+        elif method == 'GET':
+            try:
+                schema_version = self.registry.latest_version(schema_id)
+            except UnknownSchemaError as error:
+                raise HttpError(HTTPStatus.NOT_FOUND, error.args[0])
+        else:
+            raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, 'Use PUT or GET for schemas')
+        return HTTPStatus.OK, {CONST_SCHEMA_ID_KEY: schema_id, CONST_SCHEMA_VERSION_KEY: schema_version}
+
+def parse_payload(body):
+    """
+    Parses the JSON object in the body of a request.
+
+    Parameters:
+    - body (bytes): The body of the request.
+
+    Returns:
+    - dict: The parsed object.
+
+    Raises:
+    - HttpError: If the body is not a JSON object.
+    """
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, 'The body must be JSON')
+    if not isinstance(payload, dict):
+        raise HttpError(HTTPStatus.BAD_REQUEST, 'The body must be a JSON object')
+    return payload
+
+async def serve(host=CONST_SERVER_HOST, port=CONST_SERVER_PORT, workers=None, max_batch_size=CONST_SERVER_BATCH_SIZE, batch_window=CONST_SERVER_BATCH_WINDOW, max_queue_size=CONST_SERVER_QUEUE_SIZE, cache=None, ready=None):
+    """
+    Runs the HTTP correction service until cancelled.
+
+    Parameters:
+    - host (str, optional): The address to listen on.
+    - port (int, optional): The port to listen on.
+    - workers (int, optional): Number of worker processes, defaults to the number of CPUs.
+    - max_batch_size (int, optional): Maximum number of queries in a batch.
+    - batch_window (float, optional): Seconds waited for more queries once a batch is started.
+    - max_queue_size (int, optional): Maximum number of queued queries.
+    - cache (QueryResultCache, optional): Cache of results for the workers.
+    - ready (asyncio.Event, optional): Event set once the service is listening.
+
+    Usage:
+    ```python
+    asyncio.run(serve(port=8080, workers=4))
+    ```
+
+    """
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_service_worker, initargs=(cache,)) as executor:
+        batcher = MicroBatcher(executor, max_batch_size, batch_window, max_queue_size, workers)
+        service = CorrectionService(batcher)
+        try:
+            batcher.start()
+            server = await asyncio.start_server(service.handle_connection, host, port)
+            async with server:
+                if ready is not None:
+                    ready.set()
+                await server.serve_forever()
+        finally:
+            await batcher.stop()
@@ -0,0 +1,248 @@
+import json
+import threading
+from bisect import bisect_left
+from .constants import CONST_METRICS_PREFIX, CONST_METRICS_LATENCY_BUCKETS, CONST_METRICS_PATTERN_BUCKETS
+
+# Stages of the processing of a query, timed separately
+STAGES = (
+    'normalize',  # masking the literals of the query
+    'cache',      # looking up and storing the result in the result cache
+    'parse',      # scanning the patterns and the symbol table
+    'check',      # checking that the names of the patterns exist in the schema
+    'resolve',    # resolving the classes of the variables and the hops of the patterns
+    'lookup',     # looking up the hops in the schema and deciding the fixes
+    'rewrite',    # applying the edits
+    'total',      # the whole call of `process_query`
+)
+
+# Outcomes of a processed query
+OUTCOMES = (
+    'unchanged',  # every direction was right
+    'corrected',  # at least one direction was fixed
+    'rejected',   # the query doesn't fit the schema, an empty string was returned
+)
+
+# Reasons to reject a pattern
+REJECTION_REASONS = (
+    'unknown_relationship',  # none of the relationships exists in the schema
+    'unknown_label',         # none of the classes of a node exists in the schema
+    'both_directions',       # the relationship has both arrows
+    'no_schema_pattern',     # the pattern doesn't exist in the schema in any direction
+)
+
+class Histogram:
+    """
+    Cumulative histogram with fixed bucket upper bounds, like the Prometheus histograms.
+
+    Parameters:
+    - buckets (tuple[float]): Sorted upper bounds of the buckets, the +Inf bucket is implicit.
+    """
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        """
+        Records a value.
+
+        Parameters:
+        - value (float): The observed value.
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        """
+        Returns the content of the histogram.
+
+        Returns:
+        - dict: Sum, count and cumulative count of every bucket upper bound (including '+Inf').
+        """
+        cumulative_counts = {}
+        cumulative_count = 0
+        for upper_bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative_count += count
+            cumulative_counts[str(upper_bound)] = cumulative_count
+        return {'sum': self.sum, 'count': self.count, 'buckets': cumulative_counts}
+
+class QueryMetrics:
+    """
+    Timing and outcome metrics of the query processing.
+
+    Metrics are disabled by default, so the processing only pays for a boolean check. 
+    Once enabled, `process_query` records the time spent in every stage (see `STAGES`), 
+    the outcome of every query (see `OUTCOMES`), the patterns found per query, the 
+    fixed directions, the cache hits and the reason of every rejected pattern 
+    (see `REJECTION_REASONS`).
+
+    Metrics are kept per process: worker processes of a batch or of the HTTP service 
+    record their own metrics.
+
+    Parameters:
+    - latency_buckets (tuple[float], optional): Upper bounds of the latency histograms, in seconds.
+    - pattern_buckets (tuple[int], optional): Upper bounds of the histogram of patterns per query.
+
+    Usage:
+    ```python
+    metrics.enable()
+    process_query(query, schema)
+    metrics.snapshot()['outcomes']  # {'unchanged': 0, 'corrected': 1, 'rejected': 0}
+    print(metrics.to_prometheus())
+    ```
+
+    """
+    def __init__(self, latency_buckets=CONST_METRICS_LATENCY_BUCKETS, pattern_buckets=CONST_METRICS_PATTERN_BUCKETS):
+        self.latency_buckets = latency_buckets
+        self.pattern_buckets = pattern_buckets
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.reset()
+
+    def enable(self):
+        """
+        Starts recording metrics.
+        """
+        self.enabled = True
+
+    def disable(self):
+        """
+        Stops recording metrics, the recorded metrics are kept.
+        """
+        self.enabled = False
+
+    def reset(self):
+        """
+        Removes every recorded metric.
+        """
+        with self.lock:
+            self.stage_seconds = {stage: Histogram(self.latency_buckets) for stage in STAGES}
+            self.patterns_per_query = Histogram(self.pattern_buckets)
+            self.outcomes = dict.fromkeys(OUTCOMES, 0)
+            self.rejections = dict.fromkeys(REJECTION_REASONS, 0)
+            self.flips = 0
+            self.cache_hits = 0
+
+    def observe_stage(self, stage, seconds):
+        """
+        Records the time spent in a stage.
+
+        Parameters:
+        - stage (str): One of `STAGES`.
+        - seconds (float): The time spent.
+        """
+        with self.lock:
+            self.stage_seconds[stage].observe(seconds)
+
+    def observe_patterns(self, pattern_count, flip_count):
+        """
+        Records the patterns found in a query and the directions fixed.
+
+        Parameters:
+        - pattern_count (int): Number of patterns found.
+        - flip_count (int): Number of directions fixed.
+        """
+        with self.lock:
+            self.patterns_per_query.observe(pattern_count)
+            self.flips += flip_count
+
+    def observe_outcome(self, outcome):
+        """
+        Records the outcome of a query.
+
+        Parameters:
+        - outcome (str): One of `OUTCOMES`.
+        """
+        with self.lock:
+            self.outcomes[outcome] += 1
+
+    def observe_rejection(self, reason):
+        """
+        Records a rejected pattern, if the metrics are enabled.
+
+        Parameters:
+        - reason (str): One of `REJECTION_REASONS`.
+        """
+        if self.enabled:
+            with self.lock:
+                self.rejections[reason] += 1
+
+    def observe_cache_hit(self):
+        """
+        Records a result found in the result cache.
+        """
+        with self.lock:
+            self.cache_hits += 1
+
+    def snapshot(self):
+        """
+        Returns every recorded metric.
+
+        Returns:
+        - dict: The stage histograms (in seconds), the histogram of patterns per query, and 
+          the counts of outcomes, rejections, flips and cache hits.
+        """
+        with self.lock:
+            return {
+                'stage_seconds': {stage: histogram.snapshot() for stage, histogram in self.stage_seconds.items()},
+                'patterns_per_query': self.patterns_per_query.snapshot(),
+                'outcomes': dict(self.outcomes),
+                'rejections': dict(self.rejections),
+                'flips': self.flips,
+                'cache_hits': self.cache_hits,
+            }
+
+    def to_json(self):
+        """
+        Exports the metrics as JSON.
+
+        Returns:
+        - str: The JSON document of `snapshot`.
+        """
+        return json.dumps(self.snapshot(), indent=2, sort_keys=True)
+
+    def to_prometheus(self, prefix=CONST_METRICS_PREFIX):
+        """
+        Exports the metrics in the Prometheus text exposition format.
+
+        Parameters:
+        - prefix (str, optional): Prefix of the metric names.
+
+        Returns:
+        - str: The metrics, one sample per line.
+        """
+        snapshot = self.snapshot()
+        lines = []
+        
+        def add_histogram(name, help_text, histograms, label_name=None):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for label_value, histogram in histograms:
+                labels = f'{label_name}="{label_value}",' if label_name else ''
+                for upper_bound, count in histogram['buckets'].items():
+                    lines.append(f'{name}_bucket{{{labels}le="{upper_bound}"}} {count}')
+                labels = f'{{{labels[:-1]}}}' if labels else ''
+                lines.append(f'{name}_sum{labels} {histogram["sum"]}')
+                lines.append(f'{name}_count{labels} {histogram["count"]}')
+        
+        def add_counter(name, help_text, values, label_name=None):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            if label_name is None:
+                lines.append(f'{name} {values}')
+                return
+            for label_value, value in values.items():
+                lines.append(f'{name}{{{label_name}="{label_value}"}} {value}')
+        
+        add_histogram(f'{prefix}_stage_seconds', 'Time spent in each stage of the query processing.', snapshot['stage_seconds'].items(), 'stage')
+        add_histogram(f'{prefix}_patterns_per_query', 'Patterns found in each processed query.', [(None, snapshot['patterns_per_query'])])
+        add_counter(f'{prefix}_queries_total', 'Processed queries by outcome.', snapshot['outcomes'], 'outcome')
+        add_counter(f'{prefix}_rejections_total', 'Rejected patterns by reason.', snapshot['rejections'], 'reason')
+        add_counter(f'{prefix}_flips_total', 'Relationship directions fixed.', snapshot['flips'])
+        add_counter(f'{prefix}_cache_hits_total', 'Results found in the result cache.', snapshot['cache_hits'])
+        return '\n'.join(lines) + '\n'
+
+# Metrics of the query processing in this process, disabled by default
+metrics = QueryMetrics()
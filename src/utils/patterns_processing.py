@@ -1,74 +1,16 @@
-import re
+from collections import namedtuple
+from time import perf_counter
 from .constants import *
 from .general import is_defined
-from .ui import printb, printg, printr, printy
+from .schema import CompiledSchema, compile_schema
+from .cypher_parser import parse_query, parse_patterns, has_directed_relationships, collect_names
+from .query_edits import reverse_direction_edit, apply_edits
+from .diagnostics import logger
+from .metrics import metrics
 
-def get_first_node_and_relationship(string):
-    """
-    Extracts and returns the initial node and its relationship from a Cypher pattern.
-
-    This function extracts the first node and its connecting relationship from a given Cypher 
-    pattern string. It does not include the next node in the result.
-
-    Parameters:
-    - string (str): A Cypher pattern string. 
-      E.g., "(nodeA)-[:REL]->(nodeB)" or "(nodeA)-->(nodeB)".
-
-    Returns:
-    - str: A substring containing the first node and its relationship.
-      E.g., For the input "(nodeA)-[:REL]->(nodeB)", the output would be "(nodeA)-[:REL]->".
-
-    Examples:
-    ```python
-    result = get_first_node_and_relationship("(nodeA)-[:REL]->(nodeB)")
-    print(result)  # Outputs: "(nodeA)-[:REL]->"
-    ```
-
-    """
-    # in example for (nodeA)-[:REL]->(nodeB), returns only (nodeA)-[:REL]->
-    # for (nodeA)-->(nodeB), returns only (nodeA)-->
-    first_node_and_relationship = '(' + string.split('(')[1]
-    return first_node_and_relationship
-
-def search_for_classes(variable, query):
-    """
-    Searches for the classes (labels) associated with a given variable within a Cypher query.
-
-    This function looks for node patterns in the Cypher query that are associated 
-    with the provided variable, and extracts the class or classes (labels) assigned 
-    to that node.
-
-    Parameters:
-    - variable (str): The variable whose classes (labels) are to be identified.
-    - query (str): The Cypher query string where the search is to be performed.
-
-    Returns:
-    - list[str] or None: A list of classes (labels) associated with the variable, 
-      or None if no match is found.
-
-    Examples:
-    ```python
-    classes = search_for_classes("a", "(a:Person:Employee)-[:WORKS_AT]->(b:Company)")
-    print(classes)  # Outputs: ['Person', 'Employee']
-    ```
-
-    """
-    # Example (a:Person)
-    pattern_str = f'{create_pattern_node_with_variable(variable,"classesNames")}'
-    pattern = re.compile(pattern_str)
-    
-    matches = pattern.finditer(query)
-    
-    for match in matches:
-        # Get the match string
-        full_match_string = match.group()
-        
-        # Get the groups
-        node_classes = match.group('classesNames') and match.group('classesNames').replace(':','', 1).replace('`','').split(':')
-        
-        return node_classes
-
-    return None
+# Source, relationship and target of a directed pattern, to be looked up in the schema
+# - *_names: the possible names, or None when the part is not defined
+PatternHop = namedtuple('PatternHop', ['source_classes_names', 'target_classes_names', 'rels_names', 'source_classes_is_defined', 'target_classes_is_defined', 'rels_names_is_defined'])
 
 def pattern_exists_in_schema_multiple(source_classes_names, target_classes_names, rels_names, schema, source_classes_is_defined, target_classes_is_defined, rels_names_is_defined):
     """
@@ -83,7 +25,7 @@ def pattern_exists_in_schema_multiple(source_classes_names, target_classes_names
     - source_classes_names (list[str]): List of possible source class names.
     - target_classes_names (list[str]): List of possible target class names.
     - rels_names (list[str]): List of possible relationship names.
-    - schema (list[dict]): The schema against which the pattern is checked.
+    - schema (list[dict] or CompiledSchema): The schema against which the pattern is checked.
     - source_classes_is_defined (bool): Whether the source classes are defined.
     - target_classes_is_defined (bool): Whether the target classes are defined.
     - rels_names_is_defined (bool): Whether the relationships are defined.
@@ -91,7 +33,13 @@ def pattern_exists_in_schema_multiple(source_classes_names, target_classes_names
     Returns:
     - bool: True if a matching pattern is found, otherwise False.
 
+    Note:
+    - When the schema is a `CompiledSchema` the combinations are checked with its bitset 
+      indexes (see `CompiledSchema.pattern_exists_multiple`), otherwise one by one.
+
     """
+    if isinstance(schema, CompiledSchema):
+        return schema.pattern_exists_multiple(source_classes_names, target_classes_names, rels_names, source_classes_is_defined, target_classes_is_defined, rels_names_is_defined)
     # source, relationship and target
     if source_classes_is_defined and target_classes_is_defined and rels_names_is_defined:
         for source_class_name in source_classes_names:
@@ -141,7 +89,7 @@ def pattern_exists_in_schema(source_class_name, target_class_name, rel_name, sch
     - source_class_name (str or None): The name of the source class.
     - target_class_name (str or None): The name of the target class.
     - rel_name (str or None): The name of the relationship.
-    - schema (list[dict]): The schema against which the pattern is checked.
+    - schema (list[dict] or CompiledSchema): The schema against which the pattern is checked.
     - source_class_is_defined (bool): Whether the source class is defined.
     - target_class_is_defined (bool): Whether the target class is defined.
     - rel_name_is_defined (bool): Whether the relationship is defined.
@@ -149,7 +97,13 @@ def pattern_exists_in_schema(source_class_name, target_class_name, rel_name, sch
     Returns:
     - bool: True if a matching pattern is found, otherwise False.
 
+    Note:
+    - When the schema is a `CompiledSchema` the check is a single hash lookup,
+      otherwise the list of schema items is scanned.
+
     """
+    if isinstance(schema, CompiledSchema):
+        return schema.pattern_exists(source_class_name, target_class_name, rel_name, source_class_is_defined, target_class_is_defined, rel_name_is_defined)
     # source, relationship and target
     if source_class_is_defined and target_class_is_defined and rel_name_is_defined:
         return any(
@@ -192,12 +146,14 @@ def classes_exists_in_schema(classes_name, schema):
 
     Parameters:
     - classes_name (list[str]): List of class names to check.
-    - schema (list[dict]): The schema against which the classes are checked.
+    - schema (list[dict] or CompiledSchema): The schema against which the classes are checked.
 
     Returns:
     - bool: True if any class from the list is found in the schema, otherwise False.
     """
-    return any (class_name in list_classes(schema) for class_name in classes_name)
+    # The classes of the schema are collected once, not once per checked class
+    schema_classes = schema.classes if isinstance(schema, CompiledSchema) else set(list_classes(schema))
+    return not schema_classes.isdisjoint(classes_name)
 
 def relationships_exists_in_schema(relationships_names, schema):
     """
@@ -205,142 +161,14 @@ def relationships_exists_in_schema(relationships_names, schema):
 
     Parameters:
     - relationships_names (list[str]): List of relationship names to check.
-    - schema (list[dict]): The schema against which the relationships are checked.
+    - schema (list[dict] or CompiledSchema): The schema against which the relationships are checked.
 
     Returns:
     - bool: True if any relationship from the list is found in the schema, otherwise False.
     """
-    return any (relationship_name in list_unique_relationships(schema) for relationship_name in relationships_names)
-
-def create_pattern_node(variable_group_name, class_group_name):
-    """
-    Generates a regex pattern for a node, including optional properties.
-    
-    This pattern can represent nodes like: (variable:ClassName), (:ClassName), or ().
-
-    Parameters:
-    - variable_group_name (str): Name for the regex group capturing the variable name.
-    - class_group_name (str): Name for the regex group capturing the class name(s).
-
-    Returns:
-    - str: Regex pattern for the node.
-    """
-    return f'(?:\({create_pattern_variable(variable_group_name)}{create_pattern_classes(class_group_name)}'+CONST_PATTERN_PROPERTIES+'\))'
-
-def create_pattern_node_with_variable(variable_name, classes_group_name):
-    """
-    Generates a regex pattern for a node that mandates both the variable and class.
-    
-    The pattern represents nodes like: 
-    (variable:ClassName) or (variable:ClassName:OtherClass)
-    The node may also include optional properties.
-
-    Parameters:
-    - variable_name (str): Name for the regex group capturing the variable name.
-    - classes_group_name (str): Name for the regex group capturing the mandatory class names.
-
-    Returns:
-    - str: Regex pattern for the node with a mandatory variable and class.
-    """
-    return f'(?:\({variable_name}{create_pattern_classes_must(classes_group_name)}'+CONST_PATTERN_PROPERTIES+'\))'
-
-def create_pattern_variable(variable_group_name):
-    """
-    Generates a regex pattern for a single variable name.
-    
-    The pattern represents a variable name consisting only of words without spaces.
-    The variable could be empty.
-
-    Parameters:
-    - variable_group_name (str): Name for the regex group capturing the variable name.
-
-    Returns:
-    - str: Regex pattern for the variable name.
-    """
-    return f'(?P<{variable_group_name}>[a-zA-Z]*)'
-
-def create_pattern_classes(classes_group_name):
-    """
-    Generates a regex pattern for class names in nodes.
-    
-    The pattern represents class names in various formats, such as:
-    :ClassName or :`ClassName`
-    Multiple class names (like :Class1:Class2) are also matched.
-
-    Parameters:
-    - classes_group_name (str): Name for the regex group capturing the class names.
-
-    Returns:
-    - str: Regex pattern for class names in nodes.
-    """
-    return f'(?P<{classes_group_name}>(:`?[\w]+`?)*)'
-
-def create_pattern_classes_must(classes_group_name):
-    """
-    Generates a regex pattern for mandatory class names in nodes.
-    
-    The pattern represents class names in various formats, such as:
-    :ClassName or :`ClassName`
-    Unlike the 'create_pattern_classes' function, this ensures that at least one class name exists.
-
-    Parameters:
-    - classes_group_name (str): Name for the regex group capturing the mandatory class names.
-
-    Returns:
-    - str: Regex pattern for mandatory class names in nodes.
-    """
-    return f'(?P<{classes_group_name}>(:`?[\w]+`?)+)'
-
-def create_pattern_relationship_name(relationships_type_group_name):
-    """
-    Generates a regex pattern for relationship names.
-    
-    The pattern represents relationship names in various formats, including optional negation, such as:
-    :REL_TYPE or :`REL_TYPE` or :!REL_TYPE 
-    Multiple relationship types separated by '|' are also matched.
-
-    Parameters:
-    - relationships_type_group_name (str): Name for the regex group capturing the relationship types.
-
-    Returns:
-    - str: Regex pattern for relationship names.
-    """
-    return f'(?P<{relationships_type_group_name}>(?::!?`?[a-zA-Z_]*`?)?(?:\|!?`?[a-zA-Z_]+`?)*)?'
-
-def create_pattern_relationship(relationship_variable_group_name, relationship_type_group_name, left_arrow_name, right_arrow_name):
-    """
-    Generates a regex pattern for relationships in a graph pattern.
-    
-    The pattern represents relationships in various formats, such as:
-    -[variable:REL_TYPE]-, -[variable:`REL_TYPE`]-, or -[:`REL_TYPE`]-.
-    It also accounts for optional arrow directions (e.g., -> or <-), variable names, relationship types, and properties.
-
-    Parameters:
-    - relationship_variable_group_name (str): Name for the regex group capturing the relationship variable (e.g., "rel" in -[rel:REL_TYPE]-).
-    - relationship_type_group_name (str): Name for the regex group capturing the relationship type (e.g., "REL_TYPE" in -[:REL_TYPE]-).
-    - left_arrow_name (str): Name for the regex group capturing the optional left arrow direction (<).
-    - right_arrow_name (str): Name for the regex group capturing the optional right arrow direction (>).
-
-    Returns:
-    - str: Regex pattern for relationships in a graph pattern.
-    """
-    return f'(?P<{left_arrow_name}><)?-\[{create_pattern_variable(relationship_variable_group_name)}{create_pattern_relationship_name(relationship_type_group_name)}{CONST_PATTERN_PROPERTIES}\]-(?P<{right_arrow_name}>>)?'
-
-def create_pattern_relationship_short(left_arrow_name, right_arrow_name):
-    """
-    Generates a simplified regex pattern for relationships without specified types or properties.
-    
-    The pattern matches short relationship patterns, such as:
-    --> or <--.
-    
-    Parameters:
-    - left_arrow_name (str): Name for the regex group capturing the optional left arrow direction (<).
-    - right_arrow_name (str): Name for the regex group capturing the optional right arrow direction (>).
-
-    Returns:
-    - str: Regex pattern for simplified relationships in a graph pattern.
-    """
-    return f'(?P<{left_arrow_name}><)?--(?P<{right_arrow_name}>>)?'
+    # The relationships of the schema are collected once, not once per checked relationship
+    schema_relationships = schema.relationships if isinstance(schema, CompiledSchema) else set(list_unique_relationships(schema))
+    return not schema_relationships.isdisjoint(relationships_names)
 
 def list_classes(schema):
     """
@@ -411,184 +239,329 @@ def list_unique_relationships(schema):
     predicates_list = list(predicates_set)
     return predicates_list
 
-def process_general_pattern(query, schema):
+def check_pattern_names(query, pattern, schema):
     """
-    Process a general Cypher pattern query against the given graph schema.
+    Checks that the classes and the relationships written in a pattern exist in the schema.
+
+    For every node with classes and for a relationship with names, at least one of the 
+    names must exist in the schema. The lookups are done in the precomputed sets of the 
+    compiled schema.
+
+    Parameters:
+    - query (str): The Cypher query the pattern belongs to.
+    - pattern (Pattern): The pattern, as returned by `parse_patterns`.
+    - schema (CompiledSchema): The graph schema.
+
+    Returns:
+    - bool: True if every name of the pattern can be found in the schema, otherwise False.
+    """
+    # If the relationships name is present, check if relationship exists in the schema
+    rels_names = pattern.relationship.types
+    if rels_names is not None and schema.relationships.isdisjoint(rels_names):
+        logger.warning('No schema item found for relationships %s in match %s', rels_names, query[pattern.start:pattern.end])
+        metrics.observe_rejection('unknown_relationship')
+        return False
+    
+    # If a node has classes, checks that at least one of the classes exists in the schema
+    for node in (pattern.node_a, pattern.node_b):
+        if node.classes is not None and schema.classes.isdisjoint(node.classes):
+            logger.warning('No schema item found for classes %s in match %s', node.classes, query[pattern.start:pattern.end])
+            metrics.observe_rejection('unknown_label')
+            return False
+    
+    return True
+
+def check_pattern(query, pattern, schema, symbol_table):
+    """
+    Checks a single node-relationship-node pattern against the schema and decides how to fix it.
+
+    Both the complete form (varA:classA)-[relVar:relName]->(varB:classB) and the short 
+    form (varA:classA)-->(varB:classB) are resolved by this routine; the short form 
+    simply has no relationship names. The names of the pattern must have been validated 
+    with `check_pattern_names`. The pattern is resolved by `resolve_pattern`, its hop 
+    is looked up in the schema, and `decide_pattern` turns the verdicts into the result.
+
+    Parameters:
+    - query (str): The Cypher query the pattern belongs to.
+    - pattern (Pattern): The pattern, as returned by `parse_patterns`.
+    - schema (CompiledSchema): The graph schema.
+    - symbol_table (dict): Classes declared for each variable of the query, the second item returned 
+      by `parse_query`.
+
+    Returns:
+    - tuple: A tuple containing:
+      1. bool: False if the pattern doesn't fit the schema and the query must be rejected.
+      2. QueryEdit or None: The edit that fixes the direction of the relationship, if it is wrong.
+    """
+    pattern_is_valid, hop = resolve_pattern(query, pattern, symbol_table)
+    if hop is None:
+        return pattern_is_valid, None
+    return lookup_pattern(query, pattern, schema, pattern_is_valid, hop)
+
+def lookup_pattern(query, pattern, schema, pattern_is_valid, hop):
+    """
+    Looks up the resolved hop of a pattern in the schema and decides how to fix it.
+
+    Parameters:
+    - query (str): The Cypher query the pattern belongs to.
+    - pattern (Pattern): The pattern, as returned by `parse_patterns`.
+    - schema (CompiledSchema): The graph schema.
+    - pattern_is_valid (bool): Whether the pattern is valid so far, as returned by `resolve_pattern`.
+    - hop (PatternHop): The hop of the pattern, as returned by `resolve_pattern`.
+
+    Returns:
+    - tuple: The result of `decide_pattern`, see `check_pattern`.
+    """
+    # only tries to fix the query if the pattern is not found in the schema,
+    # then checks if the opposite pattern exists in the schema
+    hop_exists = pattern_exists_in_schema_multiple(hop.source_classes_names, hop.target_classes_names, hop.rels_names, schema, hop.source_classes_is_defined, hop.target_classes_is_defined, hop.rels_names_is_defined)
+    opposite_hop_exists = not hop_exists and pattern_exists_in_schema_multiple(hop.target_classes_names, hop.source_classes_names, hop.rels_names, schema, hop.target_classes_is_defined, hop.source_classes_is_defined, hop.rels_names_is_defined)
+    return decide_pattern(query, pattern, schema, pattern_is_valid, hop, hop_exists, opposite_hop_exists)
+
+def resolve_pattern(query, pattern, symbol_table):
+    """
+    Resolves the hop of a pattern that has to be looked up in the schema.
+
+    The classes missing in the nodes are looked up in the symbol table, and the source and 
+    target of the relationship are identified from its direction. Patterns without 
+    direction, or without any class, have nothing to look up.
+
+    Parameters:
+    - query (str): The Cypher query the pattern belongs to.
+    - pattern (Pattern): The pattern, as returned by `parse_patterns`.
+    - symbol_table (dict): Classes declared for each variable of the query, the second item returned 
+      by `parse_query`.
+
+    Returns:
+    - tuple: A tuple containing:
+      1. bool: False if the pattern is already known to be invalid (both directions are defined).
+      2. PatternHop or None: The hop to look up, or None if the pattern has nothing to look up.
+    """
+    pattern_is_valid = True
+    
+    # Get the match string
+    full_match_string = query[pattern.start:pattern.end]
+    
+    logger.debug('Processing match %s', full_match_string)
+    
+    # Get the pattern components, their names were already validated by check_pattern_names
+    node_var_a = pattern.node_a.variable
+    node_a_classes = pattern.node_a.classes
+    node_var_b = pattern.node_b.variable
+    node_b_classes = pattern.node_b.classes
+    rels_names = pattern.relationship.types
+    rels_names_is_defined = is_defined(rels_names)
+    classes_a_is_defined = is_defined(node_a_classes)
+    classes_b_is_defined = is_defined(node_b_classes)
+    
+    # If there is no direction (right or left arrow) do nothing
+    left_arrow_is_defined = pattern.relationship.left_arrow
+    right_arrow_is_defined = pattern.relationship.right_arrow
+    # based on guideline: "If the input query has an undirected relationship in the pattern, we do not correct it."
+    if not left_arrow_is_defined and not right_arrow_is_defined:
+        logger.debug('No direction found in match %s, continuing', full_match_string)
+        return pattern_is_valid, None
+    
+    # If both directions are defined, that is an error
+    if left_arrow_is_defined and right_arrow_is_defined:
+        logger.warning('Both directions are defined in %s', full_match_string)
+        metrics.observe_rejection('both_directions')
+        pattern_is_valid = False
+
+    # If at least one class is not defined
+    # The class could be in other part of the query, look it up in the symbol table
+    node_var_a_is_defined = is_defined(node_var_a)
+    node_var_b_is_defined = is_defined(node_var_b)
+    
+    # search classes for node a
+    if not classes_a_is_defined:
+        if node_var_a_is_defined:
+            node_a_classes = symbol_table.get(node_var_a)
+            classes_a_is_defined = is_defined(node_a_classes)
+    
+    # search classes for node b
+    if not classes_b_is_defined:
+        if node_var_b_is_defined:
+            node_b_classes = symbol_table.get(node_var_b)
+            classes_b_is_defined = is_defined(node_b_classes)
+        
+    # If both classes are still not defined, there is nothing to validate, continue
+    if not classes_a_is_defined and not classes_b_is_defined:    
+        logger.debug('No classes are defined in %s', full_match_string)
+        return pattern_is_valid, None
+    
+    # Identifies source and destination classes
+    if left_arrow_is_defined:
+        source_class_is_defined, target_class_is_defined = classes_b_is_defined, classes_a_is_defined
+        source_classes_names, target_classes_names = node_b_classes, node_a_classes
+    else:
+        source_class_is_defined, target_class_is_defined = classes_a_is_defined, classes_b_is_defined
+        source_classes_names, target_classes_names = node_a_classes, node_b_classes
+
+    return pattern_is_valid, PatternHop(source_classes_names, target_classes_names, rels_names, source_class_is_defined, target_class_is_defined, rels_names_is_defined)
+
+def decide_pattern(query, pattern, schema, pattern_is_valid, hop, hop_exists, opposite_hop_exists):
+    """
+    Decides how to fix a pattern from the verdicts of its hop in both directions.
+
+    Parameters:
+    - query (str): The Cypher query the pattern belongs to.
+    - pattern (Pattern): The pattern, as returned by `parse_patterns`.
+    - schema (CompiledSchema): The graph schema, only used in the diagnostic messages.
+    - pattern_is_valid (bool): The validity returned by `resolve_pattern`.
+    - hop (PatternHop): The hop returned by `resolve_pattern`.
+    - hop_exists (bool): Whether the hop exists in the schema.
+    - opposite_hop_exists (bool): Whether the hop exists in the schema with the opposite direction.
 
-    This function examines a Cypher query to ensure it matches the provided graph schema.
-    If the pattern does not match, the function attempts to correct the query.
-    In certain conditions (e.g. undirected relationships or unmatched patterns), 
-    it might return an empty string, based on challenge guidelines.
+    Returns:
+    - tuple: A tuple containing:
+      1. bool: False if the pattern doesn't fit the schema and the query must be rejected.
+      2. QueryEdit or None: The edit that fixes the direction of the relationship, if it is wrong.
+    """
+    if hop_exists:
+        return pattern_is_valid, None
+    
+    full_match_string = query[pattern.start:pattern.end]
+    if opposite_hop_exists:
+        # If it exists, the direction is wrong, so it changes it
+        logger.info('Pattern found in schema, but with opposite direction in match %s, fixing the query', full_match_string)
+        return pattern_is_valid, reverse_direction_edit(query, pattern.relationship)
+    
+    # if the opposite pattern doesnt exists in schema
+    # this response is based on the guideline: "If the given pattern in a Cypher statement doesn't fit the graph schema, simply return an empty string"
+    logger.warning('No schema item found for opposite pattern %s %s %s in match %s', hop.source_classes_names, hop.rels_names, hop.target_classes_names, full_match_string)
+    logger.debug('Schema: %s', schema)
+    metrics.observe_rejection('no_schema_pattern')
+    return False, None
+
+def process_patterns(query, schema, symbol_table=None, complete_relationships=True, short_relationships=True, names=None):
+    """
+    Checks every pattern of a Cypher query against the graph schema and fixes the wrong directions.
+
+    The query is scanned once by `parse_query`, which recognizes both the complete 
+    relationships, like -[relVar:relName]->, and the short ones, like -->, and builds 
+    the symbol table on the way. The names of every pattern are validated first with 
+    `check_pattern_names`, so a query with an unknown class or relationship is rejected 
+    right away. Then every pattern is checked by `check_pattern`, unless the query has no 
+    directed relationship at all; while the metrics are enabled, all the patterns are 
+    resolved before their hops are looked up, to time both stages apart. Corrections only rewrite the span of the wrong 
+    relationship, and are all applied at the end with `apply_edits`.
 
     Examples of handled patterns:
     - (varA:classA)-[relVar:relName]->(varB:classB)
     - (varA:classA)<-[relVar:relName]-(varB:classB)
+    - (varA:classA)-->(varB:classB) or (varA:classA)<--(varB:classB)
 
     Parameters:
-    - query (str): The Cypher query pattern to be processed.
-    - schema (list of dict): A list of dictionary items representing the graph schema.
+    - query (str): The Cypher query to be processed.
+    - schema (list of dict or CompiledSchema): The graph schema. A list of dictionaries
+      is compiled once on entry; pass a `CompiledSchema` to reuse the indexes across calls.
+    - symbol_table (dict, optional): Classes declared for each variable of the query, the second item 
+      returned by `parse_query`. It is built in the same scan when not provided.
+    - complete_relationships (bool, optional): Whether the patterns with complete relationships are processed.
+    - short_relationships (bool, optional): Whether the patterns with short relationships are processed.
+    - names (set[str], optional): Set filled with the classes and relationships the query refers to 
+      (see `referenced_names`), taken from the same scan.
 
     Returns:
     - str: The processed query if it's valid according to the schema, 
            otherwise an empty string.
-    
+
     Note:
-    The function uses regular expressions to identify nodes and relationships 
-    in the query. After identifying patterns in the query, it checks the validity
-    of the pattern with the provided schema and tries to correct any discrepancies.
-    """
-    return_empty_response = False # flag used to return an empty string based on challenge guidelines
-    # Strucutre of the pattern: (varA:classA){leftArrow}-[relVar:relName]-{rightArrow}(varB:classB)
-    pattern_str = f'{create_pattern_node("varA","classesA")}{create_pattern_relationship("relVar","relsNames","leftArrow","rightArrow")}{create_pattern_node("varB","classesB")}'
-    pattern = re.compile(pattern_str)
+    - Undirected relationships are not corrected, based on the challenge guidelines.
+    - If any pattern doesn't fit the graph schema, an empty string is returned.
+    """
+    schema = compile_schema(schema)
+    # Stages are only timed while the metrics are enabled
+    timed = metrics.enabled
+    if timed:
+        parse_start = perf_counter()
+    if symbol_table is None:
+        patterns, symbol_table = parse_query(query)
+    else:
+        patterns = parse_patterns(query)
+    if names is not None:
+        collect_names(names, patterns, symbol_table)
+    if timed:
+        check_start = perf_counter()
+        metrics.observe_stage('parse', check_start - parse_start)
+    # Chains like (nodeA)-[:REL]->(nodeB)-->(nodeC) are already decomposed
+    # into (nodeA)-[:REL]->(nodeB) and (nodeB)-->(nodeC)
+    if not (complete_relationships and short_relationships):
+        patterns = [pattern for pattern in patterns if (short_relationships if pattern.relationship.is_short else complete_relationships)]
     
-    # Every time some match is found, we store it to remove it later
-    # This is done to be able to match other aparitions like: (nodeA)-[:REL]->(nodeB)-[:REL2]->(nodeC)
-    # where we need to match (nodeA)-[:REL]->(nodeB) and (nodeB)-[:REL2]->(nodeC)
-    # after we match (nodeA)-[:REL]->(nodeB), we remove it from a copy of the query, and then we look for other patterns (nodeB)-[:REL2]->(nodeC)
-    matches_to_remove = []
-    query_copy = query
+    # Fail fast: every class and relationship written in the patterns must exist in the schema
+    # (flag used to return an empty string based on challenge guidelines)
+    return_empty_response = not all(check_pattern_names(query, pattern, schema) for pattern in patterns)
+    edits = [] # corrections over spans of the original query, applied at the end in a single pass
+    if timed:
+        resolve_start = lookup_start = perf_counter()
+        metrics.observe_stage('check', resolve_start - check_start)
     
-    # Do while loop that ends when there is no more matches to analyze
-    while True:
-        
-        # If there is some match to remove, remove it from the query
-        for match_to_remove in matches_to_remove:
-            query_copy = query_copy.replace(match_to_remove, CONST_EMPTY_STRING)
-        
-        # Reset the matches to remove
-        matches_to_remove = []
-        
-        # Search for the pattern in the copy of the query
-        matches = pattern.finditer(query_copy)
-        
-        for match in matches:
-            # Get the match string
-            full_match_string = match.group()
-            
-            # Store the first node and rel from the match string to remove it later
-            matches_to_remove.append(get_first_node_and_relationship(full_match_string))
-            
-            printb(f'Processing match {full_match_string}')
-            
-            # Get the groups
-            node_var_a = match.group('varA')
-            node_a_classes = match.group('classesA') and match.group('classesA').replace(':',CONST_EMPTY_STRING, 1).replace('`',CONST_EMPTY_STRING).split(':')
-            node_var_b = match.group('varB')
-            node_b_classes = match.group('classesB') and match.group('classesB').replace(':',CONST_EMPTY_STRING, 1).replace('`',CONST_EMPTY_STRING).split(':')
-            rel_var = match.group('relVar')
-            rels_names = match.group('relsNames') and match.group('relsNames').replace(':',CONST_EMPTY_STRING).replace('!',CONST_EMPTY_STRING).replace('`',CONST_EMPTY_STRING).split('|')
-            left_arrow = match.group('leftArrow')
-            right_arrow = match.group('rightArrow')
-            
-            # If the relationships name is present, check if relationship exists in the schema
-            rels_names_is_defined = is_defined(rels_names)
-            if rels_names_is_defined and not relationships_exists_in_schema(rels_names, schema):
-                printy(f'No schema item found for relationships {rels_names} in match {full_match_string}')
-                return_empty_response = True
-            
-            # If node a has classes, checks that at least one of the classes exists in the schema
-            classes_a_is_defined = is_defined(node_a_classes)
-            if classes_a_is_defined and not classes_exists_in_schema(node_a_classes, schema):
-                printy(f'No schema item found for classes {node_a_classes} in match {full_match_string}')
+    # Fast path: undirected relationships are never corrected, so only the names are checked
+    if not return_empty_response and has_directed_relationships(query):
+        if timed:
+            # Every pattern is resolved before the hops are looked up, so both stages are timed apart
+            resolved_patterns = [(pattern, *resolve_pattern(query, pattern, symbol_table)) for pattern in patterns]
+            lookup_start = perf_counter()
+            results = [(pattern_is_valid, None) if hop is None else lookup_pattern(query, pattern, schema, pattern_is_valid, hop)
+                       for pattern, pattern_is_valid, hop in resolved_patterns]
+        else:
+            results = (check_pattern(query, pattern, schema, symbol_table) for pattern in patterns)
+        for pattern_is_valid, edit in results:
+            if not pattern_is_valid:
                 return_empty_response = True
-            
-            # If node b has classes, checks that at least one of the classes exists in the schema
-            classes_b_is_defined = is_defined(node_b_classes)
-            if classes_b_is_defined and not classes_exists_in_schema(node_b_classes, schema):
-                printy(f'No schema item found for classes {node_b_classes} in match {full_match_string}')
-                return_empty_response = True
-            
-            # If there is no direction (right or left arrow) do nothing
-            left_arrow_is_defined = is_defined(left_arrow)
-            right_arrow_is_defined = is_defined(right_arrow)
-            # based on guideline: "If the input query has an undirected relationship in the pattern, we do not correct it."
-            if not left_arrow_is_defined and not right_arrow_is_defined:
-                printy(f'No direction found in match {full_match_string}, continuing')
-                continue
-            
-            # If both directions are defined, that is an error
-            if left_arrow_is_defined and right_arrow_is_defined:
-                printy(f'Both directions are defined in {full_match_string}')
-                return_empty_response = True
-        
-            # If at least one class is not defined
-            # The class could be in other part of the query
-            node_var_a_is_defined = is_defined(node_var_a)
-            node_var_b_is_defined = is_defined(node_var_b)
-            
-            # search classes for node a
-            if not classes_a_is_defined:
-                if node_var_a_is_defined:
-                    node_a_classes = search_for_classes(node_var_a, query)
-                    classes_a_is_defined = is_defined(node_a_classes)
-            
-            # search classes for node b
-            if not classes_b_is_defined:
-                if node_var_b_is_defined:
-                    node_b_classes = search_for_classes(node_var_b, query)
-                    classes_b_is_defined = is_defined(node_b_classes)
-                
-            # If both classes are still not defined, there is nothing to validate, continue
-            if not classes_a_is_defined and not classes_b_is_defined:    
-                printy(f'No classes are defined in {full_match_string}')
-                continue
-            
-            # Identifies source and destination classes
-            if left_arrow_is_defined:
-                source_class_is_defined, target_class_is_defined = classes_b_is_defined, classes_a_is_defined
-                source_classes_names, target_classes_names = node_b_classes, node_a_classes
-            elif right_arrow_is_defined:
-                source_class_is_defined, target_class_is_defined = classes_a_is_defined, classes_b_is_defined
-                source_classes_names, target_classes_names = node_a_classes, node_b_classes
-            else:
-                source_class_is_defined = target_class_is_defined = False
-                source_classes_names = target_classes_names = None
-        
-            # only tries to fix the query if the pattern is not found in the schema
-            if not pattern_exists_in_schema_multiple(source_classes_names, target_classes_names, rels_names, schema, source_class_is_defined, target_class_is_defined, rels_names_is_defined):
-                # Then, checks if the opposite pattern exists in the schema
-                if pattern_exists_in_schema_multiple(target_classes_names, source_classes_names, rels_names, schema, target_class_is_defined, source_class_is_defined, rels_names_is_defined):
-                    # If it exists, the direction is wrong, so it changes it
-                    printg(f'Pattern found in schema, but with opposite direction in match {full_match_string}, fixing the query')
-                    correct_full_match_string = match.group()
-                    
-                    if left_arrow_is_defined:
-                        correct_full_match_string = correct_full_match_string.replace(CONST_SIMPLE_ARROW_RIGHT_TO_LEFT, CONST_NO_ARROW_LEFT_SIDE)
-                        correct_full_match_string = correct_full_match_string.replace(CONST_NO_ARROW_RIGHT_SIDE, CONST_SIMPLE_ARROW_LEFT_TO_RIGHT)
-                    elif right_arrow_is_defined:
-                        correct_full_match_string = correct_full_match_string.replace(CONST_SIMPLE_ARROW_LEFT_TO_RIGHT, CONST_NO_ARROW_RIGHT_SIDE)
-                        correct_full_match_string = correct_full_match_string.replace(CONST_NO_ARROW_LEFT_SIDE, CONST_SIMPLE_ARROW_RIGHT_TO_LEFT)
-                    
-                    query = query.replace(full_match_string, correct_full_match_string)
-                # if the opposite pattern doesnt exists in schema                
-                else:
-                    # this response is based on the guideline: "If the given pattern in a Cypher statement doesn't fit the graph schema, simply return an empty string"
-                    printy(f'No schema item found for opposite pattern {source_classes_names} {rels_names} {target_classes_names} in match {full_match_string}')
-                    printy(f'Schema: {schema}')
-                    return_empty_response = True
-        
-        # no more matches to analyze
-        if len(matches_to_remove) == 0:
-            break
+            if edit is not None:
+                edits.append(edit)
     
+    if timed:
+        rewrite_start = perf_counter()
+        metrics.observe_stage('resolve', lookup_start - resolve_start)
+        metrics.observe_stage('lookup', rewrite_start - lookup_start)
+        metrics.observe_patterns(len(patterns), 0 if return_empty_response else len(edits))
+
     if return_empty_response:
         return CONST_EMPTY_STRING
-    else:
-        return query
+    
+    query = apply_edits(query, edits)
+    if timed:
+        metrics.observe_stage('rewrite', perf_counter() - rewrite_start)
+    return query
+
+def process_general_pattern(query, schema, symbol_table=None):
+    """
+    Process a general Cypher pattern query against the given graph schema.
+
+    Only the patterns with complete relationships are processed, see `process_patterns`.
+
+    Examples of handled patterns:
+    - (varA:classA)-[relVar:relName]->(varB:classB)
+    - (varA:classA)<-[relVar:relName]-(varB:classB)
+
+    Parameters:
+    - query (str): The Cypher query pattern to be processed.
+    - schema (list of dict or CompiledSchema): The graph schema.
+    - symbol_table (dict, optional): Classes declared for each variable of the query, the second item 
+      returned by `parse_query`. It is built when not provided.
+
+    Returns:
+    - str: The processed query if it's valid according to the schema, 
+           otherwise an empty string.
+    """
+    return process_patterns(query, schema, symbol_table, short_relationships=False)
             
-def process_short_rel_pattern(query, schema):
+def process_short_rel_pattern(query, schema, symbol_table=None):
     """
     Process a Cypher query pattern with short (unlabeled) relationships.
     
-    This function corrects the direction of relationships in the given Cypher
-    query pattern based on the provided schema. It identifies patterns that don't 
-    fit the schema and attempts to correct them. If a pattern cannot be 
-    corrected or identified within the schema, an empty string is returned.
+    Only the patterns with short relationships are processed, see `process_patterns`.
     
     Args:
         query (str): The input Cypher query string.
-        schema (object): The schema against which the query is validated.
+        schema (list of dict or CompiledSchema): The schema against which the query 
+            is validated.
+        symbol_table (dict, optional): Classes declared for each variable of the query, 
+            the second item returned by `parse_query`. It is built when not provided.
         
     Returns:
         str: Corrected Cypher query or an empty string if the query doesn't 
@@ -596,145 +569,5 @@ def process_short_rel_pattern(query, schema):
         
     Example patterns:
         (varA:classA)--(varB:classB) or (varA:classA)<--(varB:classB)
-    
-    Notes:
-        - The function assumes that the relationship name is not provided 
-          in the pattern.
-        - If a query contains an undirected relationship, the function does not 
-          correct it.
-        - If a given pattern doesn't fit the graph schema, the function 
-          returns an empty string.
-    """
-    return_empty_response = False # flag used to return an empty string based on challenge guidelines
-    # Strucutre of the pattern: (varA:classA){leftArrow}--{rightArrow}(varB:classB)
-    pattern_str = f'{create_pattern_node("varA","classesA")}{create_pattern_relationship_short("leftArrow","rightArrow")}{create_pattern_node("varB","classesB")}'
-    pattern = re.compile(pattern_str)
-    
-    # Every time some match is found, we store it to remove it later
-    # This is done to be able to match other aparitions like: (nodeA)-->(nodeB)-->(nodeC)
-    # where we need to match (nodeA)-->(nodeB) and (nodeB)-->(nodeC)
-    # after we match (nodeA)-->(nodeB), we remove it from a copy of the query, and then we look for other patterns (nodeB)-->(nodeC)
-    matches_to_remove = []
-    query_copy = query
-    
-    # Do while loop that ends when there is no more matches to analyze
-    while True: 
-        
-        # If there is some match to remove, remove it from the query
-        for match_to_remove in matches_to_remove:
-            query_copy = query_copy.replace(match_to_remove, CONST_EMPTY_STRING)
-        
-        # Reset the matches to remove
-        matches_to_remove = []
-        
-        # Search for the pattern in the copy of the query
-        matches = pattern.finditer(query_copy)
-        
-        for match in matches:
-            # Get the match string
-            full_match_string = match.group()
-            
-            printb(f'Processing match {full_match_string}')
-            
-            # Store the first node and rel from the match string to remove it later
-            matches_to_remove.append(get_first_node_and_relationship(full_match_string))
-            
-            # Get the groups
-            node_var_a = match.group('varA')
-            node_a_classes = match.group('classesA') and match.group('classesA').replace(':',CONST_EMPTY_STRING, 1).replace('`',CONST_EMPTY_STRING).split(':')
-            node_var_b = match.group('varB')
-            node_b_classes = match.group('classesB') and match.group('classesB').replace(':',CONST_EMPTY_STRING, 1).replace('`',CONST_EMPTY_STRING).split(':')
-            left_arrow = match.group('leftArrow')
-            right_arrow = match.group('rightArrow')
-            
-            # Set the relationship name to not defined since the short pattern does not have it
-            rels_names = None
-            rels_names_is_defined = False
-            
-            # If node a has classes, checks that at least one of the classes exists in the schema
-            classes_a_is_defined = is_defined(node_a_classes)
-            if classes_a_is_defined and not classes_exists_in_schema(node_a_classes, schema):
-                printr(f'No schema item found for classes {node_a_classes} in match {full_match_string}')
-                return_empty_response = True
-            
-            # If node b has classes, checks that at least one of the classes exists in the schema
-            classes_b_is_defined = is_defined(node_b_classes)
-            if classes_b_is_defined and not classes_exists_in_schema(node_b_classes, schema):
-                printr(f'No schema item found for classes {node_b_classes} in match {full_match_string}')
-                return_empty_response = True
-            
-            # If there is no direction (right or left arrow) do nothing
-            left_arrow_is_defined = is_defined(left_arrow)
-            right_arrow_is_defined = is_defined(right_arrow)
-            # based on guideline: "If the input query has an undirected relationship in the pattern, we do not correct it."
-            if not left_arrow_is_defined and not right_arrow_is_defined:
-                printb(f'No direction found in match {full_match_string}, continuing')
-                continue
-            
-            # If both directions are defined, that is an error
-            if left_arrow_is_defined and right_arrow_is_defined:
-                printr(f'Both directions are defined in {full_match_string}')
-                return_empty_response = True
-        
-            # If at least one class is not defined
-            # The class could be in other part of the query  
-            node_var_a_is_defined = is_defined(node_var_a)
-            node_var_b_is_defined = is_defined(node_var_b)
-            
-            # search classes for node a
-            if not classes_a_is_defined:
-                if node_var_a_is_defined:
-                    node_a_classes = search_for_classes(node_var_a, query)
-                    classes_a_is_defined = is_defined(node_a_classes)
-            
-            # search classes for node b
-            if not classes_b_is_defined:
-                if node_var_b_is_defined:
-                    node_b_classes = search_for_classes(node_var_b, query)
-                    classes_b_is_defined = is_defined(node_b_classes)
-                
-            # If both classes are still not defined, there is nothing to validate, continue
-            if not classes_a_is_defined and not classes_b_is_defined:    
-                printy(f'No classes are defined in {full_match_string}')
-                continue
-            
-            # Identifies source and destination classes
-            if left_arrow_is_defined:
-                source_class_is_defined, target_class_is_defined = classes_b_is_defined, classes_a_is_defined
-                source_classes_names, target_classes_names = node_b_classes, node_a_classes
-            elif right_arrow_is_defined:
-                source_class_is_defined, target_class_is_defined = classes_a_is_defined, classes_b_is_defined
-                source_classes_names, target_classes_names = node_a_classes, node_b_classes
-            else:
-                source_class_is_defined = target_class_is_defined = False
-                source_classes_names = target_classes_names = None
-        
-            # only tries to fix the query if the pattern is not found in the schema
-            if not pattern_exists_in_schema_multiple(source_classes_names, target_classes_names, rels_names, schema, source_class_is_defined, target_class_is_defined, rels_names_is_defined):
-                # Then, checks if the opposite pattern exists in the schema
-                if pattern_exists_in_schema_multiple(target_classes_names, source_classes_names, rels_names, schema, target_class_is_defined, source_class_is_defined, rels_names_is_defined):
-                    # If it exists, the direction is wrong, so it changes it
-                    printg(f'Pattern found in schema, but with opposite direction in match {full_match_string}, fixing the query')
-                    correct_full_match_string = match.group()
-                    
-                    if left_arrow_is_defined:
-                        correct_full_match_string = correct_full_match_string.replace(CONST_LARGE_ARROW_RIGHT_TO_LEFT, CONST_LARGE_ARROW_LEFT_TO_RIGHT)
-                    elif right_arrow_is_defined:
-                        correct_full_match_string = correct_full_match_string.replace(CONST_LARGE_ARROW_LEFT_TO_RIGHT, CONST_LARGE_ARROW_RIGHT_TO_LEFT)
-                    
-                    query = query.replace(full_match_string, correct_full_match_string)
-                # if the opposite pattern doesnt exists in schema                
-                else:
-                    # this response is based on the guideline: "If the given pattern in a Cypher statement doesn't fit the graph schema, simply return an empty string"
-                    printy(f'No schema item found for opposite pattern {source_classes_names} {rels_names} {target_classes_names} in match {full_match_string}')
-                    printy(f'Schema: {schema}')
-                    return_empty_response = True
-        
-        # no more matches to analyze
-        if len(matches_to_remove) == 0:
-            break
-    
-    if return_empty_response:
-        return CONST_EMPTY_STRING
-    else:
-        return query
\ No newline at end of file
+    """
+    return process_patterns(query, schema, symbol_table, complete_relationships=False)
@@ -0,0 +1,62 @@
+from collections import namedtuple
+from .constants import CONST_EMPTY_STRING
+
+# Replacement of the text between start and end (exclusive) of the original query
+QueryEdit = namedtuple('QueryEdit', ['start', 'end', 'replacement'])
+
+def reverse_direction_edit(query, relationship):
+    """
+    Builds the edit that reverses the direction of a relationship.
+
+    Only the relationship itself is rewritten, e.g. <-[:REL]- becomes -[:REL]-> and 
+    --> becomes <--, so the nodes around it are never touched.
+
+    Parameters:
+    - query (str): The Cypher query.
+    - relationship (RelationshipPattern): The relationship, as returned by `parse_patterns`.
+
+    Returns:
+    - QueryEdit: The edit over the span of the relationship.
+    """
+    relationship_string = query[relationship.start:relationship.end]
+    if relationship.left_arrow:
+        replacement = relationship_string[1:] + '>'
+    else:
+        replacement = '<' + relationship_string[:-1]
+    return QueryEdit(relationship.start, relationship.end, replacement)
+
+def apply_edits(query, edits):
+    """
+    Applies a list of edits to a query in a single pass.
+
+    Every edit refers to positions of the original query. Edits must not overlap; 
+    they are applied in order of position, whatever the order of the list.
+
+    Parameters:
+    - query (str): The original query.
+    - edits (list[QueryEdit]): The edits to apply.
+
+    Returns:
+    - str: The edited query.
+
+    Raises:
+    - ValueError: If two edits overlap.
+
+    Example:
+    ```python
+    apply_edits("(a)<--(b)", [QueryEdit(3, 6, "-->")])  # "(a)-->(b)"
+    ```
+    """
+    if not edits:
+        return query
+    
+    parts = []
+    position = 0
+    for edit in sorted(edits):
+        if edit.start < position:
+            raise ValueError(f'The edit at {edit.start} overlaps the previous edit, ending at {position}')
+        parts.append(query[position:edit.start])
+        parts.append(edit.replacement)
+        position = edit.end
+    parts.append(query[position:])
+    return CONST_EMPTY_STRING.join(parts)
@@ -0,0 +1,131 @@
+from time import perf_counter
+from .constants import CONST_EMPTY_STRING
+from .patterns_processing import process_patterns
+from .schema import MutableSchema, compile_schema
+from .fingerprint import normalize_query, restore_literals
+from .cypher_parser import has_relationships
+from .metrics import metrics
+from .schema_registry import schema_registry
+
+def process_query(query, schema=None, cache=None, schema_id=None, schema_version=None, registry=None):
+    """
+    Processes and adjusts the provided Cypher query based on the given schema.
+
+    This function takes a Cypher query and a schema as input. It searches for 
+    specific patterns within the query and verifies the direction of relationships 
+    based on the provided schema. If any discrepancies are found, the function 
+    adjusts the query to align with the schema.
+
+    Parameters:
+    - query (str): The Cypher query to be processed.
+    - schema (list[dict] or CompiledSchema, optional): The schema against which the query is to be validated and corrected.
+    - cache (QueryResultCache, optional): Cache of results, keyed by the query template and the schema 
+      fingerprint (`cache_key`). A cached result is returned without processing the query again.
+    - schema_id (str, optional): ID of a registered schema, used instead of `schema`.
+    - schema_version (int, optional): Version of the registered schema, defaults to the latest one.
+    - registry (SchemaRegistry, optional): Registry of the schema ID, defaults to `schema_registry`.
+
+    Returns:
+    - str: The processed and corrected Cypher query.
+
+    Raises:
+    - ValueError: If neither `schema` nor `schema_id` is given.
+    - UnknownSchemaError: If the schema ID or version is not registered.
+
+    Example:
+    ```python
+    query = "MATCH (a)-[r]->(b) RETURN a, b"
+    processed_query = process_query(query, my_schema)
+    processed_query = process_query(query, schema_id='movies')
+    ```
+
+    Note:
+    - The complete relationships (-[:REL]->) and the short ones (-->) are checked and 
+      corrected in a single scan by `process_patterns`. A query without relationships 
+      is returned right away.
+    - The string and number literals are masked before processing (see `normalize_query`), 
+      so the text of a literal is never rewritten and queries that only differ in their 
+      values share a single cached result.
+    - The result cached for a `MutableSchema` is stored with the names the query refers to, 
+      and is invalidated when a triple with one of these names is added or removed.
+    - While `metrics` is enabled, the time of every stage and the outcome of the query are recorded.
+    """
+    # Stages are only timed while the metrics are enabled
+    timed = metrics.enabled
+    if timed:
+        start = perf_counter()
+    
+    # A registered schema is already compiled and fingerprinted
+    if schema is None:
+        if schema_id is None:
+            raise ValueError('A schema or a schema ID is needed')
+        schema = (registry if registry is not None else schema_registry).get(schema_id, schema_version)
+    
+    # Fast path: a query without relationships has no pattern to check, it is returned as is
+    if not has_relationships(query):
+        if timed:
+            record_outcome(query, query, start)
+        return query
+    
+    # Build the schema indexes once, a compiled schema is reused as is
+    schema = compile_schema(schema)
+    
+    # Directions never depend on the values of the literals, the template is processed instead
+    normalized_query = normalize_query(query)
+    if normalized_query is not None:
+        query, literals = normalized_query
+    else:
+        literals = []
+    template = query
+    if timed:
+        cache_start = perf_counter()
+        metrics.observe_stage('normalize', cache_start - start)
+    
+    # Results of a mutable schema are only cached in memory, see `QueryResultCache`
+    is_mutable = isinstance(schema, MutableSchema)
+    if cache is not None:
+        cached_query = cache.get(template, schema.cache_key, persistent=not is_mutable)
+        if timed:
+            metrics.observe_stage('cache', perf_counter() - cache_start)
+        if cached_query is not None:
+            if timed:
+                metrics.observe_cache_hit()
+                record_outcome(template, cached_query, start)
+            return restore_literals(cached_query, literals)
+    
+    # Search for patterns, check if the direction is correct by analyzing the schema and corrects it whenever is needed
+    # The names the result depends on are collected while the patterns are parsed
+    names = set() if cache is not None and is_mutable else None
+    query = process_patterns(query, schema, names=names)
+    
+    if cache is not None:
+        if timed:
+            cache_start = perf_counter()
+        if is_mutable:
+            cache.put(template, schema.cache_key, query, names)
+            schema.watch(cache)
+        else:
+            cache.put(template, schema.cache_key, query)
+        if timed:
+            metrics.observe_stage('cache', perf_counter() - cache_start)
+    
+    if timed:
+        record_outcome(template, query, start)
+    return restore_literals(query, literals)
+
+def record_outcome(template, processed_template, start):
+    """
+    Records the outcome and the total time of a processed query in the metrics.
+
+    Parameters:
+    - template (str): The template of the query.
+    - processed_template (str): The processed template.
+    - start (float): The `perf_counter` value when the processing started.
+    """
+    if processed_template == CONST_EMPTY_STRING:
+        metrics.observe_outcome('rejected')
+    elif processed_template != template:
+        metrics.observe_outcome('corrected')
+    else:
+        metrics.observe_outcome('unchanged')
+    metrics.observe_stage('total', perf_counter() - start)
@@ -0,0 +1,261 @@
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from .constants import CONST_RESULT_CACHE_SIZE, CONST_RESULT_CACHE_TIMEOUT
+
+class SqliteResultBackend:
+    """
+    Persistent storage of processed queries in a SQLite database.
+
+    The database survives restarts and can be shared by several processes (e.g. the 
+    workers of `process_queries`): it uses write-ahead logging, and every process opens 
+    its own connection the first time it uses the backend.
+
+    Parameters:
+    - file_path (str): Path of the database file, created if it doesn't exist.
+    - timeout (float, optional): Seconds to wait for another process holding the database lock.
+
+    Usage:
+    ```python
+    cache = QueryResultCache(backend=SqliteResultBackend("results.sqlite3"))
+    ```
+
+    """
+    def __init__(self, file_path, timeout=CONST_RESULT_CACHE_TIMEOUT):
+        self.file_path = file_path
+        self.timeout = timeout
+        self.connection = None
+        self.connection_pid = None
+
+    def __getstate__(self):
+        # Connections can't be shared between processes, each process opens its own
+        return {'file_path': self.file_path, 'timeout': self.timeout, 'connection': None, 'connection_pid': None}
+
+    def connect(self):
+        """
+        Returns the connection of the current process, opening it when needed.
+
+        Returns:
+        - sqlite3.Connection: The connection to the database.
+        """
+        if self.connection is None or self.connection_pid != os.getpid():
+            self.connection = sqlite3.connect(self.file_path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS results (schema TEXT NOT NULL, query TEXT NOT NULL, result TEXT NOT NULL, PRIMARY KEY (schema, query)) WITHOUT ROWID')
+            self.connection_pid = os.getpid()
+        return self.connection
+
+    def get(self, query, schema_fingerprint):
+        """
+        Gets a stored result.
+
+        Parameters:
+        - query (str): The query.
+        - schema_fingerprint (str): The fingerprint of the schema.
+
+        Returns:
+        - str or None: The processed query, or None if it isn't stored.
+        """
+        row = self.connect().execute('SELECT result FROM results WHERE schema = ? AND query = ?', (schema_fingerprint, query)).fetchone()
+        return row[0] if row is not None else None
+
+    def put(self, query, schema_fingerprint, result):
+        """
+        Stores a result.
+
+        Parameters:
+        - query (str): The query.
+        - schema_fingerprint (str): The fingerprint of the schema.
+        - result (str): The processed query.
+        """
+        self.connect().execute('INSERT OR REPLACE INTO results (schema, query, result) VALUES (?, ?, ?)', (schema_fingerprint, query, result))
+
+    def clear(self):
+        """
+        Removes every stored result.
+        """
+        self.connect().execute('DELETE FROM results')
+
+    def close(self):
+        """
+        Closes the connection of the current process.
+        """
+        if self.connection is not None and self.connection_pid == os.getpid():
+            self.connection.close()
+        self.connection = None
+
+class QueryResultCache:
+    """
+    LRU cache of processed queries, keyed by the query text and the schema fingerprint.
+
+    Results are kept in memory up to a maximum number of entries, evicting the least 
+    recently used ones. An optional persistent backend is checked on memory misses and 
+    receives every new result. The cache is safe to use from several threads.
+
+    A result can be stored with the names (labels and relationships) it depends on; 
+    it is then indexed by each of them, so that `invalidate` removes only the results 
+    depending on some changed names (see `MutableSchema`). Such results are only kept 
+    in memory, since the persistent backend can't follow the changes of a schema.
+
+    Parameters:
+    - max_size (int, optional): Maximum number of results kept in memory.
+    - backend (SqliteResultBackend, optional): Persistent storage of the results.
+
+    Usage:
+    ```python
+    cache = QueryResultCache()
+    result = process_query(query, schema, cache=cache)
+    cache.stats()  # {'hits': 0, 'misses': 1, ...}
+    ```
+
+    """
+    def __init__(self, max_size=CONST_RESULT_CACHE_SIZE, backend=None):
+        self.max_size = max_size
+        self.backend = backend
+        self.entries = OrderedDict()
+        self.dependencies = {}
+        self.dependents = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.backend_hits = 0
+
+    def __getstate__(self):
+        # The lock can't be pickled, worker processes get an empty cache with the same backend
+        return {'max_size': self.max_size, 'backend': self.backend}
+
+    def __setstate__(self, state):
+        self.__init__(state['max_size'], state['backend'])
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, query, schema_fingerprint, persistent=True):
+        """
+        Gets a cached result, from memory or from the persistent backend.
+
+        Parameters:
+        - query (str): The query.
+        - schema_fingerprint (str): The fingerprint of the schema (`CompiledSchema.fingerprint`).
+        - persistent (bool, optional): Whether the persistent backend is checked on a memory miss. 
+          Results stored with dependencies are never in the backend, see `put`.
+
+        Returns:
+        - str or None: The processed query, or None on a miss.
+        """
+        key = (schema_fingerprint, query)
+        with self.lock:
+            result = self.entries.get(key)
+            if result is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return result
+        
+        if self.backend is not None and persistent:
+            result = self.backend.get(query, schema_fingerprint)
+            if result is not None:
+                with self.lock:
+                    self.backend_hits += 1
+                    self.hits += 1
+                    self.store(key, result)
+                return result
+        
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, query, schema_fingerprint, result, dependencies=None):
+        """
+        Caches a result in memory and in the persistent backend.
+
+        Parameters:
+        - query (str): The query.
+        - schema_fingerprint (str): The fingerprint of the schema (`CompiledSchema.cache_key`).
+        - result (str): The processed query.
+        - dependencies (iterable[str], optional): Names of the schema the result depends on. 
+          A result with dependencies is only cached in memory.
+        """
+        with self.lock:
+            self.store((schema_fingerprint, query), result, dependencies)
+        if self.backend is not None and dependencies is None:
+            self.backend.put(query, schema_fingerprint, result)
+
+    def store(self, key, result, dependencies=None):
+        """
+        Stores a result in memory, evicting the least recently used one when full. 
+        The lock must be held by the caller.
+
+        Parameters:
+        - key (tuple[str, str]): The schema fingerprint and the query.
+        - result (str): The processed query.
+        - dependencies (iterable[str], optional): Names of the schema the result depends on.
+        """
+        self.discard(key)
+        self.entries[key] = result
+        if dependencies is not None:
+            dependencies = frozenset(dependencies)
+            self.dependencies[key] = dependencies
+            for name in dependencies:
+                self.dependents.setdefault((key[0], name), set()).add(key)
+        while len(self.entries) > self.max_size:
+            self.discard(next(iter(self.entries)))
+            self.evictions += 1
+
+    def discard(self, key):
+        """
+        Removes a result from memory, with its dependencies. The lock must be held by the caller.
+
+        Parameters:
+        - key (tuple[str, str]): The schema fingerprint and the query.
+        """
+        if self.entries.pop(key, None) is None:
+            return
+        for name in self.dependencies.pop(key, ()):
+            dependents = self.dependents[(key[0], name)]
+            dependents.discard(key)
+            if not dependents:
+                del self.dependents[(key[0], name)]
+
+    def invalidate(self, schema_fingerprint, names):
+        """
+        Removes from memory the results of a schema that depend on any of the given names.
+
+        Parameters:
+        - schema_fingerprint (str): The key of the schema (`CompiledSchema.cache_key`).
+        - names (iterable[str]): The changed labels and relationships.
+
+        Returns:
+        - int: Number of removed results.
+        """
+        with self.lock:
+            keys = set()
+            for name in names:
+                keys.update(self.dependents.get((schema_fingerprint, name), ()))
+            for key in keys:
+                self.discard(key)
+            return len(keys)
+
+    def clear(self):
+        """
+        Removes every cached result, from memory and from the persistent backend, and resets the counters.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.dependencies.clear()
+            self.dependents.clear()
+            self.hits = self.misses = self.evictions = self.backend_hits = 0
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        """
+        Returns the counters of the cache.
+
+        Returns:
+        - dict: Number of hits (including backend hits), misses, evictions, backend hits and cached entries.
+        """
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'backend_hits': self.backend_hits, 'size': len(self.entries)}
@@ -0,0 +1,585 @@
+import hashlib
+import uuid
+import weakref
+from types import MappingProxyType
+from .constants import CONST_SOURCE_CLASS_KEY, CONST_TARGET_CLASS_KEY, CONST_RELATIONSHIP_KEY, CONST_SCHEMA_BITSET_MIN_COMBINATIONS
+
+# The fingerprint is a sum of 256-bit hashes, kept in 256 bits
+FINGERPRINT_MODULUS = 1 << 256
+
+class CompiledSchema:
+    """
+    Hash-indexed view of a processed graph schema.
+
+    This class is built once from the output of `process_schema` and keeps one set per
+    kind of lookup performed while validating a pattern, so every existence check is a
+    single hash lookup instead of a scan over the whole list of schema items.
+
+    Indexes:
+    - triples: (sourceClass, relationship, targetClass)
+    - source_relationships: (sourceClass, relationship)
+    - relationship_targets: (relationship, targetClass)
+    - source_targets: (sourceClass, targetClass)
+    - source_classes / target_classes / classes / relationships: single names
+
+    Classes and relationships are also interned to dense integers (`class_ids` and 
+    `relationship_ids`), and the bitset indexes map some IDs to the set of the other 
+    allowed IDs, as the bits of an integer:
+    - targets_by_source_relationship: (source ID, relationship ID) -> target classes
+    - relationships_by_source_target: (source ID, target ID) -> relationships
+    - targets_by_source: source ID -> target classes
+    - relationships_by_source / relationships_by_target: class ID -> relationships
+    They let `pattern_exists_multiple` check nodes with several classes and relationships 
+    with several alternatives with a few mask intersections, instead of one lookup per 
+    combination.
+
+    The `fingerprint` attribute is a stable hash of the triples (it does not depend on 
+    their order, on duplicates or on the process). The `cache_key` attribute keys cached 
+    results by schema, for a compiled schema it is its fingerprint. The `encoded` attribute 
+    keeps the NumPy encoding of the schema, built on first use by `batch_validation.encode_schema`.
+
+    Parameters:
+    - schema (list[dict]): The processed schema, as returned by `process_schema`.
+
+    Usage:
+    ```python
+    compiled_schema = CompiledSchema(process_schema("(Person, KNOWS, Person)"))
+    compiled_schema.pattern_exists("Person", "Person", "KNOWS", True, True, True)  # True
+    ```
+
+    Note:
+    - Iterating over a compiled schema yields the schema items, so it can be used anywhere
+      a list of schema dictionaries is expected.
+    - A compiled schema is read-only (items are exposed as read-only mappings and indexes
+      as frozensets), so a single instance can be safely shared between many queries.
+    """
+    def __init__(self, schema):
+        self.items = tuple(MappingProxyType(dict(item)) for item in schema)
+        self.triples = set()
+        self.source_relationships = set()
+        self.relationship_targets = set()
+        self.source_targets = set()
+        self.source_classes = set()
+        self.target_classes = set()
+        self.relationships = set()
+
+        for item in self.items:
+            source_class_name = item[CONST_SOURCE_CLASS_KEY]
+            target_class_name = item[CONST_TARGET_CLASS_KEY]
+            rel_name = item[CONST_RELATIONSHIP_KEY]
+            self.triples.add((source_class_name, rel_name, target_class_name))
+            self.source_relationships.add((source_class_name, rel_name))
+            self.relationship_targets.add((rel_name, target_class_name))
+            self.source_targets.add((source_class_name, target_class_name))
+            self.source_classes.add(source_class_name)
+            self.target_classes.add(target_class_name)
+            self.relationships.add(rel_name)
+
+        self.triples = frozenset(self.triples)
+        self.source_relationships = frozenset(self.source_relationships)
+        self.relationship_targets = frozenset(self.relationship_targets)
+        self.source_targets = frozenset(self.source_targets)
+        self.source_classes = frozenset(self.source_classes)
+        self.target_classes = frozenset(self.target_classes)
+        self.relationships = frozenset(self.relationships)
+        self.classes = self.source_classes | self.target_classes
+        self.fingerprint = schema_fingerprint(self.triples)
+        self.cache_key = self.fingerprint
+        self.encoded = None
+        self.build_bitsets()
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __repr__(self):
+        return repr([dict(item) for item in self.items])
+
+    def __reduce__(self):
+        # Read-only mappings can't be pickled, the schema is rebuilt from plain dictionaries
+        return (CompiledSchema, ([dict(item) for item in self.items],))
+
+    def build_bitsets(self):
+        """
+        Interns the classes and relationships, and builds the bitset indexes from the items.
+        """
+        self.class_ids = {}
+        self.relationship_ids = {}
+        self.targets_by_source_relationship = {}
+        self.relationships_by_source_target = {}
+        self.targets_by_source = {}
+        self.relationships_by_source = {}
+        self.relationships_by_target = {}
+        for item in self.items:
+            self.set_bits(item[CONST_SOURCE_CLASS_KEY], item[CONST_RELATIONSHIP_KEY], item[CONST_TARGET_CLASS_KEY])
+
+    def set_bits(self, source_class_name, rel_name, target_class_name):
+        """
+        Interns the names of a triple and sets its bits in every bitset index.
+
+        Parameters:
+        - source_class_name (str): The name of the source class.
+        - rel_name (str): The name of the relationship.
+        - target_class_name (str): The name of the target class.
+        """
+        source_id = self.class_ids.setdefault(source_class_name, len(self.class_ids))
+        target_id = self.class_ids.setdefault(target_class_name, len(self.class_ids))
+        rel_id = self.relationship_ids.setdefault(rel_name, len(self.relationship_ids))
+        set_bit(self.targets_by_source_relationship, (source_id, rel_id), target_id)
+        set_bit(self.relationships_by_source_target, (source_id, target_id), rel_id)
+        set_bit(self.targets_by_source, source_id, target_id)
+        set_bit(self.relationships_by_source, source_id, rel_id)
+        set_bit(self.relationships_by_target, target_id, rel_id)
+
+    def pattern_exists_multiple(self, source_classes_names, target_classes_names, rels_names, source_classes_is_defined, target_classes_is_defined, rels_names_is_defined):
+        """
+        Determines if any combination of the given classes and relationships exists within the schema.
+
+        A single combination is checked with one hash lookup (see `pattern_exists`). Otherwise 
+        the names of one side are encoded as a mask, and intersected with the mask indexed 
+        by every pair of names of the other sides, so a node with n classes, a relationship 
+        with m alternatives and a node with k classes take min(m, k) * n lookups instead of 
+        n * m * k. Names that are not in the schema are ignored.
+
+        Parameters:
+        - source_classes_names (list[str] or None): Possible source class names.
+        - target_classes_names (list[str] or None): Possible target class names.
+        - rels_names (list[str] or None): Possible relationship names.
+        - source_classes_is_defined (bool): Whether the source classes are defined.
+        - target_classes_is_defined (bool): Whether the target classes are defined.
+        - rels_names_is_defined (bool): Whether the relationships are defined.
+
+        Returns:
+        - bool: True if a matching pattern is found, otherwise False.
+        """
+        # source, relationship and target
+        if source_classes_is_defined and target_classes_is_defined and rels_names_is_defined:
+            if len(source_classes_names) * len(target_classes_names) * len(rels_names) < CONST_SCHEMA_BITSET_MIN_COMBINATIONS:
+                triples = self.triples
+                for source_class_name in source_classes_names:
+                    for rel_name in rels_names:
+                        for target_class_name in target_classes_names:
+                            if (source_class_name, rel_name, target_class_name) in triples:
+                                return True
+                return False
+            class_ids = self.class_ids
+            relationship_ids = self.relationship_ids
+            targets_mask = names_mask(class_ids, target_classes_names)
+            rels_mask = names_mask(relationship_ids, rels_names)
+            for source_class_name in source_classes_names:
+                source_id = class_ids.get(source_class_name)
+                # Most sources are discarded by the relationships and targets they have, whatever the pair
+                if not (self.relationships_by_source.get(source_id, 0) & rels_mask and self.targets_by_source.get(source_id, 0) & targets_mask):
+                    continue
+                for rel_name in rels_names:
+                    if self.targets_by_source_relationship.get((source_id, relationship_ids.get(rel_name)), 0) & targets_mask:
+                        return True
+            return False
+        # source and target only
+        if source_classes_is_defined and target_classes_is_defined and not rels_names_is_defined:
+            if len(source_classes_names) * len(target_classes_names) < CONST_SCHEMA_BITSET_MIN_COMBINATIONS:
+                for source_class_name in source_classes_names:
+                    for target_class_name in target_classes_names:
+                        if (source_class_name, target_class_name) in self.source_targets:
+                            return True
+                return False
+            return self.any_mask_intersects(self.targets_by_source, source_classes_names, self.class_ids, target_classes_names)
+        # source and relationship only
+        if source_classes_is_defined and not target_classes_is_defined and rels_names_is_defined:
+            if len(source_classes_names) * len(rels_names) < CONST_SCHEMA_BITSET_MIN_COMBINATIONS:
+                for source_class_name in source_classes_names:
+                    for rel_name in rels_names:
+                        if (source_class_name, rel_name) in self.source_relationships:
+                            return True
+                return False
+            return self.any_mask_intersects(self.relationships_by_source, source_classes_names, self.relationship_ids, rels_names)
+        # source only
+        if source_classes_is_defined and not target_classes_is_defined and not rels_names_is_defined:
+            return not self.source_classes.isdisjoint(source_classes_names)
+        # target and relationship only
+        if not source_classes_is_defined and target_classes_is_defined and rels_names_is_defined:
+            if len(target_classes_names) * len(rels_names) < CONST_SCHEMA_BITSET_MIN_COMBINATIONS:
+                for target_class_name in target_classes_names:
+                    for rel_name in rels_names:
+                        if (rel_name, target_class_name) in self.relationship_targets:
+                            return True
+                return False
+            return self.any_mask_intersects(self.relationships_by_target, target_classes_names, self.relationship_ids, rels_names)
+        # target only
+        if not source_classes_is_defined and target_classes_is_defined and not rels_names_is_defined:
+            return not self.target_classes.isdisjoint(target_classes_names)
+        return False
+
+    def any_mask_intersects(self, masks, classes_names, ids, names):
+        """
+        Determines if the mask of any of the given classes, in a bitset index keyed by class ID, has any of the given names.
+
+        Parameters:
+        - masks (dict[int, int]): The bitset index.
+        - classes_names (list[str]): The class names whose masks are checked.
+        - ids (dict[str, int]): The interned names of the masks (classes or relationships).
+        - names (list[str]): The names searched in the masks.
+
+        Returns:
+        - bool: True if a mask has the bit of any of the names, otherwise False.
+        """
+        names_bits = names_mask(ids, names)
+        class_ids = self.class_ids
+        for class_name in classes_names:
+            if masks.get(class_ids.get(class_name), 0) & names_bits:
+                return True
+        return False
+
+    def pattern_exists(self, source_class_name, target_class_name, rel_name, source_class_is_defined, target_class_is_defined, rel_name_is_defined):
+        """
+        Determines if a given pattern exists within the schema using the hash indexes.
+
+        Parameters:
+        - source_class_name (str or None): The name of the source class.
+        - target_class_name (str or None): The name of the target class.
+        - rel_name (str or None): The name of the relationship.
+        - source_class_is_defined (bool): Whether the source class is defined.
+        - target_class_is_defined (bool): Whether the target class is defined.
+        - rel_name_is_defined (bool): Whether the relationship is defined.
+
+        Returns:
+        - bool: True if a matching pattern is found, otherwise False.
+        """
+        # source, relationship and target
+        if source_class_is_defined and target_class_is_defined and rel_name_is_defined:
+            return (source_class_name, rel_name, target_class_name) in self.triples
+        # source and target only
+        if source_class_is_defined and target_class_is_defined and not rel_name_is_defined:
+            return (source_class_name, target_class_name) in self.source_targets
+        # source and relationship only
+        if source_class_is_defined and not target_class_is_defined and rel_name_is_defined:
+            return (source_class_name, rel_name) in self.source_relationships
+        # source only
+        if source_class_is_defined and not target_class_is_defined and not rel_name_is_defined:
+            return source_class_name in self.source_classes
+        # target and relationship only
+        if not source_class_is_defined and target_class_is_defined and rel_name_is_defined:
+            return (rel_name, target_class_name) in self.relationship_targets
+        # target only
+        if not source_class_is_defined and target_class_is_defined and not rel_name_is_defined:
+            return target_class_name in self.target_classes
+
+def set_bit(masks, key, bit):
+    """
+    Sets a bit in the mask of a key of a bitset index.
+
+    Parameters:
+    - masks (dict): The bitset index.
+    - key (Any): The key of the mask.
+    - bit (int): The position of the bit.
+    """
+    masks[key] = masks.get(key, 0) | (1 << bit)
+
+def clear_bit(masks, key, bit):
+    """
+    Clears a bit in the mask of a key of a bitset index, removing the key when its mask is empty.
+
+    Parameters:
+    - masks (dict): The bitset index.
+    - key (Any): The key of the mask.
+    - bit (int): The position of the bit.
+    """
+    mask = masks[key] & ~(1 << bit)
+    if mask:
+        masks[key] = mask
+    else:
+        del masks[key]
+
+def names_ids(ids, names):
+    """
+    Returns the IDs of the names that are interned.
+
+    Parameters:
+    - ids (dict[str, int]): The interned names.
+    - names (list[str]): The names.
+
+    Returns:
+    - list[int]: The IDs of the interned names, unknown names are skipped.
+    """
+    return [ids[name] for name in names if name in ids]
+
+def names_mask(ids, names):
+    """
+    Encodes the interned names as a mask, with the bits of their IDs set.
+
+    Parameters:
+    - ids (dict[str, int]): The interned names.
+    - names (list[str]): The names.
+
+    Returns:
+    - int: The mask, unknown names are skipped.
+    """
+    mask = 0
+    for name in names:
+        name_id = ids.get(name)
+        if name_id is not None:
+            mask |= 1 << name_id
+    return mask
+
+def triple_hash(triple):
+    """
+    Computes the hash of a single schema triple, as an integer.
+
+    Parameters:
+    - triple (tuple[str, str, str]): The (sourceClass, relationship, targetClass) triple.
+
+    Returns:
+    - int: The SHA-256 digest of the triple.
+    """
+    return int.from_bytes(hashlib.sha256('\x1f'.join(triple).encode('utf-8')).digest(), 'big')
+
+def format_fingerprint(value):
+    """
+    Formats the sum of the hashes of some triples as a fingerprint.
+
+    Parameters:
+    - value (int): The sum of the hashes, modulo `FINGERPRINT_MODULUS`.
+
+    Returns:
+    - str: Hexadecimal fingerprint.
+    """
+    return format(value, '064x')
+
+def schema_fingerprint(triples):
+    """
+    Computes a stable hash of a set of schema triples.
+
+    The fingerprint is the sum of the hashes of the distinct triples, so it can be updated 
+    when a single triple is added or removed (see `MutableSchema`) without hashing the 
+    whole schema again.
+
+    Parameters:
+    - triples (iterable[tuple[str, str, str]]): The (sourceClass, relationship, targetClass) triples.
+
+    Returns:
+    - str: Hexadecimal sum of the SHA-256 digests of the distinct triples, modulo 2**256.
+    """
+    return format_fingerprint(sum(triple_hash(triple) for triple in set(triples)) % FINGERPRINT_MODULUS)
+
+def compile_schema(schema):
+    """
+    Returns a `CompiledSchema` for the given schema, compiling it only when needed.
+
+    Parameters:
+    - schema (list[dict] or CompiledSchema): The processed schema.
+
+    Returns:
+    - CompiledSchema: The given schema if it is already compiled, otherwise a new compiled schema.
+    """
+    if isinstance(schema, CompiledSchema):
+        return schema
+    return CompiledSchema(schema)
+
+class MutableSchema(CompiledSchema):
+    """
+    Compiled schema whose triples can be added and removed one at a time.
+
+    Every index of `CompiledSchema` is kept as a dictionary that counts the triples 
+    behind each of its entries, and exposed as the live view of its keys. Adding or 
+    removing a triple updates the counters, the indexes and the fingerprint in O(1), 
+    instead of compiling the whole schema again. The NumPy encoding (`encoded`) is dropped 
+    and built again on its next use.
+
+    Results cached for a mutable schema are keyed by its `cache_key`, which doesn't change 
+    with the triples, together with the labels and relationships the query refers to 
+    (see `process_query`). When a triple changes, only the cached results of the queries 
+    that refer to one of its names are invalidated: the result of any other query depends 
+    on no index entry built from that triple.
+
+    Parameters:
+    - schema (list[dict] or CompiledSchema, optional): The initial processed schema.
+
+    Usage:
+    ```python
+    mutable_schema = MutableSchema(process_schema("(Person, KNOWS, Person)"))
+    mutable_schema.add_triple("Person", "ACTED_IN", "Movie")  # True
+    mutable_schema.remove_triple("Person", "KNOWS", "Person")  # True
+    process_query(query, mutable_schema, cache=cache)
+    ```
+
+    Note:
+    - Duplicated triples are kept once.
+    - Classes and relationships stay interned after their last triple is removed.
+    - A copy (pickled or not) gets its own `cache_key`.
+    - Triples should not be changed while other threads are processing queries with the schema.
+    """
+    def __init__(self, schema=()):
+        self.triple_items = {}
+        self.source_relationship_counts = {}
+        self.relationship_target_counts = {}
+        self.source_target_counts = {}
+        self.source_class_counts = {}
+        self.target_class_counts = {}
+        self.class_counts = {}
+        self.relationship_counts = {}
+        self.triples = self.triple_items.keys()
+        self.source_relationships = self.source_relationship_counts.keys()
+        self.relationship_targets = self.relationship_target_counts.keys()
+        self.source_targets = self.source_target_counts.keys()
+        self.source_classes = self.source_class_counts.keys()
+        self.target_classes = self.target_class_counts.keys()
+        self.classes = self.class_counts.keys()
+        self.relationships = self.relationship_counts.keys()
+        self.fingerprint_value = 0
+        self.fingerprint = format_fingerprint(0)
+        self.cache_key = f'mutable:{uuid.uuid4().hex}'
+        self.caches = weakref.WeakSet()
+        self.encoded = None
+        self.class_ids = {}
+        self.relationship_ids = {}
+        self.targets_by_source_relationship = {}
+        self.relationships_by_source_target = {}
+        self.targets_by_source = {}
+        self.relationships_by_source = {}
+        self.relationships_by_target = {}
+
+        for item in schema:
+            self.add_triple(item[CONST_SOURCE_CLASS_KEY], item[CONST_RELATIONSHIP_KEY], item[CONST_TARGET_CLASS_KEY])
+
+    @property
+    def items(self):
+        return tuple(self.triple_items.values())
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.triple_items)
+
+    def __reduce__(self):
+        return (MutableSchema, ([dict(item) for item in self.triple_items.values()],))
+
+    def add_triple(self, source_class_name, rel_name, target_class_name):
+        """
+        Adds a triple to the schema.
+
+        Parameters:
+        - source_class_name (str): The name of the source class.
+        - rel_name (str): The name of the relationship.
+        - target_class_name (str): The name of the target class.
+
+        Returns:
+        - bool: True if the triple was added, False if it was already in the schema.
+        """
+        triple = (source_class_name, rel_name, target_class_name)
+        if triple in self.triple_items:
+            return False
+
+        self.triple_items[triple] = MappingProxyType({
+            CONST_SOURCE_CLASS_KEY: source_class_name,
+            CONST_RELATIONSHIP_KEY: rel_name,
+            CONST_TARGET_CLASS_KEY: target_class_name
+        })
+        for counts, key in self.index_entries(triple):
+            counts[key] = counts.get(key, 0) + 1
+        self.set_bits(source_class_name, rel_name, target_class_name)
+        self.update_fingerprint(triple_hash(triple))
+        self.encoded = None
+        self.invalidate_caches(triple)
+        return True
+
+    def remove_triple(self, source_class_name, rel_name, target_class_name):
+        """
+        Removes a triple from the schema.
+
+        Parameters:
+        - source_class_name (str): The name of the source class.
+        - rel_name (str): The name of the relationship.
+        - target_class_name (str): The name of the target class.
+
+        Returns:
+        - bool: True if the triple was removed, False if it wasn't in the schema.
+        """
+        triple = (source_class_name, rel_name, target_class_name)
+        if self.triple_items.pop(triple, None) is None:
+            return False
+
+        for counts, key in self.index_entries(triple):
+            if counts[key] == 1:
+                del counts[key]
+            else:
+                counts[key] -= 1
+        self.clear_bits(triple)
+        self.update_fingerprint(-triple_hash(triple))
+        self.encoded = None
+        self.invalidate_caches(triple)
+        return True
+
+    def index_entries(self, triple):
+        """
+        Lists the index entries built from a triple.
+
+        Parameters:
+        - triple (tuple[str, str, str]): The (sourceClass, relationship, targetClass) triple.
+
+        Returns:
+        - list[tuple[dict, Any]]: The counters of every index, with the key of the triple in it.
+        """
+        source_class_name, rel_name, target_class_name = triple
+        return [
+            (self.source_relationship_counts, (source_class_name, rel_name)),
+            (self.relationship_target_counts, (rel_name, target_class_name)),
+            (self.source_target_counts, (source_class_name, target_class_name)),
+            (self.source_class_counts, source_class_name),
+            (self.target_class_counts, target_class_name),
+            (self.class_counts, source_class_name),
+            (self.class_counts, target_class_name),
+            (self.relationship_counts, rel_name)
+        ]
+
+    def clear_bits(self, triple):
+        """
+        Clears the bits of a removed triple in the bitset indexes. 
+        The counters must be already updated, the bits of a pair are only cleared when no triple has the pair.
+
+        Parameters:
+        - triple (tuple[str, str, str]): The removed (sourceClass, relationship, targetClass) triple.
+        """
+        source_class_name, rel_name, target_class_name = triple
+        source_id = self.class_ids[source_class_name]
+        target_id = self.class_ids[target_class_name]
+        rel_id = self.relationship_ids[rel_name]
+        clear_bit(self.targets_by_source_relationship, (source_id, rel_id), target_id)
+        clear_bit(self.relationships_by_source_target, (source_id, target_id), rel_id)
+        if (source_class_name, target_class_name) not in self.source_target_counts:
+            clear_bit(self.targets_by_source, source_id, target_id)
+        if (source_class_name, rel_name) not in self.source_relationship_counts:
+            clear_bit(self.relationships_by_source, source_id, rel_id)
+        if (rel_name, target_class_name) not in self.relationship_target_counts:
+            clear_bit(self.relationships_by_target, target_id, rel_id)
+
+    def update_fingerprint(self, delta):
+        """
+        Adds the hash of an added triple to the fingerprint, or subtracts the hash of a removed one.
+
+        Parameters:
+        - delta (int): The hash, negative for a removed triple.
+        """
+        self.fingerprint_value = (self.fingerprint_value + delta) % FINGERPRINT_MODULUS
+        self.fingerprint = format_fingerprint(self.fingerprint_value)
+
+    def watch(self, cache):
+        """
+        Registers a result cache to be invalidated when the triples change.
+
+        Parameters:
+        - cache (QueryResultCache): The cache holding results for this schema.
+        """
+        self.caches.add(cache)
+
+    def invalidate_caches(self, triple):
+        """
+        Invalidates the cached results of the queries that refer to a name of a changed triple.
+
+        Parameters:
+        - triple (tuple[str, str, str]): The added or removed triple.
+        """
+        for cache in list(self.caches):
+            cache.invalidate(self.cache_key, triple)
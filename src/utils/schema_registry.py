@@ -0,0 +1,140 @@
+import threading
+from collections import namedtuple
+from .file_processing import process_schema
+from .schema import CompiledSchema, MutableSchema, compile_schema
+
+# Registered version of a schema
+# - schema: the compiled schema
+# - source: the schema string it was registered from, or None if it was registered from a processed schema
+SchemaVersion = namedtuple('SchemaVersion', ['schema_id', 'version', 'schema', 'source'])
+
+class UnknownSchemaError(KeyError):
+    """
+    Raised when a schema ID or version is not registered.
+    """
+
+class SchemaRegistry:
+    """
+    Stores compiled schemas under an ID, keeping every registered version.
+
+    A schema is parsed, compiled and fingerprinted once, when it is registered; 
+    queries then refer to it by ID (see `process_query`). Registering a schema whose 
+    triples are identical to the latest version of the ID doesn't create a new version. 
+    The registry is safe to use from several threads.
+
+    Usage:
+    ```python
+    version = schema_registry.register('movies', "(Person, ACTED_IN, Movie)")
+    process_query(query, schema_id='movies')
+    process_query(query, schema_id='movies', schema_version=version)
+    ```
+
+    """
+    def __init__(self):
+        self.versions = {}
+        self.lock = threading.Lock()
+
+    def __contains__(self, schema_id):
+        return schema_id in self.versions
+
+    def __len__(self):
+        return len(self.versions)
+
+    def register(self, schema_id, schema):
+        """
+        Registers a schema as the new latest version of an ID.
+
+        Parameters:
+        - schema_id (str): The ID of the schema.
+        - schema (str, list[dict] or CompiledSchema): The schema string, the processed schema 
+          or an already compiled schema. The current triples of a `MutableSchema` are registered, 
+          later changes don't modify the registered version.
+
+        Returns:
+        - int: The version of the schema, starting at 1.
+        """
+        source = schema if isinstance(schema, str) else None
+        if source is not None:
+            compiled_schema = CompiledSchema(process_schema(schema))
+        elif isinstance(schema, MutableSchema):
+            compiled_schema = CompiledSchema(schema)
+        else:
+            compiled_schema = compile_schema(schema)
+        
+        with self.lock:
+            versions = self.versions.setdefault(schema_id, [])
+            if versions and versions[-1].schema.fingerprint == compiled_schema.fingerprint:
+                return versions[-1].version
+            versions.append(SchemaVersion(schema_id, len(versions) + 1, compiled_schema, source))
+            return len(versions)
+
+    def get_version(self, schema_id, version=None):
+        """
+        Gets a registered version of a schema.
+
+        Parameters:
+        - schema_id (str): The ID of the schema.
+        - version (int, optional): The version, defaults to the latest one.
+
+        Returns:
+        - SchemaVersion: The registered version.
+
+        Raises:
+        - UnknownSchemaError: If the ID or the version is not registered.
+        """
+        versions = self.versions.get(schema_id)
+        if not versions:
+            raise UnknownSchemaError(f'Schema {schema_id} is not registered')
+        if version is None:
+            return versions[-1]
+        if not 1 <= version <= len(versions):
+            raise UnknownSchemaError(f'Schema {schema_id} has no version {version}')
+        return versions[version - 1]
+
+    def get(self, schema_id, version=None):
+        """
+        Gets a registered compiled schema.
+
+        Parameters:
+        - schema_id (str): The ID of the schema.
+        - version (int, optional): The version, defaults to the latest one.
+
+        Returns:
+        - CompiledSchema: The compiled schema.
+
+        Raises:
+        - UnknownSchemaError: If the ID or the version is not registered.
+        """
+        return self.get_version(schema_id, version).schema
+
+    def latest_version(self, schema_id):
+        """
+        Returns the latest version of a schema.
+
+        Parameters:
+        - schema_id (str): The ID of the schema.
+
+        Returns:
+        - int: The latest version.
+
+        Raises:
+        - UnknownSchemaError: If the ID is not registered.
+        """
+        return self.get_version(schema_id).version
+
+    def unregister(self, schema_id):
+        """
+        Removes every version of a schema.
+
+        Parameters:
+        - schema_id (str): The ID of the schema.
+
+        Raises:
+        - UnknownSchemaError: If the ID is not registered.
+        """
+        with self.lock:
+            if self.versions.pop(schema_id, None) is None:
+                raise UnknownSchemaError(f'Schema {schema_id} is not registered')
+
+# Registry used by `process_query` when no other registry is given
+schema_registry = SchemaRegistry()
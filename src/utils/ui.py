@@ -1,5 +1,29 @@
+import logging
+import sys
 from .constants import CONST_COLOR_BLUE, CONST_COLOR_GREEN, CONST_COLOR_RED, CONST_COLOR_NORMAL, CONST_COLOR_YELLOW
 
+# Stream where the print functions write, None means the current standard output
+console_stream = None
+
+def set_console_stream(stream):
+    """
+    Sets the stream where the print functions write.
+
+    This is used to send the messages to the standard error (e.g. when the standard output 
+    carries the processed queries) or to discard them.
+
+    Parameters:
+    - stream (file-like or None): The stream to write to, None for the standard output.
+
+    Usage:
+    ```python
+    set_console_stream(sys.stderr)
+    ```
+
+    """
+    global console_stream
+    console_stream = stream
+
 def printb(text):
     """
     Prints the provided text in blue color.
@@ -16,7 +40,7 @@ def printb(text):
     ```
 
     """
-    print(CONST_COLOR_BLUE + text)
+    print(CONST_COLOR_BLUE + text, file=console_stream)
 
 
 def printg(text):
@@ -35,7 +59,7 @@ def printg(text):
     ```
 
     """
-    print(CONST_COLOR_GREEN + text)
+    print(CONST_COLOR_GREEN + text, file=console_stream)
 
 
 def printr(text):
@@ -54,7 +78,7 @@ def printr(text):
     ```
 
     """
-    print(CONST_COLOR_RED + text)
+    print(CONST_COLOR_RED + text, file=console_stream)
 
 
 def printn(text):
@@ -74,7 +98,7 @@ def printn(text):
     ```
 
     """
-    print(CONST_COLOR_NORMAL + text)
+    print(CONST_COLOR_NORMAL + text, file=console_stream)
 
 
 def printy(text):
@@ -93,4 +117,36 @@ def printy(text):
     ```
 
     """
-    print(CONST_COLOR_YELLOW + text)
+    print(CONST_COLOR_YELLOW + text, file=console_stream)
+
+
+class ColoredConsoleHandler(logging.StreamHandler):
+    """
+    Logging handler that prints the diagnostic messages in the console with colors.
+
+    The color depends on the level of the message, with the same colors used by the 
+    print functions: blue for debug, green for info, yellow for warning and red for 
+    error and critical messages.
+
+    Parameters:
+    - stream (file-like, optional): The stream to write to, defaults to the standard output.
+
+    Usage:
+    ```python
+    logging.getLogger(CONST_LOGGER_NAME).addHandler(ColoredConsoleHandler())
+    ```
+
+    """
+    level_colors = {
+        logging.DEBUG: CONST_COLOR_BLUE,
+        logging.INFO: CONST_COLOR_GREEN,
+        logging.WARNING: CONST_COLOR_YELLOW,
+        logging.ERROR: CONST_COLOR_RED,
+        logging.CRITICAL: CONST_COLOR_RED,
+    }
+
+    def __init__(self, stream=None):
+        super().__init__(stream if stream is not None else sys.stdout)
+
+    def format(self, record):
+        return self.level_colors.get(record.levelno, CONST_COLOR_NORMAL) + super().format(record)